@@ -9,6 +9,9 @@ from components.ai_chat import render_ai_chat
 from components.predictions import render_predictions
 from components.anomaly_detection import render_anomaly_detection
 from components.recommendations import render_recommendations
+from components.reports import render_reports
+from components.performance import render_performance_panel, tracing_enabled
+from utils.tracing import Tracer
 
 def main():
     st.set_page_config(page_title='InsightPilot v2', layout='wide')
@@ -26,11 +29,19 @@ def main():
         "🤖 AI Chat": render_ai_chat,
         "📈 Predictive Analytics": render_predictions,
         "🚨 Anomaly Detection": render_anomaly_detection,
-        "💡 Smart Recommendations": render_recommendations
+        "💡 Smart Recommendations": render_recommendations,
+        "📑 Reports": render_reports
     }
     
     page = st.sidebar.selectbox("Select page", list(pages.keys()))
-    pages[page](st.session_state.data, st.session_state.processor)
+    # Spans of this rerun; service calls made by the page nest under the page span
+    tracer = Tracer(enabled=tracing_enabled()).activate()
+    try:
+        with tracer.span(f'page.{pages[page].__name__}', rows=len(st.session_state.processor.sales) if st.session_state.processor.sales is not None else None):
+            pages[page](st.session_state.data, st.session_state.processor)
+    finally:
+        tracer.deactivate()
+    render_performance_panel(tracer)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,205 @@
+"""Benchmarks for the service hot paths at several data scales.
+
+Every case runs on a fresh copy of a generated dataset (so per-frame memos and the
+result cache start cold) and records wall time over a few repeats plus, in a
+separate run under tracemalloc, peak traced memory and allocated blocks.
+
+    python benchmarks/run_benchmarks.py --scales 10k,1m --save benchmarks/results/base.json
+    python benchmarks/run_benchmarks.py --scales 10k,1m --compare benchmarks/results/base.json
+
+With --compare the exit status is 1 when a case got slower or hungrier than the
+baseline by more than the threshold.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+import pandas as pd
+import sklearn
+from components.ai_chat import local_answer
+from components.forecast import simple_linear_forecast
+from data.sample_business_data import generate_business_data
+from services.analytics_service import AnalyticsService
+from services.ml_service import MLService
+from services.model_registry import ModelRegistry
+from utils.data_processor import DataProcessor, normalize_sales
+from utils.result_cache import result_cache
+
+SCALES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000, '10m': 10_000_000}
+QUESTIONS = ['highest month', 'top 5 products by revenue last 90 days', 'total revenue', 'revenue growth last month']
+
+def make_dataset(rows):
+    return generate_business_data(
+        num_orders=rows, num_days=730, num_products=200,
+        num_customers=min(max(rows // 20, 100), 200_000), end_date='2025-12-31'
+    )
+
+def fresh(data):
+    # New frame objects defeat identity-keyed memos; the copies are made outside the timed region
+    copy = dict(data)
+    copy['sales'] = data['sales'].copy()
+    copy['sales'].attrs = dict(data['sales'].attrs)
+    result_cache.clear()
+    return copy
+
+def raw_sales(data):
+    sales = data['sales'].astype({'product_id': str, 'customer_id': str, 'region': str})
+    sales.attrs = {}
+    return sales.sample(frac=1, random_state=0)
+
+def trained(data, registry_dir):
+    ml = MLService(registry=ModelRegistry(registry_dir))
+    ml.train_sales_prediction_model(data['sales'])
+    return ml
+
+def cases(registry_dir):
+    """name -> (setup(data) -> state, run(state))"""
+    def new_registry():
+        return ModelRegistry(tempfile.mkdtemp(dir=registry_dir))
+    return {
+        'processor.normalize': (lambda d: raw_sales(d), lambda raw: normalize_sales(raw)),
+        'processor.init': (lambda d: {**fresh(d), 'sales': raw_sales(d)}, lambda d: DataProcessor(d)),
+        'processor.get_data_summary': (lambda d: DataProcessor(fresh(d)), lambda p: p.get_data_summary()),
+        'processor.filter_data_by_date': (lambda d: DataProcessor(fresh(d)), lambda p: p.filter_data_by_date('2025-06-01', '2025-08-31')),
+        'processor.calculate_growth_metrics': (lambda d: DataProcessor(fresh(d)), lambda p: p.calculate_growth_metrics()),
+        'analytics.calculate_kpis': (lambda d: AnalyticsService(fresh(d)), lambda a: a.calculate_kpis()),
+        'analytics.regional_analysis': (lambda d: AnalyticsService(fresh(d)), lambda a: a.regional_analysis()),
+        'analytics.product_analysis': (lambda d: AnalyticsService(fresh(d)), lambda a: a.product_analysis()),
+        'analytics.time_series_analysis': (lambda d: AnalyticsService(fresh(d)), lambda a: a.time_series_analysis()),
+        'analytics.customer_analysis': (lambda d: AnalyticsService(fresh(d)), lambda a: a.customer_analysis()),
+        'ml.train_sales_prediction_model': (
+            lambda d: (MLService(registry=new_registry()), fresh(d)['sales']),
+            lambda s: s[0].train_sales_prediction_model(s[1])
+        ),
+        'ml.predict_sales': (
+            lambda d: (trained(fresh(d), new_registry().root), d['sales']),
+            lambda s: s[0].predict_sales(s[1], forecast_days=30)
+        ),
+        'ml.detect_anomalies': (
+            lambda d: (MLService(registry=new_registry()), fresh(d)['sales']),
+            lambda s: s[0].detect_anomalies(s[1])
+        ),
+        'ml.customer_segmentation': (
+            lambda d: (MLService(registry=new_registry()), fresh(d)),
+            lambda s: s[0].customer_segmentation(s[1]['customers'], s[1]['sales'])
+        ),
+        'forecast.simple_linear_forecast': (
+            lambda d: DataProcessor(fresh(d)).cube.daily()['revenue'],
+            lambda daily: simple_linear_forecast(daily, periods=30)
+        ),
+        'chat.local_answer': (
+            lambda d: DataProcessor(fresh(d)),
+            lambda p: [local_answer(q, p.data, p) for q in QUESTIONS]
+        )
+    }
+
+def measure(setup, run, data, repeat):
+    walls = []
+    for _ in range(repeat):
+        state = setup(data)
+        start = time.perf_counter()
+        result = run(state)
+        walls.append(time.perf_counter() - start)
+        if isinstance(result, dict) and 'error' in result:
+            raise RuntimeError(result['error'])
+    # Memory is measured in its own run, tracemalloc slows the code it traces
+    state = setup(data)
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    try:
+        run(state)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'wall_s': statistics.median(walls),
+        'wall_min_s': min(walls),
+        'repeat': repeat,
+        'peak_mb': peak / 2 ** 20,
+        'alloc_blocks': sys.getallocatedblocks() - blocks
+    }
+
+def environment():
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__
+    }
+
+def run_suite(scales, selected=None, repeat=3):
+    results = {}
+    with tempfile.TemporaryDirectory() as registry_dir:
+        suite = cases(registry_dir)
+        for scale in scales:
+            data = make_dataset(SCALES[scale])
+            for name, (setup, run) in suite.items():
+                if selected and not any(name.startswith(s) for s in selected):
+                    continue
+                key = f'{name}@{scale}'
+                try:
+                    results[key] = {'rows': SCALES[scale], **measure(setup, run, data, repeat)}
+                    r = results[key]
+                    print(f"{key:45} {r['wall_s'] * 1000:10.1f} ms  {r['peak_mb']:9.1f} MB peak", flush=True)
+                except Exception as e:
+                    results[key] = {'rows': SCALES[scale], 'error': str(e)}
+                    print(f'{key:45} failed: {e}', flush=True)
+    return {'environment': environment(), 'results': results}
+
+def compare(current, baseline, threshold=1.25, min_wall_s=0.005):
+    """Cases whose wall time or peak memory grew by more than threshold x the baseline"""
+    regressions = []
+    print(f"\n{'case':45} {'wall':>8} {'peak':>8}")
+    for key, now in current['results'].items():
+        before = baseline['results'].get(key)
+        if before is None or 'error' in now or 'error' in before:
+            continue
+        # Best-of-N is steadier than the median on a busy machine
+        wall = now['wall_min_s'] / before['wall_min_s'] if before['wall_min_s'] else float('inf')
+        peak = now['peak_mb'] / before['peak_mb'] if before['peak_mb'] else 1.0
+        slower = wall > threshold and now['wall_min_s'] >= min_wall_s
+        hungrier = peak > threshold and now['peak_mb'] >= 1
+        flag = '  REGRESSION' if slower or hungrier else ''
+        print(f'{key:45} {wall:7.2f}x {peak:7.2f}x{flag}')
+        if flag:
+            regressions.append(key)
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', default='10k,1m,10m', help=f"comma-separated, from {', '.join(SCALES)}")
+    parser.add_argument('--only', default='', help='comma-separated case name prefixes, e.g. analytics,ml.predict')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save', help='write the results as a JSON baseline')
+    parser.add_argument('--compare', help='baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25, help='allowed slowdown/memory growth ratio')
+    args = parser.parse_args()
+    scales = [s.strip().lower() for s in args.scales.split(',') if s.strip()]
+    unknown = [s for s in scales if s not in SCALES]
+    if unknown:
+        parser.error(f"unknown scale(s): {', '.join(unknown)}")
+    report = run_suite(scales, [s for s in args.only.split(',') if s], args.repeat)
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
@@ -3,29 +3,16 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import os
+from services.context_builder import ContextBuilder
+from services.llm_cache import default_llm_cache
+from services.query_engine import get_query_engine
+from utils.result_cache import dataset_fingerprint
 
 def local_answer(question, data, processor):
-    q = question.lower()
-    sales = data.get('sales')
-    if sales is None or len(sales)==0:
+    df = processor.sales
+    if df is None or len(df)==0:
         return "No sales data available."
-    df = sales.copy()
-    df['date'] = pd.to_datetime(df['date'])
-    if 'highest' in q and 'month' in q:
-        monthly = df.groupby(df['date'].dt.to_period('M'))['total_amount'].sum()
-        top = monthly.idxmax(), monthly.max()
-        return f"Highest month was {top[0].strftime('%Y-%m')} with revenue {top[1]:.2f}"
-    if 'top' in q and 'product' in q:
-        if 'product_id' in df.columns:
-            p = df.groupby('product_id')['total_amount'].sum().sort_values(ascending=False).head(5)
-            return 'Top products (by revenue):\n' + p.to_string()
-        return 'No product_id column found in data.'
-    if 'total revenue' in q or 'total sales' in q:
-        total = df['total_amount'].sum()
-        return f'Total revenue: {total:.2f}'
-    if 'average order' in q or 'aov' in q:
-        return f'Average order value: {df["total_amount"].mean():.2f}'
-    return 'Sorry — I could not parse the question. Try phrases like "highest month", "top product", "total revenue".'
+    return get_query_engine(df).answer(question)
 
 def render_ai_chat(data, processor):
     st.header('🤖 AI Chat (Local + Optional OpenAI)')
@@ -39,16 +26,30 @@ def render_ai_chat(data, processor):
             use_openai = True
         except Exception as e:
             st.warning('OpenAI package not installed or failed to import; will use local parser.')
-    q = st.text_input('Ask a question (examples: "highest month", "top product", "total revenue")')
+    q = st.text_input('Ask a question (examples: "highest month", "top 3 regions by orders last 90 days", "revenue growth last month")')
     if st.button('Ask') and q:
         if use_openai:
             try:
-                # create a short context from data summary
-                summary = processor.get_data_summary()
-                prompt = f"""You are a helpful assistant answering questions about a sales dataset. Summary: {summary}. Question: {q}"""
-                import openai
-                resp = openai.Completion.create(model='text-davinci-003', prompt=prompt, max_tokens=200)
-                st.write(resp.choices[0].text.strip())
+                # compact context from precomputed aggregates, bounded by a token budget
+                if processor.sales is not None and len(processor.sales):
+                    context = ContextBuilder(processor.sales).build(q)
+                    summary = context['text']
+                    st.caption(f"Context: {context['tokens']} tokens / {context['chars']} chars "
+                               f"(budget {context['token_budget']}; sections: {', '.join(context['sections'])})")
+                else:
+                    summary = processor.get_data_summary()
+                prompt = f"""You are a helpful assistant answering questions about a sales dataset. Context:\n{summary}\nQuestion: {q}"""
+                fingerprint = dataset_fingerprint(processor.sales) if processor.sales is not None else None
+                key = default_llm_cache.make_key('text-davinci-003', '', prompt, fingerprint)
+                answer = default_llm_cache.get(key)
+                if answer is None:
+                    import openai
+                    resp = openai.Completion.create(model='text-davinci-003', prompt=prompt, max_tokens=200)
+                    answer = resp.choices[0].text.strip()
+                    default_llm_cache.put(key, answer, 'text-davinci-003')
+                else:
+                    st.caption('⚡ Served from cache (same question on unchanged data)')
+                st.write(answer)
             except Exception as e:
                 st.error(f'OpenAI call failed: {e}')
                 st.write(local_answer(q, data, processor))
@@ -1,14 +1,25 @@
-
 import streamlit as st
 import pandas as pd
+from services.anomaly_service import follow_sales
+
+def streaming_detector(sales):
+    # Keep one detector per session; rows appended since the last run are the only ones scored
+    st.session_state.anomaly_stream = follow_sales(st.session_state.get('anomaly_stream'), sales)
+    return st.session_state.anomaly_stream['detector']
+
 def render_anomaly_detection(data, processor):
     st.header('🚨 Anomaly Detection')
     df = processor.filter_data_by_date()
     if df.empty:
         st.info('No sales data')
         return
-    # simple anomaly: orders with total_amount > mean + 3*std
-    thresh = df['total_amount'].mean() + 3*df['total_amount'].std()
-    anomalies = df[df['total_amount'] > thresh]
-    st.write(f'Found {len(anomalies)} anomalies (amount > {thresh:.2f})')
-    st.dataframe(anomalies.head(50))
+    detector = streaming_detector(df)
+    # orders with total_amount > running mean + 3*std of the orders seen before them
+    anomalies = detector.flagged_orders
+    st.write(f'Found {detector.flagged_total} anomalies (amount > {detector.order_threshold:.2f})')
+    if len(anomalies):
+        st.caption(f'Latest {min(50, len(anomalies))} flagged orders')
+    st.dataframe(anomalies.tail(50))
+    days = detector.anomalies()
+    st.write(f'Anomalous days: {len(days)} of {len(detector.day_results)}')
+    st.dataframe(days.tail(50))
@@ -2,54 +2,72 @@
 import streamlit as st
 import plotly.express as px
 import pandas as pd
-import io
+from utils.downsample import DEFAULT_MAX_POINTS, METHODS, chart_points
+from utils.export import EXPORT_FORMATS, available_formats, default_export_cache
+from utils.filter_index import filter_key, get_filter_index
+from utils.result_cache import dataset_fingerprint
 
 def render_dashboard(data, processor):
     st.header('📊 Dashboard (Improved)')
-    sales = data.get('sales')
-    if sales is None or len(sales)==0:
+    df = processor.sales
+    if df is None or len(df)==0:
         st.warning('No sales data. Upload data or use sample.')
         return
-    df = sales.copy()
-    df['date'] = pd.to_datetime(df['date'])
-    # Filters
+    # Filters (option lists and row selection come from the per-dataset filter index)
+    index = get_filter_index(df)
     with st.sidebar.expander('Filters', expanded=False):
-        min_date = df['date'].min().date()
-        max_date = df['date'].max().date()
+        min_date, max_date = index.date_range()
         start = st.date_input('Start date', min_date)
         end = st.date_input('End date', max_date)
         product = None
-        if 'product_id' in df.columns:
-            product = st.multiselect('Product', options=sorted(df['product_id'].unique().tolist()))
+        if 'product_id' in index.options:
+            product = st.multiselect('Product', options=index.options['product_id'])
         region = None
-        if 'region' in df.columns:
-            region = st.multiselect('Region', options=sorted(df['region'].unique().tolist()))
+        if 'region' in index.options:
+            region = st.multiselect('Region', options=index.options['region'])
+        # narrowing the date range zooms in; the point budget then covers it at full resolution
+        resolution = st.selectbox('Chart resolution', list(METHODS), help=f'Charts are reduced to about {DEFAULT_MAX_POINTS} points unless Full is chosen')
     # apply filters
-    mask = (df['date'].dt.date >= start) & (df['date'].dt.date <= end)
-    if product:
-        mask &= df['product_id'].isin(product)
-    if region:
-        mask &= df['region'].isin(region)
-    filtered = df[mask]
-    # KPIs
-    total_rev = filtered['total_amount'].sum()
-    total_orders = len(filtered)
-    aov = filtered['total_amount'].mean() if total_orders>0 else 0
+    filtered = index.rows(start=start, end=end, product_id=product, region=region)
+    # KPIs and charts come from the rollup cube, the raw rows are only used for the table/export
+    cube = processor.cube
+    filters = {'product_id': product, 'region': region}
+    totals = cube.totals(start=start, end=end, **filters)
+    total_rev = totals['revenue']
+    total_orders = int(totals['orders'])
+    aov = total_rev / total_orders if total_orders>0 else 0
     col1, col2, col3 = st.columns(3)
     col1.metric('Total Revenue', f'₹{total_rev:,.2f}')
     col2.metric('Total Orders', f'{total_orders}')
     col3.metric('Avg Order Value', f'₹{aov:,.2f}')
     # Charts
-    daily = filtered.groupby(filtered['date'].dt.date)['total_amount'].sum().reset_index().rename(columns={'date':'day'})
+    daily, n_days = chart_points(
+        df, ('daily', filter_key(start, end, **filters)),
+        lambda: cube.rollup('D', start=start, end=end, **filters)['revenue'].reset_index().rename(columns={'date':'day', 'revenue':'total_amount'}),
+        x='day', y='total_amount', method=METHODS[resolution]
+    )
     fig = px.line(daily, x='day', y='total_amount', title='Daily Sales')
     st.plotly_chart(fig, use_container_width=True)
-    if 'product_id' in filtered.columns:
-        prod = filtered.groupby('product_id')['total_amount'].sum().reset_index().sort_values('total_amount', ascending=False).head(10)
+    if len(daily) < n_days:
+        st.caption(f'Showing {len(daily)} of {n_days} points ({resolution})')
+    if 'product_id' in cube.dimensions:
+        prod = cube.rollup(by=['product_id'], start=start, end=end, **filters)['revenue'].rename('total_amount').reset_index().sort_values('total_amount', ascending=False).head(10)
         fig2 = px.bar(prod, x='product_id', y='total_amount', title='Top Products')
         st.plotly_chart(fig2, use_container_width=True)
-    # Export filtered data
-    buf = io.BytesIO()
-    filtered.to_csv(buf, index=False)
-    buf.seek(0)
-    st.download_button('Download filtered CSV', data=buf, file_name='filtered_sales.csv', mime='text/csv')
+    # Export filtered data: written in chunks only when requested, then reused while the filters stay the same
+    with st.expander('Export filtered data'):
+        fmt = st.radio('Format', available_formats(), horizontal=True)
+        fingerprint = dataset_fingerprint(df)
+        key = filter_key(start, end, **filters)
+        path = default_export_cache.get(fingerprint, key, fmt)
+        if path is None and st.button(f'Prepare {fmt} export ({len(filtered)} rows)'):
+            with st.spinner('Writing export...'):
+                try:
+                    path = default_export_cache.export(filtered, fingerprint, key, fmt)
+                except Exception as e:
+                    st.error(f'Export failed: {e}')
+        if path is not None:
+            spec = EXPORT_FORMATS[fmt]
+            with open(path, 'rb') as f:
+                st.download_button(f'Download filtered {fmt}', data=f, file_name=f"filtered_sales.{spec['extension']}", mime=spec['mime'], on_click='ignore')
     st.dataframe(filtered.head(200))
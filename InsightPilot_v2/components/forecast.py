@@ -4,6 +4,8 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 from datetime import timedelta
+from services.forecast_service import forecast_segments
+from utils.downsample import METHODS, chart_points
 
 def simple_linear_forecast(series, periods=30):
     # series: pd.Series with datetime index and numeric values
@@ -16,26 +18,37 @@ def simple_linear_forecast(series, periods=30):
     A = np.vstack([x, np.ones(len(x))]).T
     m, c = np.linalg.lstsq(A, y, rcond=None)[0]
     last = s.index.max().toordinal()
-    future_dates = [pd.to_datetime(t) for t in [ (last + i) for i in range(1, periods+1) ]]
+    future_dates = [pd.Timestamp.fromordinal(last + i) for i in range(1, periods+1)]
     preds = [m*d.toordinal() + c for d in future_dates]
     return pd.Series(preds, index=future_dates)
 
 def render_forecast(data, processor):
     st.header('🔮 Forecast: Simple Linear Forecast Demo')
-    sales = data.get('sales')
-    if sales is None or len(sales)==0:
+    df = processor.sales
+    if df is None or len(df)==0:
         st.warning('No sales data available. Upload data or use sample data.')
         return
-    df = sales.copy()
-    df['date'] = pd.to_datetime(df['date'])
-    daily = df.groupby('date')['total_amount'].sum().sort_index()
+    daily = processor.cube.daily()['revenue']
     periods = st.sidebar.number_input('Forecast periods (days)', min_value=7, max_value=365, value=30)
     forecast = simple_linear_forecast(daily, periods=periods)
     if forecast is None:
         st.info('Not enough data to forecast.')
         return
-    chart_df = pd.concat([daily, forecast.rename('forecast')], axis=0)
-    fig = px.line(x=chart_df.index, y=chart_df.values, labels={'x':'date','y':'amount'}, title='Sales + Forecast (simple linear)')
+    resolution = st.sidebar.selectbox('Chart resolution', list(METHODS), key='forecast_resolution')
+    # forecast points are always plotted, only the history is downsampled
+    chart_df, n_points = chart_points(
+        df, ('forecast', periods),
+        lambda: pd.DataFrame({'amount': pd.concat([daily, forecast.rename('forecast')], axis=0),
+                              'is_forecast': [False] * len(daily) + [True] * len(forecast)}),
+        x=None, y='amount', method=METHODS[resolution], keep='is_forecast'
+    )
+    fig = px.line(x=chart_df.index, y=chart_df['amount'].values, labels={'x':'date','y':'amount'}, title='Sales + Forecast (simple linear)')
     st.plotly_chart(fig, use_container_width=True)
+    if len(chart_df) < n_points:
+        st.caption(f'Showing {len(chart_df)} of {n_points} points ({resolution})')
     st.write('Forecast (next rows):')
     st.dataframe(forecast.head(20).rename('predicted_amount').reset_index().rename(columns={'index':'date'}))
+    if processor.cube.dimensions and st.checkbox('Forecast every segment (' + ' × '.join(processor.cube.dimensions) + ')'):
+        segments = forecast_segments(df, periods=periods)
+        st.write(f'{len(segments.drop_duplicates(processor.cube.dimensions))} segment forecasts')
+        st.dataframe(segments.head(200))
@@ -0,0 +1,21 @@
+import os
+import streamlit as st
+
+def tracing_enabled():
+    return st.session_state.get('trace_enabled', os.getenv('INSIGHTPILOT_TRACE', '') not in ('', '0'))
+
+def render_performance_panel(tracer):
+    with st.sidebar.expander('⏱ Performance', expanded=False):
+        st.checkbox('Record timings', key='trace_enabled', value=tracing_enabled(), help='Takes effect on the next rerun')
+        if not tracer.enabled:
+            st.caption('Timing is off.')
+            return
+        if not tracer.spans:
+            st.caption('No spans recorded in this rerun.')
+            return
+        total = sum(s['wall_ms'] for s in tracer.spans if s['depth'] == 0)
+        st.caption(f'Last rerun: {total:.0f} ms in {len(tracer.spans)} spans')
+        st.dataframe(tracer.to_frame(), hide_index=True)
+        st.caption('peak_rss_delta_mb is the growth of the process-wide peak RSS: 0 unless the span set a new peak.')
+        st.download_button('Export JSON', data=tracer.to_json(), file_name='insightpilot_trace.json', mime='application/json', on_click='ignore')
+        st.download_button('Export Chrome trace', data=tracer.to_chrome_trace(), file_name='insightpilot_trace.chrome.json', mime='application/json', on_click='ignore', help='Open in chrome://tracing or ui.perfetto.dev')
@@ -1,6 +1,11 @@
 
 import streamlit as st
+from services.report_store import precomputed
 def render_predictions(data, processor):
     st.header('📈 Predictive Analytics')
     st.write('Basic growth metrics:')
-    st.json(processor.calculate_growth_metrics())
+    st.json(precomputed(processor.sales, 'growth_metrics') or processor.calculate_growth_metrics())
+    forecast = precomputed(processor.sales, 'sales_forecast')
+    if forecast is not None:
+        st.write('Sales forecast (precomputed by the batch runner):')
+        st.line_chart(forecast.set_index('date')['predicted_revenue'])
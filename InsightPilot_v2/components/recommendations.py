@@ -1,8 +1,9 @@
 
 import streamlit as st
+from services.report_store import precomputed
 def render_recommendations(data, processor):
     st.header('💡 Smart Recommendations')
-    growth = processor.calculate_growth_metrics().get('monthly_growth_pct')
+    growth = (precomputed(processor.sales, 'growth_metrics') or processor.calculate_growth_metrics()).get('monthly_growth_pct')
     if growth is None:
         st.write('Not enough data to recommend.')
         return
@@ -0,0 +1,32 @@
+import datetime
+import pandas as pd
+import streamlit as st
+from services.report_store import default_report_store
+from utils.result_cache import dataset_fingerprint
+
+def render_reports(data, processor):
+    st.header('📑 Precomputed Reports')
+    df = processor.sales
+    if df is None or len(df)==0:
+        st.warning('No sales data available.')
+        return
+    fingerprint = dataset_fingerprint(df)
+    versions = default_report_store.versions(fingerprint)
+    if not versions:
+        st.info('No precomputed report for this dataset yet. Generate one with '
+                '`python scripts/run_batch_reports.py --sample` (or `--sales <file>` for uploaded data).')
+        return
+    labels = {m['version']: f"{m['version']} · {datetime.datetime.fromtimestamp(m['created']):%Y-%m-%d %H:%M}" for m in versions}
+    version = st.selectbox('Report version', list(labels), format_func=labels.get)
+    manifest = next(m for m in versions if m['version'] == version)
+    st.caption(f"{manifest['rows']} rows · {len(manifest['artifacts'])} artifacts · computed in {manifest['seconds']:.1f}s on {manifest['workers']} workers")
+    failed = {name: task['error'] for name, task in manifest['tasks'].items() if task['error']}
+    for name, error in failed.items():
+        st.error(f'{name}: {error}')
+    name = st.selectbox('Artifact', sorted(manifest['artifacts']))
+    artifact = default_report_store.load(fingerprint, name, version)
+    if isinstance(artifact, pd.DataFrame):
+        st.write(f'{len(artifact)} rows')
+        st.dataframe(artifact.head(500))
+    else:
+        st.json(artifact)
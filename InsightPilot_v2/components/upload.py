@@ -28,9 +28,12 @@ def render_upload(data, processor):
             st.success(f'Loaded {len(df)} rows from {uploaded.name}')
             st.dataframe(df.head(10))
             if st.button('Use this data as sales dataset'):
-                # replace sales in global data
-                data['sales'] = df
+                # replace sales in global data (normalized once here)
                 processor.data = data
+                processor.set_sales(df)
+                st.experimental_rerun()
+            if processor.sales is not None and st.button('Append to current sales dataset'):
+                processor.append_sales(df)
                 st.experimental_rerun()
         except Exception as e:
             st.error(f'Failed to load file: {e}')
@@ -1,40 +1,110 @@
-
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
+from utils.data_processor import normalize_sales
+
+REGIONS = ['North','South','East','West']
+CATEGORIES = ['Electronics','Home','Clothing','Sports','Books']
+CUSTOMER_SEGMENTS = ['Consumer','Small Business','Enterprise']
 
 def load_sample_data(num_days=90):
-    np.random.seed(42)
-    today = datetime.now().date()
-    dates = [today - timedelta(days=i) for i in range(num_days)][::-1]
-    sales = []
-    products = [{'product_id': f'P{i:03}', 'name': f'Product {i}'} for i in range(1,6)]
-    customers = [{'customer_id': f'C{i:03}', 'name': f'Customer {i}'} for i in range(1,11)]
-    regions = ['North','South','East','West']
-    for d in dates:
-        for _ in range(np.random.randint(3,8)):
-            prod = np.random.choice(products)
-            cust = np.random.choice(customers)
-            amount = round(np.random.uniform(50, 1500),2)
-            qty = np.random.randint(1,10)
-            sales.append({
-                'date': pd.to_datetime(d),
-                'product_id': prod['product_id'],
-                'customer_id': cust['customer_id'],
-                'region': np.random.choice(regions),
-                'quantity': qty,
-                'total_amount': round(amount*qty,2)
-            })
-    sales_df = pd.DataFrame(sales)
-    customers_df = pd.DataFrame(customers)
-    products_df = pd.DataFrame(products)
-    regions_df = pd.DataFrame([{'region': r} for r in regions])
-    expenses_df = pd.DataFrame([{'date': pd.to_datetime(today - timedelta(days=i)),
-                                 'amount': round(np.random.uniform(200,2000),2)} for i in range(0,30)])
+    # Small demo dataset (about five orders a day) used when the app starts; it ends today
+    return generate_business_data(num_orders=num_days * 5, num_days=num_days, num_products=5, num_customers=10)
+
+def generate_business_data(num_orders=100_000, num_days=365, num_products=50, num_customers=1_000,
+                           regions=REGIONS, categories=CATEGORIES, segments=CUSTOMER_SEGMENTS,
+                           trend=0.1, weekly_seasonality=0.15, yearly_seasonality=0.2,
+                           anomaly_rate=0.002, popularity_skew=1.1, end_date=None,
+                           seed=42, chunk_size=1_000_000):
+    """Synthetic sales data with the full schema, generated with vectorized numpy.
+
+    Orders per day follow a linear ``trend`` (growth over the whole period) times
+    weekly and yearly seasonal waves; products and customers are drawn with Zipf-like
+    popularity; ``anomaly_rate`` of the orders get a 5-15x amount spike and their
+    sale_ids are returned as ``injected_anomalies``. Rows are generated in chunks of
+    ``chunk_size``, each from its own child of ``seed``. The data ends on ``end_date``,
+    today by default: the same arguments reproduce the same dataset only with an
+    explicit ``end_date``; otherwise the dates, and with them the dataset
+    fingerprint and every result, model and report cached on it, move daily.
+    """
+    seeds = np.random.SeedSequence(seed)
+    master = np.random.default_rng(seeds.spawn(1)[0])
+    end = pd.Timestamp(end_date or datetime.now().date())
+    days = pd.date_range(end=end, periods=num_days, freq='D').as_unit('ns')
+
+    # Dimension tables
+    product_ids = np.array([f'P{i:03}' for i in range(1, num_products + 1)])
+    unit_price = np.round(np.exp(master.normal(5, 0.8, num_products)).clip(5, 5000), 2)
+    products_df = pd.DataFrame({
+        'product_id': product_ids,
+        'product_name': [f'Product {i}' for i in range(1, num_products + 1)],
+        'category': np.asarray(categories)[master.integers(0, len(categories), num_products)],
+        'unit_price': unit_price,
+        'cost': np.round(unit_price * master.uniform(0.4, 0.8, num_products), 2)
+    })
+    customer_ids = np.array([f'C{i:03}' for i in range(1, num_customers + 1)])
+    customer_region = master.integers(0, len(regions), num_customers)
+    customers_df = pd.DataFrame({
+        'customer_id': customer_ids,
+        'customer_name': [f'Customer {i}' for i in range(1, num_customers + 1)],
+        'customer_segment': np.asarray(segments)[master.choice(len(segments), num_customers, p=_segment_mix(len(segments)))],
+        'region': np.asarray(regions)[customer_region],
+        'signup_date': days[0] - pd.to_timedelta(master.integers(0, 730, num_customers), unit='D')
+    })
+
+    # Orders per day: trend x weekly x yearly seasonality, then one multinomial draw
+    t = np.linspace(0, 1, num_days)
+    intensity = (1 + trend * t) \
+        * (1 + weekly_seasonality * np.sin(2 * np.pi * days.dayofweek.to_numpy() / 7)) \
+        * (1 + yearly_seasonality * np.sin(2 * np.pi * (days.dayofyear.to_numpy() - 80) / 365.25))
+    per_day = master.multinomial(num_orders, intensity / intensity.sum())
+    day_of_row = np.repeat(np.arange(num_days), per_day)
+
+    product_p = _zipf(num_products, popularity_skew)
+    customer_p = _zipf(num_customers, popularity_skew)
+    product_codes = np.empty(num_orders, dtype=np.int32)
+    customer_codes = np.empty(num_orders, dtype=np.int32)
+    quantity = np.empty(num_orders, dtype=np.int16)
+    price_factor = np.empty(num_orders)
+    spike = np.ones(num_orders)
+    for chunk_seed, lo in zip(seeds.spawn((num_orders + chunk_size - 1) // chunk_size), range(0, num_orders, chunk_size)):
+        rng = np.random.default_rng(chunk_seed)
+        n = min(chunk_size, num_orders - lo)
+        product_codes[lo:lo + n] = rng.choice(num_products, n, p=product_p)
+        customer_codes[lo:lo + n] = rng.choice(num_customers, n, p=customer_p)
+        quantity[lo:lo + n] = (1 + rng.poisson(2, n)).clip(1, 20)
+        price_factor[lo:lo + n] = rng.uniform(0.9, 1.05, n)
+        injected = rng.random(n) < anomaly_rate
+        spike[lo:lo + n][injected] = rng.uniform(5, 15, injected.sum())
+
+    sale_price = np.round(unit_price[product_codes] * price_factor, 2)
+    sales_df = pd.DataFrame({
+        'sale_id': np.arange(1, num_orders + 1),
+        'date': days[day_of_row],
+        'product_id': pd.Categorical.from_codes(product_codes, categories=product_ids),
+        'customer_id': pd.Categorical.from_codes(customer_codes, categories=customer_ids),
+        'region': pd.Categorical.from_codes(customer_region[customer_codes], categories=regions),
+        'quantity': quantity,
+        'unit_price': sale_price,
+        'total_amount': np.round(sale_price * quantity * spike, 2)
+    })
+    expenses_df = pd.DataFrame({
+        'date': days[-min(30, num_days):],
+        'amount': np.round(master.uniform(200, 2000, min(30, num_days)) * max(1, num_orders / (num_days * 5)) ** 0.5, 2)
+    })
     return {
-        'sales': sales_df,
+        'sales': normalize_sales(sales_df),
         'customers': customers_df,
         'products': products_df,
-        'regions': regions_df,
-        'expenses': expenses_df
+        'regions': pd.DataFrame({'region': regions}),
+        'expenses': expenses_df,
+        'injected_anomalies': sales_df.loc[spike > 1, ['sale_id']].reset_index(drop=True)
     }
+
+def _zipf(n, skew):
+    weights = 1 / np.arange(1, n + 1) ** skew
+    return weights / weights.sum()
+
+def _segment_mix(n):
+    weights = np.arange(n, 0, -1, dtype=float)
+    return weights / weights.sum()
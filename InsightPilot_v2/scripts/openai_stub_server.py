@@ -0,0 +1,64 @@
+"""Local stand-in for the OpenAI chat completions API.
+
+Serves POST /v1/chat/completions with a canned JSON answer after an optional delay,
+and can fail a share of requests with HTTP 500 to exercise retries. Point AIService or
+AsyncAIService at it (tests/test_async_ai_service.py starts it on a free port) with
+
+    python scripts/openai_stub_server.py --port 8765 --delay 0.5
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub python your_script.py
+"""
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def make_handler(delay, fail_rate):
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            time.sleep(delay)
+            if random.random() < fail_rate:
+                return self._send(500, {'error': {'message': 'stub failure', 'type': 'server_error'}})
+            user = next((m['content'] for m in reversed(body.get('messages', [])) if m.get('role') == 'user'), '')
+            content = json.dumps({'analysis': 'stub response', 'echo_chars': len(user)})
+            self._send(200, {
+                'id': 'chatcmpl-stub',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': body.get('model', 'stub'),
+                'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': content}}],
+                'usage': {'prompt_tokens': len(user) // 4, 'completion_tokens': len(content) // 4, 'total_tokens': (len(user) + len(content)) // 4}
+            })
+
+        def _send(self, status, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            try:
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client gave up (timeout or cancellation)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+def serve(host='127.0.0.1', port=8765, delay=0.0, fail_rate=0.0):
+    server = ThreadingHTTPServer((host, port), make_handler(delay, fail_rate))
+    server.daemon_threads = True
+    return server
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=0.0, help='seconds to wait before answering')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='share of requests answered with HTTP 500')
+    args = parser.parse_args()
+    server = serve(args.host, args.port, args.delay, args.fail_rate)
+    print(f'OpenAI stub listening on http://{args.host}:{args.port}/v1')
+    server.serve_forever()
@@ -0,0 +1,62 @@
+"""Precompute every report for a dataset, headless, on a process pool.
+
+Runs the KPI, regional, product, customer and time-series analyses, customer
+segmentation, anomaly detection and the sales/segment forecasts concurrently and
+saves the results as a versioned report (Parquet/JSON) that the app's Reports page
+loads instead of computing, e.g. from a nightly cron job:
+
+    python scripts/run_batch_reports.py --sales data/sales.csv --customers data/customers.csv
+    python scripts/run_batch_reports.py --sample --workers 4
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pandas as pd
+from data.sample_business_data import load_sample_data
+from services.batch_reports import TASKS, run_batch
+from services.report_store import ReportStore
+
+def read_table(path):
+    path = str(path)
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    if path.endswith(('.xlsx', '.xls')):
+        return pd.read_excel(path)
+    return pd.read_csv(path)
+
+def load_dataset(args):
+    if args.sample:
+        return load_sample_data()
+    # Same column inference as the Upload page, so the report matches the uploaded dataset
+    from components.upload import infer_sales_df
+    data = {'sales': infer_sales_df(read_table(args.sales))}
+    for name in ('customers', 'products'):
+        path = getattr(args, name)
+        if path:
+            data[name] = read_table(path)
+    return data
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--sales', help='sales table (CSV, Excel or Parquet)')
+    source.add_argument('--sample', action='store_true', help="use the app's sample dataset")
+    parser.add_argument('--customers', help='customers table for customer analysis and segmentation')
+    parser.add_argument('--products', help='products table for product analysis')
+    parser.add_argument('--tasks', default=','.join(TASKS), help=f"comma-separated, from {', '.join(TASKS)}")
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per task, up to the CPU count)')
+    parser.add_argument('--report-dir', default=None, help='report store directory (default INSIGHTPILOT_REPORT_DIR or .reports)')
+    args = parser.parse_args()
+    manifest = run_batch(
+        load_dataset(args),
+        tasks=[t.strip() for t in args.tasks.split(',') if t.strip()],
+        n_workers=args.workers,
+        store=ReportStore(args.report_dir)
+    )
+    failed = [name for name, task in manifest['tasks'].items() if task['error']]
+    print(f"Saved report {manifest['version']} for dataset {manifest['fingerprint']} "
+          f"({len(manifest['artifacts'])} artifacts, {manifest['seconds']:.1f}s)")
+    sys.exit(1 if failed else 0)
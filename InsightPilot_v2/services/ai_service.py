@@ -2,153 +2,124 @@ import os
 import json
 import pandas as pd
 from openai import OpenAI
+from services.context_builder import DEFAULT_TOKEN_BUDGET, bounded_json
+from services.llm_cache import default_llm_cache
+from utils.tracing import trace_methods
 
+# the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
+# do not change this unless explicitly requested by the user
+MODEL = "gpt-4o"
+
+# System prompt, user message template and error prefix for each kind of request
+PROMPTS = {
+    "query": {
+        "system": """You are a business analytics AI assistant.
+                        Analyze the user's query and data summary to provide actionable insights.
+                        Respond with JSON containing: analysis, key_findings (array), recommendations (array), and suggested_actions (array).
+                        Focus on specific, actionable insights based on the data provided.""",
+        "user": "Query: {query}\n\nData Summary: {payload}\n\nProvide insights in JSON format.",
+        "error": "Failed to process query"
+    },
+    "insights": {
+        "system": """You are a senior business analyst. Analyze the provided business metrics
+                        and generate strategic insights. Respond with JSON containing:
+                        overall_health (1-5 rating), key_insights (array), growth_opportunities (array),
+                        risk_factors (array), and strategic_recommendations (array).""",
+        "user": "Business Metrics: {payload}\n\nProvide strategic analysis in JSON format.",
+        "error": "Failed to generate insights"
+    },
+    "anomaly": {
+        "system": """You are a data anomaly expert. Analyze the anomaly data and suggest
+                        potential causes and recommended actions. Respond with JSON containing:
+                        severity (1-5), potential_causes (array), impact_assessment (string),
+                        recommended_actions (array).""",
+        "user": "Anomaly Data: {payload}\n\nAnalyze causes and suggest actions in JSON format.",
+        "error": "Failed to analyze anomaly"
+    },
+    "recommendations": {
+        "system": """You are a strategic business consultant. Based on the business context,
+                        generate actionable recommendations with priority levels and expected outcomes.
+                        Respond with JSON containing: recommendations array with fields: title, description,
+                        priority (High/Medium/Low), expected_impact, implementation_steps (array), timeline.""",
+        "user": "Business Context: {payload}\n\nGenerate strategic recommendations in JSON format.",
+        "error": "Failed to generate recommendations"
+    }
+}
+
+def prompt_payload(data, token_budget=DEFAULT_TOKEN_BUDGET):
+    """Text sent as the data part of a prompt; structured data is bounded to the token budget"""
+    return data if isinstance(data, str) else bounded_json(data, token_budget)
+
+def build_messages(kind, payload, query=None):
+    """Chat messages for one kind of request"""
+    prompt = PROMPTS[kind]
+    return [
+        {"role": "system", "content": prompt["system"]},
+        {"role": "user", "content": prompt["user"].format(query=query, payload=payload)}
+    ]
+
+@trace_methods('ai')
 class AIService:
     """Service for handling OpenAI interactions"""
-    
-    def __init__(self):
+
+    def __init__(self, cache=None, payload_token_budget=DEFAULT_TOKEN_BUDGET, timeout=30.0):
         self.api_key = os.getenv("OPENAI_API_KEY", "")
         if self.api_key:
-            self.client = OpenAI(api_key=self.api_key)
+            self.client = OpenAI(api_key=self.api_key, timeout=timeout)
         else:
             self.client = None
-    
+        self.cache = cache or default_llm_cache
+        self.payload_token_budget = payload_token_budget
+
     def is_available(self):
         """Check if OpenAI service is available"""
         return self.client is not None
-    
-    def process_natural_language_query(self, query, data_summary):
+
+    def process_natural_language_query(self, query, data_summary, fingerprint=None):
         """
         Process natural language query and convert to actionable insights
         """
-        if not self.is_available():
-            return {"error": "OpenAI API key not configured"}
-        
-        try:
-            # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
-            # do not change this unless explicitly requested by the user
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """You are a business analytics AI assistant. 
-                        Analyze the user's query and data summary to provide actionable insights.
-                        Respond with JSON containing: analysis, key_findings (array), recommendations (array), and suggested_actions (array).
-                        Focus on specific, actionable insights based on the data provided."""
-                    },
-                    {
-                        "role": "user", 
-                        "content": f"Query: {query}\n\nData Summary: {data_summary}\n\nProvide insights in JSON format."
-                    }
-                ],
-                response_format={"type": "json_object"}
-            )
-            
-            result = json.loads(response.choices[0].message.content)
-            return result
-            
-        except Exception as e:
-            return {"error": f"Failed to process query: {str(e)}"}
-    
-    def generate_business_insights(self, metrics_data):
+        return self._complete("query", prompt_payload(data_summary, self.payload_token_budget), query=query, fingerprint=fingerprint)
+
+    def generate_business_insights(self, metrics_data, fingerprint=None):
         """
         Generate AI-powered business insights from metrics
         """
-        if not self.is_available():
-            return {"error": "OpenAI API key not configured"}
-        
-        try:
-            # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
-            # do not change this unless explicitly requested by the user
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """You are a senior business analyst. Analyze the provided business metrics 
-                        and generate strategic insights. Respond with JSON containing: 
-                        overall_health (1-5 rating), key_insights (array), growth_opportunities (array), 
-                        risk_factors (array), and strategic_recommendations (array)."""
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Business Metrics: {json.dumps(metrics_data)}\n\nProvide strategic analysis in JSON format."
-                    }
-                ],
-                response_format={"type": "json_object"}
-            )
-            
-            result = json.loads(response.choices[0].message.content)
-            return result
-            
-        except Exception as e:
-            return {"error": f"Failed to generate insights: {str(e)}"}
-    
-    def analyze_anomaly_causes(self, anomaly_data):
+        return self._complete("insights", prompt_payload(metrics_data, self.payload_token_budget), fingerprint=fingerprint)
+
+    def analyze_anomaly_causes(self, anomaly_data, fingerprint=None):
         """
         Analyze potential causes of detected anomalies
         """
-        if not self.is_available():
-            return {"error": "OpenAI API key not configured"}
-        
-        try:
-            # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
-            # do not change this unless explicitly requested by the user
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """You are a data anomaly expert. Analyze the anomaly data and suggest 
-                        potential causes and recommended actions. Respond with JSON containing: 
-                        severity (1-5), potential_causes (array), impact_assessment (string), 
-                        recommended_actions (array)."""
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Anomaly Data: {json.dumps(anomaly_data)}\n\nAnalyze causes and suggest actions in JSON format."
-                    }
-                ],
-                response_format={"type": "json_object"}
-            )
-            
-            result = json.loads(response.choices[0].message.content)
-            return result
-            
-        except Exception as e:
-            return {"error": f"Failed to analyze anomaly: {str(e)}"}
-    
-    def generate_recommendations(self, business_context):
+        return self._complete("anomaly", prompt_payload(anomaly_data, self.payload_token_budget), fingerprint=fingerprint)
+
+    def generate_recommendations(self, business_context, fingerprint=None):
         """
         Generate smart business recommendations based on context
         """
+        return self._complete("recommendations", prompt_payload(business_context, self.payload_token_budget), fingerprint=fingerprint)
+
+    def _complete(self, kind, payload, query=None, fingerprint=None):
+        # Results carry "cached": True when served from the response cache
+        messages = build_messages(kind, payload, query)
+        key = self.cache.make_key(MODEL, messages[0]["content"], messages[1]["content"], fingerprint)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return {**cached, "cached": True}
+
         if not self.is_available():
             return {"error": "OpenAI API key not configured"}
-        
+
         try:
-            # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
-            # do not change this unless explicitly requested by the user
             response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """You are a strategic business consultant. Based on the business context,
-                        generate actionable recommendations with priority levels and expected outcomes.
-                        Respond with JSON containing: recommendations array with fields: title, description, 
-                        priority (High/Medium/Low), expected_impact, implementation_steps (array), timeline."""
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Business Context: {json.dumps(business_context)}\n\nGenerate strategic recommendations in JSON format."
-                    }
-                ],
+                model=MODEL,
+                messages=messages,
                 response_format={"type": "json_object"}
             )
-            
+
             result = json.loads(response.choices[0].message.content)
-            return result
-            
+            self.cache.put(key, result, MODEL)
+            return {**result, "cached": False}
+
         except Exception as e:
-            return {"error": f"Failed to generate recommendations: {str(e)}"}
+            return {"error": f"{PROMPTS[kind]['error']}: {str(e)}"}
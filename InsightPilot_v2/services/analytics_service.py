@@ -1,87 +1,131 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from services.segmentation import customer_table
+from utils.data_processor import normalize_sales
+from utils.compute_backend import GRAINS, Query, get_backend
+from utils.date_index import get_date_index
+from utils.result_cache import cached_result
+from utils.result_table import ResultTable
+from utils.star_schema import get_star_schema
+from utils.tracing import trace_methods
 
+# Time series levels: (result key, backend grain, period column)
+LEVELS = [
+    ('daily', 'day', 'date'),
+    ('weekly', 'week', 'week'),
+    ('monthly', 'month', 'month'),
+    ('quarterly', 'quarter', 'quarter'),
+    ('yearly', 'year', 'year')
+]
+
+@trace_methods('analytics')
 class AnalyticsService:
     """Service for business analytics and KPI calculations"""
     
-    def __init__(self, data):
+    def __init__(self, data, backend=None):
         self.data = data
+        self._backend = backend
+        if self.data.get('sales') is not None:
+            self.data['sales'] = normalize_sales(self.data['sales'])
+    
+    @property
+    def backend(self):
+        """Engine running the sales aggregations: a backend instance, a backend name or INSIGHTPILOT_BACKEND"""
+        if self._backend is None or isinstance(self._backend, str):
+            return get_backend(self.data['sales'], name=self._backend)
+        return self._backend
+    
+    @property
+    def date_index(self):
+        """Date-sorted view of the sales table with cumulative revenue"""
+        return get_date_index(self.data['sales'])
         
+    @property
+    def star_schema(self):
+        """Sales fact table keyed into the customer and product tables"""
+        return get_star_schema(self.data['sales'], self.data.get('customers'), self.data.get('products'))
+        
+    @cached_result()
     def calculate_kpis(self):
         """Calculate key performance indicators"""
         try:
-            sales_df = self.data['sales']
+            backend = self.backend
             customers_df = self.data['customers']
-            products_df = self.data['products']
+            overall = backend.run(Query({
+                'revenue': ('total_amount', 'sum'),
+                'orders': ('total_amount', 'size'),
+                'aov': ('total_amount', 'mean'),
+                'last_date': ('date', 'max')
+            })).iloc[0]
+            
+            def window(measure, start, end=None):
+                return backend.run(Query({'value': measure}, start=start, end=end))['value'].iloc[0]
             
             # Time periods
-            current_date = sales_df['date'].max()
+            current_date = overall['last_date']
             last_30_days = current_date - timedelta(days=30)
             last_90_days = current_date - timedelta(days=90)
             last_year = current_date - timedelta(days=365)
             
-            # Revenue metrics
-            total_revenue = sales_df['total_amount'].sum()
-            revenue_30d = sales_df[sales_df['date'] >= last_30_days]['total_amount'].sum()
-            revenue_90d = sales_df[sales_df['date'] >= last_90_days]['total_amount'].sum()
+            # Revenue metrics (on pandas: prefix-sum differences over binary-searched windows)
+            total_revenue = overall['revenue']
+            revenue_30d = float(window(('total_amount', 'sum'), last_30_days))
+            revenue_90d = float(window(('total_amount', 'sum'), last_90_days))
+            revenue_365d = float(window(('total_amount', 'sum'), last_year))
             
             # Customer metrics
             total_customers = len(customers_df)
-            active_customers_30d = len(sales_df[sales_df['date'] >= last_30_days]['customer_id'].unique())
+            active_customers_30d = int(window(('customer_id', 'nunique'), last_30_days))
             
             # Order metrics
-            total_orders = len(sales_df)
-            avg_order_value = sales_df['total_amount'].mean()
+            total_orders = int(overall['orders'])
+            avg_order_value = overall['aov']
             
             # Product metrics
-            top_products = (sales_df.groupby('product_id')['total_amount']
-                          .sum().sort_values(ascending=False).head(5))
+            top_products = (backend.run(Query({'revenue': ('total_amount', 'sum')}, by=['product_id']))
+                          .set_index('product_id')['revenue'].sort_values(ascending=False).head(5))
             
             # Growth rates
-            revenue_prev_30d = sales_df[
-                (sales_df['date'] >= last_30_days - timedelta(days=30)) & 
-                (sales_df['date'] < last_30_days)
-            ]['total_amount'].sum()
+            revenue_prev_30d = float(window(('total_amount', 'sum'), last_30_days - timedelta(days=30), last_30_days))
             
             revenue_growth_rate = ((revenue_30d - revenue_prev_30d) / revenue_prev_30d * 100) if revenue_prev_30d > 0 else 0
             
             return {
-                'total_revenue': round(total_revenue, 2),
+                'total_revenue': round(float(total_revenue), 2),
                 'revenue_30d': round(revenue_30d, 2),
                 'revenue_90d': round(revenue_90d, 2),
+                'revenue_365d': round(revenue_365d, 2),
                 'revenue_growth_rate': round(revenue_growth_rate, 2),
                 'total_customers': total_customers,
                 'active_customers_30d': active_customers_30d,
                 'total_orders': total_orders,
-                'avg_order_value': round(avg_order_value, 2),
+                'avg_order_value': round(float(avg_order_value), 2),
                 'top_products': top_products.to_dict()
             }
             
         except Exception as e:
             return {"error": f"KPI calculation failed: {str(e)}"}
     
+    @cached_result()
     def regional_analysis(self):
         """Analyze performance by region"""
         try:
             sales_df = self.data['sales']
             customers_df = self.data['customers']
+            backend = self.backend
             
-            # Merge sales with customer region data
-            sales_with_region = sales_df.merge(
-                customers_df[['customer_id', 'region']], 
-                on='customer_id', 
-                how='left'
-            )
-            
-            regional_metrics = sales_with_region.groupby('region').agg({
-                'total_amount': ['sum', 'mean', 'count'],
-                'customer_id': 'nunique'
-            }).round(2)
+            # Customer region data (unless the sales already carry a region) from the cached star schema view
+            if sales_df is not None and 'region' not in sales_df.columns:
+                sales_with_region = self.star_schema.view('customer', ['region'])
+                backend = get_backend(sales_with_region, name=backend.name)
             
-            regional_metrics.columns = [
-                'total_revenue', 'avg_order_value', 'total_orders', 'unique_customers'
-            ]
+            regional_metrics = backend.run(Query({
+                'total_revenue': ('total_amount', 'sum'),
+                'avg_order_value': ('total_amount', 'mean'),
+                'total_orders': ('total_amount', 'count'),
+                'unique_customers': ('customer_id', 'nunique')
+            }, by=['region'])).set_index('region').round(2)
             
             # Calculate revenue per customer
             regional_metrics['revenue_per_customer'] = (
@@ -93,26 +137,23 @@ class AnalyticsService:
         except Exception as e:
             return {"error": f"Regional analysis failed: {str(e)}"}
     
+    @cached_result()
     def product_analysis(self):
         """Analyze product performance"""
         try:
-            sales_df = self.data['sales']
             products_df = self.data['products']
             
             # Product performance metrics
-            product_metrics = sales_df.groupby('product_id').agg({
-                'total_amount': ['sum', 'mean'],
-                'quantity': 'sum',
-                'sale_id': 'count'
-            }).round(2)
-            
-            product_metrics.columns = ['total_revenue', 'avg_sale_amount', 'total_quantity', 'total_sales']
-            
-            # Merge with product details
-            product_analysis = product_metrics.merge(
-                products_df[['product_id', 'product_name', 'category', 'unit_price', 'cost']], 
-                on='product_id', 
-                how='left'
+            product_metrics = self.backend.run(Query({
+                'total_revenue': ('total_amount', 'sum'),
+                'avg_sale_amount': ('total_amount', 'mean'),
+                'total_quantity': ('quantity', 'sum'),
+                'total_sales': ('sale_id', 'count')
+            }, by=['product_id'])).set_index('product_id').round(2)
+            
+            # Product details resolved through the star schema's product keys
+            product_analysis = self.star_schema.enrich(
+                product_metrics.reset_index(), 'product', ['product_name', 'category', 'unit_price', 'cost']
             )
             
             # Calculate profit margins
@@ -128,7 +169,7 @@ class AnalyticsService:
             # Sort by total revenue
             product_analysis = product_analysis.sort_values('total_revenue', ascending=False)
             
-            return product_analysis.to_dict('records')
+            return ResultTable(product_analysis)
             
         except Exception as e:
             return {"error": f"Product analysis failed: {str(e)}"}
@@ -136,67 +177,37 @@ class AnalyticsService:
     def time_series_analysis(self):
         """Analyze trends over time"""
         try:
-            sales_df = self.data['sales']
+            measures = {
+                'revenue': ('total_amount', 'sum'),
+                'quantity': ('quantity', 'sum'),
+                'orders': ('total_amount', 'size')
+            }
             
-            # Daily trends
-            daily_trends = sales_df.groupby('date').agg({
-                'total_amount': 'sum',
-                'quantity': 'sum',
-                'sale_id': 'count'
-            }).reset_index()
-            
-            daily_trends.columns = ['date', 'daily_revenue', 'daily_quantity', 'daily_orders']
-            
-            # Weekly trends
-            sales_df['week'] = sales_df['date'].dt.to_period('W')
-            weekly_trends = sales_df.groupby('week').agg({
-                'total_amount': 'sum',
-                'quantity': 'sum',
-                'sale_id': 'count'
-            }).reset_index()
-            
-            weekly_trends['week'] = weekly_trends['week'].astype(str)
-            weekly_trends.columns = ['week', 'weekly_revenue', 'weekly_quantity', 'weekly_orders']
-            
-            # Monthly trends
-            sales_df['month'] = sales_df['date'].dt.to_period('M')
-            monthly_trends = sales_df.groupby('month').agg({
-                'total_amount': 'sum',
-                'quantity': 'sum',
-                'sale_id': 'count'
-            }).reset_index()
-            
-            monthly_trends['month'] = monthly_trends['month'].astype(str)
-            monthly_trends.columns = ['month', 'monthly_revenue', 'monthly_quantity', 'monthly_orders']
+            # Every level of the time pyramid (on pandas: days aggregated once, coarser levels re-aggregated)
+            trends = {}
+            for level, grain, label in LEVELS:
+                table = self.backend.run(Query(measures, grain=grain))
+                if grain != 'day':
+                    table['period'] = table['period'].dt.to_period(GRAINS[grain]).astype(str)
+                table.columns = [label, f'{level}_revenue', f'{level}_quantity', f'{level}_orders']
+                trends[level] = ResultTable(table)
             
-            return {
-                'daily': daily_trends.to_dict('records'),
-                'weekly': weekly_trends.to_dict('records'),
-                'monthly': monthly_trends.to_dict('records')
-            }
+            return trends
             
         except Exception as e:
             return {"error": f"Time series analysis failed: {str(e)}"}
     
+    @cached_result()
     def customer_analysis(self):
         """Analyze customer behavior and segments"""
         try:
-            sales_df = self.data['sales']
             customers_df = self.data['customers']
             
             # Customer lifetime value analysis
-            customer_metrics = sales_df.groupby('customer_id').agg({
-                'total_amount': ['sum', 'mean', 'count'],
-                'date': ['min', 'max']
-            }).reset_index()
-            
-            customer_metrics.columns = [
-                'customer_id', 'total_spent', 'avg_order_value', 
-                'order_count', 'first_purchase', 'last_purchase'
-            ]
+            customer_metrics = customer_table(self.data['sales'], self.backend)
             
-            # Merge with customer data
-            customer_analysis = customer_metrics.merge(customers_df, on='customer_id', how='left')
+            # Customer attributes resolved through the star schema's customer keys
+            customer_analysis = self.star_schema.enrich(customer_metrics, 'customer')
             
             # Calculate customer lifetime (days)
             customer_analysis['customer_lifetime_days'] = (
@@ -211,14 +222,14 @@ class AnalyticsService:
             }).round(2)
             
             # Regional customer analysis
-            regional_customer_analysis = customer_analysis.groupby('region').agg({
+            regional_customer_analysis = customer_analysis.groupby('region', observed=True).agg({
                 'total_spent': ['sum', 'mean'],
                 'order_count': 'mean',
                 'customer_id': 'count'
             }).round(2)
             
             return {
-                'customer_metrics': customer_analysis.to_dict('records'),
+                'customer_metrics': ResultTable(customer_analysis),
                 'segment_analysis': segment_analysis.to_dict('index'),
                 'regional_customer_analysis': regional_customer_analysis.to_dict('index')
             }
@@ -0,0 +1,193 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+from utils.result_cache import content_fingerprint
+from utils.tracing import traced
+
+DAILY_FEATURES = ['revenue', 'quantity', 'orders']
+
+class RunningStats:
+    """Welford running mean/variance over the columns of a 2-D array, merged batch by batch"""
+
+    def __init__(self, width):
+        self.count = 0
+        self.mean = np.zeros(width)
+        self.m2 = np.zeros(width)
+
+    def update(self, values):
+        n = len(values)
+        if n == 0:
+            return
+        values = np.asarray(values, dtype='float64').reshape(n, -1)
+        batch_mean = values.mean(axis=0)
+        batch_m2 = ((values - batch_mean) ** 2).sum(axis=0)
+        # Chan et al. parallel merge of two Welford states
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean = self.mean + delta * n / total
+        self.m2 = self.m2 + batch_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+
+    @property
+    def std(self):
+        if self.count < 2:
+            return np.full_like(self.mean, np.nan)
+        return np.sqrt(self.m2 / (self.count - 1))
+
+    def zscore(self, values):
+        values = np.asarray(values, dtype='float64').reshape(len(values), -1)
+        std = self.std
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(std > 0, (values - self.mean) / std, 0.0)
+
+class StreamingAnomalyDetector:
+    """Incremental anomaly detection that only scores newly arrived sales rows.
+
+    Daily revenue/quantity/order counts are scored against running statistics of all
+    earlier days plus an IsolationForest refreshed every ``refresh_every`` closed days.
+    The most recent day stays open (scored provisionally) until a later day arrives.
+    Order amounts are scored against running statistics of all earlier orders.
+    """
+
+    def __init__(self, z_threshold=3.0, refresh_every=30, forest_window=365,
+                 contamination=0.1, min_history=10, max_flagged_orders=500):
+        self.z_threshold = z_threshold
+        self.refresh_every = refresh_every
+        self.forest_window = forest_window
+        self.contamination = contamination
+        self.min_history = min_history
+        self.max_flagged_orders = max_flagged_orders
+        self.day_stats = RunningStats(len(DAILY_FEATURES))
+        self.order_stats = RunningStats(1)
+        self.history = np.empty((0, len(DAILY_FEATURES)))
+        self.forest = None
+        self.scaler = None
+        self.days_since_refresh = 0
+        self.open_day = None
+        self.rows_seen = 0
+        self.late_rows = 0
+        self.order_threshold = None
+        self.flagged_orders = pd.DataFrame()  # the latest max_flagged_orders of them
+        self.flagged_total = 0
+        self.day_results = pd.DataFrame()
+
+    @traced('anomaly.update')
+    def update(self, new_rows):
+        """Fold newly appended sales rows into the state and return the scored days they touched"""
+        if new_rows is None or len(new_rows) == 0:
+            return pd.DataFrame()
+        self.rows_seen += len(new_rows)
+        if self.open_day is not None:
+            late = new_rows['date'].dt.normalize() < self.open_date
+            self.late_rows += int(late.sum())
+            new_rows = new_rows[~late]
+            if len(new_rows) == 0:
+                return pd.DataFrame()
+        self._score_orders(new_rows)
+        days = self._aggregate_days(new_rows)
+        if days.empty:
+            return pd.DataFrame()  # only rows without a date: orders scored, no day touched
+        if self.open_day is not None:
+            days = pd.concat([self.open_day, days], ignore_index=True)
+            days = days.groupby('date', as_index=False)[DAILY_FEATURES].sum()
+        # Everything but the last day is final; the last day may still receive rows
+        closed, self.open_day = days.iloc[:-1], days.iloc[-1:]
+        bootstrap = self.day_stats.count < self.min_history
+        if bootstrap:
+            # Not enough history to score against yet: learn from the first batch and score it against itself
+            self._commit(closed)
+        scored = self._score_days(days)
+        if not bootstrap:
+            self._commit(closed)
+        scored['provisional'] = scored['date'] == self.open_date
+        if len(self.day_results):
+            self.day_results = self.day_results[~self.day_results['date'].isin(scored['date'])]
+        self.day_results = pd.concat([self.day_results, scored], ignore_index=True)
+        return scored
+
+    @property
+    def open_date(self):
+        return None if self.open_day is None else self.open_day['date'].iloc[0]
+
+    def anomalies(self):
+        """Every day flagged so far"""
+        if self.day_results.empty:
+            return self.day_results
+        return self.day_results[self.day_results['anomaly']]
+
+    def _aggregate_days(self, rows):
+        day = rows['date'].dt.normalize().rename('date')
+        grouped = rows.groupby(day)
+        days = pd.DataFrame({
+            'revenue': grouped['total_amount'].sum(),
+            'quantity': grouped['quantity'].sum() if 'quantity' in rows.columns else 0,
+            'orders': grouped.size()
+        }).astype('float64').reset_index()
+        return days
+
+    def _commit(self, closed):
+        if closed.empty:
+            return
+        values = closed[DAILY_FEATURES].to_numpy(dtype='float64')
+        self.day_stats.update(values)
+        self.history = np.vstack([self.history, values])[-self.forest_window:]
+        self.days_since_refresh += len(closed)
+        if self.forest is None or self.days_since_refresh >= self.refresh_every:
+            self._refresh_forest()
+
+    def _refresh_forest(self):
+        if len(self.history) < self.min_history:
+            return
+        self.scaler = StandardScaler().fit(self.history)
+        self.forest = IsolationForest(contamination=self.contamination, random_state=42)
+        self.forest.fit(self.scaler.transform(self.history))
+        self.days_since_refresh = 0
+
+    def _score_days(self, days):
+        scored = days.copy()
+        values = days[DAILY_FEATURES].to_numpy(dtype='float64')
+        z = self.day_stats.zscore(values)
+        scored['revenue_zscore'] = z[:, 0]
+        flagged = np.abs(z).max(axis=1) > self.z_threshold
+        if self.forest is not None:
+            scaled = self.scaler.transform(values)
+            scored['anomaly_score'] = self.forest.score_samples(scaled)
+            flagged |= self.forest.predict(scaled) == -1
+        else:
+            scored['anomaly_score'] = np.nan
+        scored['anomaly'] = flagged
+        return scored
+
+    def _score_orders(self, rows):
+        amounts = rows['total_amount'].to_numpy(dtype='float64')
+        if self.order_stats.count >= self.min_history:
+            mean, std = self.order_stats.mean[0], self.order_stats.std[0]
+            self.order_stats.update(amounts)
+        else:
+            self.order_stats.update(amounts)
+            mean, std = self.order_stats.mean[0], self.order_stats.std[0]
+        self.order_threshold = mean + self.z_threshold * std
+        flagged = rows[amounts > self.order_threshold]
+        self.flagged_total += len(flagged)
+        if len(flagged):
+            self.flagged_orders = pd.concat([self.flagged_orders, flagged]).tail(self.max_flagged_orders)
+
+def follow_sales(state, sales):
+    """Detector state for sales, reusing the detector of an earlier state when sales only appends rows.
+
+    ``state`` is None or what an earlier call returned. The seen rows are recognized by
+    their values, not their encoding: ``DataProcessor.append_sales`` re-normalizes the
+    whole table, which rebuilds the categories and their codes.
+    """
+    if state is not None:
+        detector = state['detector']
+        if state['source'] is sales:
+            return state
+        seen = detector.rows_seen
+        if len(sales) >= seen and content_fingerprint(sales.iloc[:seen]) == state['fingerprint']:
+            detector.update(sales.iloc[seen:])
+            return {'detector': detector, 'source': sales, 'fingerprint': content_fingerprint(sales)}
+    detector = StreamingAnomalyDetector()
+    detector.update(sales)
+    return {'detector': detector, 'source': sales, 'fingerprint': content_fingerprint(sales)}
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import os
+import threading
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+from services.ai_service import MODEL, PROMPTS, build_messages, prompt_payload
+from services.context_builder import DEFAULT_TOKEN_BUDGET
+from services.llm_cache import default_llm_cache
+
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError
+)
+
+class AsyncAIService:
+    """Concurrent OpenAI calls sharing one pooled HTTP client.
+
+    Each call has its own timeout and retries with exponential backoff; at most
+    ``max_concurrency`` requests are in flight. ``OPENAI_BASE_URL`` (or ``base_url``)
+    points the client at another endpoint such as scripts/openai_stub_server.py.
+    Library-only for now: no page calls it (the chat page answers locally or through
+    its own OpenAI call); it is meant for scripts and batch jobs that fan out prompts.
+    """
+
+    def __init__(self, api_key=None, base_url=None, max_concurrency=4, timeout=30.0,
+                 max_retries=2, backoff=0.5, cache=None, payload_token_budget=DEFAULT_TOKEN_BUDGET):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY", "")
+        self.base_url = base_url or os.getenv("OPENAI_BASE_URL") or None
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.cache = cache or default_llm_cache
+        self.payload_token_budget = payload_token_budget
+        self.client = None
+        self._http = None
+        self._semaphore = None
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    def is_available(self):
+        """Check if OpenAI service is available"""
+        return bool(self.api_key)
+
+    async def process_natural_language_query(self, query, data_summary, timeout=None, fingerprint=None):
+        return await self._complete("query", prompt_payload(data_summary, self.payload_token_budget), query=query, timeout=timeout, fingerprint=fingerprint)
+
+    async def generate_business_insights(self, metrics_data, timeout=None, fingerprint=None):
+        return await self._complete("insights", prompt_payload(metrics_data, self.payload_token_budget), timeout=timeout, fingerprint=fingerprint)
+
+    async def analyze_anomaly_causes(self, anomaly_data, timeout=None, fingerprint=None):
+        return await self._complete("anomaly", prompt_payload(anomaly_data, self.payload_token_budget), timeout=timeout, fingerprint=fingerprint)
+
+    async def generate_recommendations(self, business_context, timeout=None, fingerprint=None):
+        return await self._complete("recommendations", prompt_payload(business_context, self.payload_token_budget), timeout=timeout, fingerprint=fingerprint)
+
+    async def gather(self, requests, deadline=None):
+        """Run independent requests concurrently.
+
+        ``requests`` maps a name to a coroutine from this service. Whatever is still
+        running when ``deadline`` seconds have passed is cancelled and reported as an
+        error, so the caller waits for the slowest call at most, never their sum.
+        """
+        tasks = {name: asyncio.ensure_future(coro) for name, coro in requests.items()}
+        if not tasks:
+            return {}
+        done, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        results = {}
+        for name, task in tasks.items():
+            if task in pending:
+                results[name] = {"error": f"Cancelled after {deadline}s deadline"}
+            elif task.exception() is not None:
+                results[name] = {"error": str(task.exception())}
+            else:
+                results[name] = task.result()
+        return results
+
+    def run(self, coro):
+        """Run a coroutine on the service's own event loop and wait for its result.
+
+        The loop lives on a background thread so the pooled client (bound to that loop)
+        is reused across Streamlit reruns instead of being rebuilt by asyncio.run.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result()
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+            self.client = None
+
+    def close(self):
+        if self._loop is not None:
+            self.run(self.aclose())
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+
+    def _ensure_loop(self):
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="ai-service-loop", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def _ensure_client(self):
+        # Created lazily inside the running loop the client will be used from
+        if self.client is None:
+            limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+            self._http = httpx.AsyncClient(limits=limits, timeout=self.timeout)
+            # Retries are handled here so they share the concurrency limit and backoff policy
+            self.client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, http_client=self._http, max_retries=0)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self.client
+
+    async def _complete(self, kind, payload, query=None, timeout=None, fingerprint=None):
+        messages = build_messages(kind, payload, query)
+        key = self.cache.make_key(MODEL, messages[0]["content"], messages[1]["content"], fingerprint)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            return {**cached, "cached": True}
+        if not self.is_available():
+            return {"error": "OpenAI API key not configured"}
+        client = self._ensure_client()
+        timeout = timeout or self.timeout
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    response = await asyncio.wait_for(
+                        client.chat.completions.create(
+                            model=MODEL,
+                            messages=messages,
+                            response_format={"type": "json_object"}
+                        ),
+                        timeout
+                    )
+                result = json.loads(response.choices[0].message.content)
+                await asyncio.to_thread(self.cache.put, key, result, MODEL)
+                return {**result, "cached": False}
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    return {"error": f"{PROMPTS[kind]['error']}: {str(e) or type(e).__name__}"}
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+            except Exception as e:
+                return {"error": f"{PROMPTS[kind]['error']}: {str(e)}"}
@@ -0,0 +1,132 @@
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+from services.analytics_service import AnalyticsService
+from services.forecast_service import forecast_segments
+from services.ml_service import MLService
+from services.report_store import default_report_store
+from utils.data_processor import DataProcessor, normalize_sales
+from utils.result_cache import dataset_fingerprint
+from utils.result_table import as_frame
+
+FORECAST_DAYS = 30
+
+# Dataset of the current worker process, loaded once by the pool initializer
+_worker_data = None
+
+def _load_worker_data(directory):
+    global _worker_data
+    data = {}
+    for file_name in os.listdir(directory):
+        data[file_name[:-len('.pkl')]] = pd.read_pickle(os.path.join(directory, file_name))
+    data['sales'] = normalize_sales(data['sales'])
+    _worker_data = data
+
+def _records(result, key):
+    if 'error' in result:
+        raise RuntimeError(result['error'])
+    return as_frame(result[key])
+
+def _checked(result):
+    if isinstance(result, dict) and 'error' in result:
+        raise RuntimeError(result['error'])
+    return result
+
+def task_kpis(data):
+    analytics = AnalyticsService(data)
+    return {'kpis': _checked(analytics.calculate_kpis()), 'growth_metrics': _checked(DataProcessor(data).calculate_growth_metrics())}
+
+def task_regional(data):
+    return {'regional_analysis': _checked(AnalyticsService(data).regional_analysis())}
+
+def task_products(data):
+    return {'product_analysis': as_frame(_checked(AnalyticsService(data).product_analysis()))}
+
+def task_customers(data):
+    return {'customer_analysis': _checked(AnalyticsService(data).customer_analysis())}
+
+def task_time_series(data):
+    result = _checked(AnalyticsService(data).time_series_analysis())
+    return {f'{level}_trends': as_frame(table) for level, table in result.items()}
+
+def task_segmentation(data):
+    result = MLService().customer_segmentation(data['customers'], data['sales'])
+    return {'customer_segments': _records(result, 'segmentation'), 'segment_summary': result['segment_summary']}
+
+def task_anomalies(data):
+    result = MLService().detect_anomalies(data['sales'])
+    return {
+        'anomalies': _records(result, 'anomalies'),
+        'anomaly_summary': {'anomaly_count': result['anomaly_count'], 'total_days': result['total_days']}
+    }
+
+def task_sales_forecast(data):
+    # One core per forest inside the worker: the batch pool already spreads tasks over the cores
+    ml = MLService(n_jobs=1)
+    metrics = _checked(ml.train_sales_prediction_model(data['sales']))
+    return {'sales_model': metrics, 'sales_forecast': _records(ml.predict_sales(data['sales'], FORECAST_DAYS), 'predictions')}
+
+def task_segment_forecasts(data):
+    # Single process inside the worker: the batch pool already spreads tasks over the cores
+    return {'segment_forecasts': forecast_segments(data['sales'], periods=FORECAST_DAYS, n_workers=1)}
+
+TASKS = {
+    'kpis': task_kpis,
+    'regional': task_regional,
+    'products': task_products,
+    'customers': task_customers,
+    'time_series': task_time_series,
+    'segmentation': task_segmentation,
+    'anomalies': task_anomalies,
+    'sales_forecast': task_sales_forecast,
+    'segment_forecasts': task_segment_forecasts
+}
+
+def _run_task(name):
+    start = time.perf_counter()
+    try:
+        return name, TASKS[name](_worker_data), None, time.perf_counter() - start
+    except Exception as e:
+        return name, {}, f'{type(e).__name__}: {e}', time.perf_counter() - start
+
+def run_batch(data, tasks=None, n_workers=None, store=None, log=print):
+    """Run the report tasks on a process pool and save their artifacts as a new report version.
+
+    ``data`` is the app's data dict (sales plus customers/products tables). Each
+    worker loads the dataset once from a pickled copy; a failing task is recorded
+    in the manifest and does not stop the others.
+    """
+    store = store or default_report_store
+    tasks = list(tasks or TASKS)
+    unknown = [t for t in tasks if t not in TASKS]
+    if unknown:
+        raise ValueError(f"Unknown report task(s): {', '.join(unknown)}")
+    data = {k: v for k, v in data.items() if isinstance(v, pd.DataFrame)}
+    data['sales'] = normalize_sales(data['sales'])
+    fingerprint = dataset_fingerprint(data['sales'])
+    n_workers = n_workers or min(len(tasks), os.cpu_count() or 1)
+    artifacts, task_log = {}, {}
+    started = time.perf_counter()
+    directory = tempfile.mkdtemp(prefix='insightpilot-batch-')
+    try:
+        for name, frame in data.items():
+            frame.to_pickle(os.path.join(directory, f'{name}.pkl'))
+        with ProcessPoolExecutor(n_workers, initializer=_load_worker_data, initargs=(directory,)) as pool:
+            futures = [pool.submit(_run_task, name) for name in tasks]
+            for future in as_completed(futures):
+                name, produced, error, seconds = future.result()
+                artifacts.update(produced)
+                task_log[name] = {'seconds': round(seconds, 3), 'artifacts': sorted(produced), 'error': error}
+                log(f"{name:18} {'failed: ' + error if error else 'ok'} ({seconds:.2f}s)")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return store.save(fingerprint, artifacts, {
+        'rows': len(data['sales']),
+        'tasks': task_log,
+        'workers': n_workers,
+        'seconds': round(time.perf_counter() - started, 3)
+    })
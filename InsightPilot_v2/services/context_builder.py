@@ -0,0 +1,185 @@
+import json
+import math
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from utils.date_index import get_date_index
+from utils.frame_memo import per_frame
+from utils.result_table import ResultTable
+from utils.rollup_cube import get_cube
+from utils.tracing import traced
+
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKEN_BUDGET = 1200
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English and numbers)"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def bounded_json(data, token_budget=DEFAULT_TOKEN_BUDGET):
+    """Compact JSON of data, capping every list shorter until it fits the token budget"""
+    data = json.loads(json.dumps(data, default=_plain))
+    cap = None
+    while True:
+        text = json.dumps(_cap_lists(data, cap), separators=(',', ':'))
+        if estimate_tokens(text) <= token_budget or cap == 1:
+            return text
+        longest = _longest_list(data) if cap is None else cap
+        if longest <= 1:
+            return text
+        cap = max(1, longest // 2)
+
+def _plain(value):
+    # Tables become lists of row dicts so their rows can be capped like any other list
+    if isinstance(value, ResultTable):
+        return value.to_records()
+    if isinstance(value, pd.DataFrame):
+        return value.to_dict('records')
+    return str(value)
+
+def _cap_lists(node, cap):
+    if isinstance(node, dict):
+        return {k: _cap_lists(v, cap) for k, v in node.items()}
+    if isinstance(node, list):
+        items = [_cap_lists(v, cap) for v in node[:cap]]
+        if cap is not None and len(node) > cap:
+            items.append(f"... {len(node) - cap} more")
+        return items
+    return node
+
+def _longest_list(node):
+    if isinstance(node, dict):
+        return max((_longest_list(v) for v in node.values()), default=0)
+    if isinstance(node, list):
+        return max([len(node)] + [_longest_list(v) for v in node])
+    return 0
+
+class ContextBuilder:
+    """Compact prompt context assembled from precomputed aggregates under a token budget.
+
+    Sections (overview, KPI deltas, top products/regions, monthly trend, recent
+    anomalies) are rendered once per dataset and reused across questions; only
+    their order and the budget trimming depend on the question.
+    """
+
+    def __init__(self, sales, token_budget=DEFAULT_TOKEN_BUDGET, top_n=5):
+        self.sales = sales
+        self.token_budget = token_budget
+        self.top_n = top_n
+
+    @traced('chat.build_context')
+    def build(self, question=None):
+        """Return the context text plus its size: tokens, chars, included and dropped sections"""
+        sections = _dataset_sections(self.sales, self.top_n)
+        order = _prioritize(list(sections), question)
+        lines, included, dropped = [], [], []
+        used = 0
+        for name in order:
+            section = sections[name]
+            cost = estimate_tokens('\n'.join(section)) + 1
+            if used + cost <= self.token_budget:
+                lines.extend(section)
+                used += cost
+                included.append(name)
+                continue
+            # Keep as many lines of the section as still fit
+            partial = []
+            for line in section:
+                line_cost = estimate_tokens(line) + 1
+                if used + line_cost > self.token_budget:
+                    break
+                partial.append(line)
+                used += line_cost
+            if len(partial) > 1:
+                lines.extend(partial)
+                included.append(name)
+            else:
+                used -= sum(estimate_tokens(line) + 1 for line in partial)
+                dropped.append(name)
+        text = '\n'.join(lines)
+        return {
+            'text': text,
+            'tokens': estimate_tokens(text),
+            'chars': len(text),
+            'token_budget': self.token_budget,
+            'sections': included,
+            'dropped_sections': dropped
+        }
+
+SECTION_KEYWORDS = {
+    'kpis': ['growth', 'last 30', 'recent', 'trend', 'change', 'kpi'],
+    'products': ['product', 'item', 'sku', 'best', 'top'],
+    'regions': ['region', 'north', 'south', 'east', 'west', 'where'],
+    'monthly_trend': ['month', 'trend', 'season', 'highest', 'lowest'],
+    'anomalies': ['anomal', 'spike', 'drop', 'unusual', 'outlier']
+}
+
+def _prioritize(names, question):
+    if not question:
+        return names
+    q = question.lower()
+    def score(name):
+        if name == 'overview':
+            return float('-inf')
+        return -sum(word in q for word in SECTION_KEYWORDS.get(name, []))
+    return sorted(names, key=score)
+
+@per_frame
+def _dataset_sections_memo(sales):
+    return {}
+
+def _dataset_sections(sales, top_n):
+    # One rendering per (dataset, top_n), shared by every question on that dataset
+    memo = _dataset_sections_memo(sales)
+    if top_n not in memo:
+        memo[top_n] = _render_sections(sales, top_n)
+    return memo[top_n]
+
+def _render_sections(sales, top_n):
+    sections = {}
+    cube = get_cube(sales)
+    index = get_date_index(sales)
+    if cube is None or index.max_date is None:
+        return {'overview': ['No sales data available.']}
+    total = cube.totals()
+    sections['overview'] = [
+        'Dataset overview:',
+        f"- period {index.min_date.date()} to {index.max_date.date()}",
+        f"- revenue {total['revenue']:.2f}, orders {int(total['orders'])}, "
+        f"avg order {total['revenue'] / max(total['orders'], 1):.2f}"
+    ]
+    last_30 = index.max_date - timedelta(days=30)
+    revenue_30d = index.revenue(start=last_30)
+    revenue_prev = index.revenue(start=last_30 - timedelta(days=30), end=last_30, include_end=False)
+    delta = f"{(revenue_30d - revenue_prev) / revenue_prev * 100:+.1f}%" if revenue_prev > 0 else 'n/a'
+    kpis = [
+        'KPI deltas:',
+        f"- revenue last 30d {revenue_30d:.2f} vs previous 30d {revenue_prev:.2f} ({delta})",
+        f"- orders last 30d {index.orders(start=last_30)}"
+    ]
+    if 'customer_id' in sales.columns:
+        kpis.append(f"- active customers last 30d {index.distinct('customer_id', start=last_30)}")
+    sections['kpis'] = kpis
+    for dim, name in [('product_id', 'products'), ('region', 'regions')]:
+        if dim in cube.dimensions:
+            top = cube.rollup(by=[dim]).sort_values('revenue', ascending=False)
+            lines = [f"Top {name} by revenue ({len(top)} total):"]
+            lines += [f"- {key}: {row.revenue:.2f} ({int(row.orders)} orders)" for key, row in top.head(top_n).iterrows()]
+            sections[name] = lines
+    monthly = cube.monthly()['revenue']
+    sections['monthly_trend'] = ['Monthly revenue (most recent last):'] + [
+        f"- {period}: {value:.2f}" for period, value in monthly.tail(12).items()
+    ]
+    daily = cube.daily()['revenue']
+    std = daily.std()
+    if len(daily) >= 10 and std > 0:
+        z = (daily - daily.mean()) / std
+        recent = z[z.index >= index.max_date - timedelta(days=90)]
+        flagged = recent[np.abs(recent) > 3]
+        lines = ['Recent anomalous days (|z| > 3, last 90 days):']
+        lines += [f"- {day.date()}: revenue {daily[day]:.2f} (z {value:+.1f})" for day, value in flagged.items()]
+        if len(lines) == 1:
+            lines.append('- none')
+        sections['anomalies'] = lines
+    return sections
@@ -0,0 +1,99 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from utils.rollup_cube import get_cube
+from utils.tracing import traced
+
+SEGMENT_FOREST_PARAMS = {'n_estimators': 50, 'random_state': 42}
+
+def segment_daily_panel(sales, dimensions=None):
+    """Daily revenue per segment as a wide frame: one row per day, one column per series.
+
+    Days without orders are zero revenue, so every series shares the same date axis.
+    """
+    cube = get_cube(sales)
+    if cube is None:
+        return pd.DataFrame()
+    dimensions = cube.dimensions if dimensions is None else list(dimensions)
+    if not dimensions:
+        return cube.daily()[['revenue']].set_axis(pd.Index(['total'], name='series'), axis=1)
+    panel = cube.rollup('D', by=dimensions)['revenue'].unstack(dimensions, fill_value=0)
+    full_range = pd.date_range(panel.index.min(), panel.index.max(), freq='D')
+    return panel.reindex(full_range, fill_value=0).rename_axis('date')
+
+def batched_linear_forecast(panel, periods=30):
+    """Fit a linear trend to every column of the panel in one least-squares solve"""
+    if len(panel) < 2:
+        return None
+    x = np.arange(len(panel), dtype='float64')
+    A = np.vstack([x, np.ones(len(x))]).T
+    # lstsq solves all right-hand sides (one per series) against the shared design matrix
+    coef = np.linalg.lstsq(A, panel.to_numpy(dtype='float64'), rcond=None)[0]
+    future_x = np.arange(len(panel), len(panel) + periods, dtype='float64')
+    preds = np.outer(future_x, coef[0]) + coef[1]
+    future_dates = pd.date_range(panel.index.max() + pd.Timedelta(days=1), periods=periods, freq='D')
+    return pd.DataFrame(preds, index=future_dates.rename('date'), columns=panel.columns)
+
+def _calendar_features(dates, offset):
+    return np.column_stack([
+        np.arange(offset, offset + len(dates)),
+        dates.dayofweek,
+        dates.month,
+        dates.dayofyear
+    ])
+
+def _fit_forest_chunk(X_train, Y_chunk, X_future, params):
+    # Module-level so it can be pickled into the process pool
+    preds = np.empty((len(X_future), Y_chunk.shape[1]))
+    for i in range(Y_chunk.shape[1]):
+        model = RandomForestRegressor(**params)
+        model.fit(X_train, Y_chunk[:, i])
+        preds[:, i] = model.predict(X_future)
+    return preds
+
+def forest_forecast(panel, periods=30, n_workers=None, chunk_size=32, params=None):
+    """Fit a random forest per series, spreading chunks of series over a process pool"""
+    if len(panel) < 2:
+        return None
+    params = params or SEGMENT_FOREST_PARAMS
+    n_workers = n_workers or int(os.getenv('INSIGHTPILOT_FORECAST_WORKERS', os.cpu_count() or 1))
+    future_dates = pd.date_range(panel.index.max() + pd.Timedelta(days=1), periods=periods, freq='D')
+    X_train = _calendar_features(panel.index, 0)
+    X_future = _calendar_features(future_dates, len(panel))
+    Y = panel.to_numpy(dtype='float64')
+    chunks = [Y[:, i:i + chunk_size] for i in range(0, Y.shape[1], chunk_size)]
+    if n_workers <= 1 or len(chunks) == 1:
+        results = [_fit_forest_chunk(X_train, chunk, X_future, params) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = [pool.submit(_fit_forest_chunk, X_train, chunk, X_future, params) for chunk in chunks]
+            results = [future.result() for future in futures]
+    preds = np.hstack(results)
+    return pd.DataFrame(preds, index=future_dates.rename('date'), columns=panel.columns)
+
+@traced('forecast.forecast_segments')
+def forecast_segments(sales, periods=30, dimensions=None, method='linear', n_workers=None):
+    """Forecast every segment series and return a tidy long frame.
+
+    Columns: one per dimension, then date, predicted_revenue and model.
+    """
+    panel = segment_daily_panel(sales, dimensions)
+    if panel.empty:
+        return pd.DataFrame()
+    if method == 'linear':
+        wide = batched_linear_forecast(panel, periods)
+    elif method == 'random_forest':
+        wide = forest_forecast(panel, periods, n_workers=n_workers)
+    else:
+        raise ValueError(f"Unknown forecast method: {method}")
+    if wide is None:
+        return pd.DataFrame()
+    long = wide.stack(list(range(wide.columns.nlevels))).rename('predicted_revenue').reset_index()
+    key_columns = [c for c in long.columns if c not in ('date', 'predicted_revenue')]
+    long = long[key_columns + ['date', 'predicted_revenue']]
+    long['predicted_revenue'] = long['predicted_revenue'].clip(lower=0)
+    long['model'] = method
+    return long
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.tracing import register_hit_counter
+
+def normalize_content(text):
+    """Collapse whitespace and case so trivially different prompts share an entry"""
+    return re.sub(r'\s+', ' ', str(text)).strip().casefold()
+
+class LLMResponseCache:
+    """SQLite-backed cache of LLM responses with a TTL and a size cap.
+
+    Keys combine model, system prompt, normalized user content and the dataset
+    fingerprint, so an answer is only reused for the same question on the same data.
+    """
+
+    def __init__(self, path=None, ttl_seconds=None, max_bytes=None):
+        self.path = path or os.getenv('INSIGHTPILOT_LLM_CACHE', os.path.join('.cache', 'llm_responses.sqlite'))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv('INSIGHTPILOT_LLM_CACHE_TTL', 24 * 3600))
+        self.max_bytes = max_bytes if max_bytes is not None else int(float(os.getenv('INSIGHTPILOT_LLM_CACHE_MB', 50)) * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._ready = False
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, model, system_prompt, user_content, fingerprint=None):
+        spec = json.dumps([model, normalize_content(system_prompt), normalize_content(user_content), fingerprint])
+        return hashlib.sha256(spec.encode()).hexdigest()
+
+    def get(self, key):
+        """Return the cached response or None if missing or expired"""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute('SELECT value, created FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                self.misses += 1
+                return None
+            conn.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, value, model=None):
+        payload = json.dumps(value)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO responses (key, model, value, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)',
+                (key, model, payload, len(payload), now, now)
+            )
+            self._enforce_limits(conn, now)
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute('DELETE FROM responses')
+
+    def stats(self):
+        with self._lock, self._connect() as conn:
+            entries, size = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries, 'bytes': size, 'max_bytes': self.max_bytes}
+
+    def _enforce_limits(self, conn, now):
+        conn.execute('DELETE FROM responses WHERE created < ?', (now - self.ttl_seconds,))
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries until the cache fits again
+        for key, size in conn.execute('SELECT key, size FROM responses ORDER BY accessed').fetchall():
+            conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    @contextmanager
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        if not self._ready:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'key TEXT PRIMARY KEY, model TEXT, value TEXT NOT NULL, size INTEGER NOT NULL, '
+                'created REAL NOT NULL, accessed REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+            self._ready = True
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+default_llm_cache = LLMResponseCache()
+register_hit_counter(lambda: default_llm_cache.hits)
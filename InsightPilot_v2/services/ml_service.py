@@ -3,29 +3,42 @@ import numpy as np
 from sklearn.ensemble import RandomForestRegressor, IsolationForest
 from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_absolute_error, r2_score
+from services.model_registry import ModelRegistry
+from services.sales_training import SalesModelTrainer
+from services.segmentation import RFMSegmenter
+from utils.result_cache import cached_result, dataset_fingerprint
+from utils.result_table import ResultTable
+from utils.star_schema import get_star_schema
 import warnings
+from utils.tracing import trace_methods
 warnings.filterwarnings('ignore')
 
+SALES_FEATURE_COLUMNS = [
+    'month', 'day_of_week', 'day_of_year', 'quarter',
+    'daily_quantity', 'daily_transactions', 'revenue_ma_7', 'revenue_ma_30'
+]
+SALES_MODEL_PARAMS = {'n_estimators': 100, 'random_state': 42}
+# Stored forests are keyed on the training pipeline too, so ones from the random-split training are not reused
+SALES_REGISTRY_PARAMS = {**SALES_MODEL_PARAMS, 'training': 'rolling_origin'}
+ANOMALY_FEATURE_COLUMNS = ['total_amount', 'quantity', 'sale_id']
+ANOMALY_MODEL_PARAMS = {'contamination': 0.1, 'random_state': 42}
+
+default_registry = ModelRegistry()
+
+@trace_methods('ml')
 class MLService:
     """Service for machine learning models and predictions"""
     
-    def __init__(self):
+    def __init__(self, registry=None, n_jobs=None):
         self.sales_model = None
+        self.n_jobs = n_jobs
         self.anomaly_detector = None
         self.scaler = StandardScaler()
+        self.registry = registry or default_registry
         
     def prepare_sales_features(self, sales_df):
         """Prepare features for sales prediction"""
-        # Create time-based features
-        sales_df['year'] = sales_df['date'].dt.year
-        sales_df['month'] = sales_df['date'].dt.month
-        sales_df['day_of_week'] = sales_df['date'].dt.dayofweek
-        sales_df['day_of_year'] = sales_df['date'].dt.dayofyear
-        sales_df['quarter'] = sales_df['date'].dt.quarter
-        
-        # Aggregate daily sales
+        # Aggregate daily sales (sales_df is the shared canonical table, never mutate it)
         daily_sales = sales_df.groupby('date').agg({
             'total_amount': 'sum',
             'quantity': 'sum',
@@ -48,17 +61,21 @@ class MLService:
         
         return daily_sales
     
-    def train_sales_prediction_model(self, sales_df):
-        """Train sales prediction model"""
+    def train_sales_prediction_model(self, sales_df, incremental=True):
+        """Train sales prediction model
+        
+        The forest is grown on all cores with out-of-bag early stopping and scored
+        on rolling-origin folds. With incremental=True, a stored forest of an earlier
+        version of the same data (new days appended) is grown by a few trees on the
+        new data instead of training from scratch; it is only reused when the days it
+        was trained on hash to the same training fingerprint in the current data.
+        """
         try:
             # Prepare features
             features_df = self.prepare_sales_features(sales_df)
             
             # Select features for model
-            feature_columns = [
-                'month', 'day_of_week', 'day_of_year', 'quarter',
-                'daily_quantity', 'daily_transactions', 'revenue_ma_7', 'revenue_ma_30'
-            ]
+            feature_columns = SALES_FEATURE_COLUMNS
             
             # Remove rows with NaN values
             features_df = features_df.dropna()
@@ -66,33 +83,61 @@ class MLService:
             if len(features_df) < 10:
                 return {"error": "Insufficient data for training"}
             
+            # Reuse a forest already trained on this dataset with the same features and params
+            fingerprint = dataset_fingerprint(sales_df)
+            stored = self.registry.load('sales_model', fingerprint, feature_columns, SALES_REGISTRY_PARAMS)
+            if stored is not None:
+                self.sales_model, metadata = stored
+                return {"success": True, **metadata['metrics']}
+            
+            # Rows are in date order, so every validation fold only trains on earlier days
             X = features_df[feature_columns]
             y = features_df['daily_revenue']
-            
-            # Split data
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-            
-            # Train model
-            self.sales_model = RandomForestRegressor(n_estimators=100, random_state=42)
-            self.sales_model.fit(X_train, y_train)
-            
-            # Evaluate model
-            y_pred = self.sales_model.predict(X_test)
-            mae = mean_absolute_error(y_test, y_pred)
-            r2 = r2_score(y_test, y_pred)
-            
-            return {
-                "success": True,
-                "mae": mae,
-                "r2_score": r2,
-                "feature_importance": dict(zip(feature_columns, self.sales_model.feature_importances_))
-            }
+            training_rows = features_df[feature_columns + ['daily_revenue']]
+            first_date, last_date = features_df['date'].iloc[0].isoformat(), features_df['date'].iloc[-1].isoformat()
+            trainer = SalesModelTrainer(SALES_MODEL_PARAMS, n_jobs=self.n_jobs)
+            
+            def trained_on_prefix(metadata):
+                # Same first day and fewer days is not enough: the earlier days must be the same rows
+                stored_metrics = metadata['metrics']
+                if stored_metrics.get('first_date') != first_date or stored_metrics.get('last_date', last_date) >= last_date:
+                    return False
+                prefix = training_rows[features_df['date'] <= pd.Timestamp(stored_metrics['last_date'])]
+                return dataset_fingerprint(prefix) == stored_metrics.get('training_fingerprint')
+            
+            previous = None
+            if incremental:
+                previous = self.registry.latest('sales_model', feature_columns, SALES_REGISTRY_PARAMS, where=trained_on_prefix)
+            if previous is not None:
+                model, metadata = previous
+                new_rows = int((features_df['date'] > pd.Timestamp(metadata['metrics']['last_date'])).sum())
+                self.sales_model, metrics = trainer.refresh(model, X, y, new_rows)
+            else:
+                self.sales_model, metrics = trainer.fit(X, y)
+            
+            metrics.update({
+                "feature_importance": {
+                    name: float(value) for name, value in zip(feature_columns, self.sales_model.feature_importances_)
+                },
+                "first_date": first_date,
+                "last_date": last_date,
+                "training_fingerprint": dataset_fingerprint(training_rows)
+            })
+            self.registry.save('sales_model', fingerprint, feature_columns, SALES_REGISTRY_PARAMS, self.sales_model, metrics)
+            
+            return {"success": True, **metrics}
             
         except Exception as e:
             return {"error": f"Model training failed: {str(e)}"}
     
-    def predict_sales(self, sales_df, forecast_days=30):
-        """Predict future sales"""
+    def predict_sales(self, sales_df, forecast_days=30, recursive=False, block_size=7):
+        """Predict future sales
+        
+        The whole horizon is built as one feature matrix and predicted in a single
+        batched call. With recursive=True the revenue_ma_7/revenue_ma_30 features are
+        refreshed from earlier predictions every block_size days instead of being
+        frozen at the last observed day.
+        """
         if self.sales_model is None:
             train_result = self.train_sales_prediction_model(sales_df)
             if "error" in train_result:
@@ -101,45 +146,60 @@ class MLService:
         try:
             # Get the latest data point
             features_df = self.prepare_sales_features(sales_df)
-            features_df = features_df.sort_values('date')
-            
-            last_date = features_df['date'].max()
-            last_row = features_df[features_df['date'] == last_date].iloc[0]
-            
-            predictions = []
-            current_date = last_date
-            
-            for i in range(forecast_days):
-                current_date += pd.Timedelta(days=1)
-                
-                # Create features for prediction
-                pred_features = {
-                    'month': current_date.month,
-                    'day_of_week': current_date.dayofweek,
-                    'day_of_year': current_date.dayofyear,
-                    'quarter': current_date.quarter,
-                    'daily_quantity': last_row['daily_quantity'],  # Use last known values
-                    'daily_transactions': last_row['daily_transactions'],
-                    'revenue_ma_7': last_row['revenue_ma_7'],
-                    'revenue_ma_30': last_row['revenue_ma_30']
-                }
-                
-                # Make prediction
-                pred_df = pd.DataFrame([pred_features])
-                predicted_revenue = self.sales_model.predict(pred_df)[0]
-                
-                predictions.append({
-                    'date': current_date,
-                    'predicted_revenue': max(0, predicted_revenue)  # Ensure non-negative
-                })
+            last_row = features_df.iloc[-1]
+            last_date = last_row['date']
+            
+            # Features for every day of the horizon, built in one vectorized step
+            future_dates = pd.date_range(last_date + pd.Timedelta(days=1), periods=forecast_days, freq='D')
+            pred_features = pd.DataFrame({
+                'month': future_dates.month,
+                'day_of_week': future_dates.dayofweek,
+                'day_of_year': future_dates.dayofyear,
+                'quarter': future_dates.quarter,
+                'daily_quantity': last_row['daily_quantity'],  # Use last known values
+                'daily_transactions': last_row['daily_transactions'],
+                'revenue_ma_7': last_row['revenue_ma_7'],
+                'revenue_ma_30': last_row['revenue_ma_30']
+            }, columns=SALES_FEATURE_COLUMNS)
+            
+            if recursive:
+                predicted_revenue = self._predict_recursive(
+                    pred_features, features_df['daily_revenue'].to_numpy()[-30:], block_size
+                )
+            else:
+                predicted_revenue = self.sales_model.predict(pred_features)
+            
+            predicted_revenue = np.maximum(predicted_revenue, 0)  # Ensure non-negative
+            predictions = [
+                {'date': date, 'predicted_revenue': float(revenue)}
+                for date, revenue in zip(future_dates, predicted_revenue)
+            ]
             
             return {"success": True, "predictions": predictions}
             
         except Exception as e:
             return {"error": f"Prediction failed: {str(e)}"}
     
+    def _predict_recursive(self, pred_features, revenue_history, block_size):
+        """Predict block by block, feeding each block's predictions into the moving averages"""
+        block_size = max(1, int(block_size))
+        history = list(revenue_history)
+        predicted = np.empty(len(pred_features))
+        for start in range(0, len(pred_features), block_size):
+            block = pred_features.iloc[start:start + block_size].copy()
+            block['revenue_ma_7'] = np.mean(history[-7:])
+            block['revenue_ma_30'] = np.mean(history[-30:])
+            block_pred = self.sales_model.predict(block)
+            predicted[start:start + len(block)] = block_pred
+            history.extend(np.maximum(block_pred, 0))
+        return predicted
+    
     def detect_anomalies(self, sales_df):
-        """Detect anomalies in sales data"""
+        """Detect anomalies in sales data
+        
+        Not result-cached: it sets self.scaler and self.anomaly_detector, which a cache
+        hit would skip. The fitted detector itself comes from the model registry.
+        """
         try:
             # Prepare daily aggregated data
             daily_sales = sales_df.groupby('date').agg({
@@ -152,14 +212,27 @@ class MLService:
                 return {"error": "Insufficient data for anomaly detection"}
             
             # Features for anomaly detection
-            features = daily_sales[['total_amount', 'quantity', 'sale_id']].values
-            
-            # Scale features
-            features_scaled = self.scaler.fit_transform(features)
-            
-            # Train anomaly detector
-            self.anomaly_detector = IsolationForest(contamination=0.1, random_state=42)
-            anomaly_labels = self.anomaly_detector.fit_predict(features_scaled)
+            features = daily_sales[ANOMALY_FEATURE_COLUMNS].values
+            
+            fingerprint = dataset_fingerprint(sales_df)
+            stored = self.registry.load('anomaly_detector', fingerprint, ANOMALY_FEATURE_COLUMNS, ANOMALY_MODEL_PARAMS)
+            if stored is not None:
+                # Scaler and forest were fitted on exactly these days, so predict == fit_predict
+                (self.scaler, self.anomaly_detector), _ = stored
+                features_scaled = self.scaler.transform(features)
+                anomaly_labels = self.anomaly_detector.predict(features_scaled)
+            else:
+                # Scale features
+                self.scaler = StandardScaler()
+                features_scaled = self.scaler.fit_transform(features)
+                
+                # Train anomaly detector
+                self.anomaly_detector = IsolationForest(**ANOMALY_MODEL_PARAMS)
+                anomaly_labels = self.anomaly_detector.fit_predict(features_scaled)
+                self.registry.save(
+                    'anomaly_detector', fingerprint, ANOMALY_FEATURE_COLUMNS, ANOMALY_MODEL_PARAMS,
+                    (self.scaler, self.anomaly_detector)
+                )
             
             # Get anomaly scores
             anomaly_scores = self.anomaly_detector.score_samples(features_scaled)
@@ -173,7 +246,7 @@ class MLService:
             
             return {
                 "success": True,
-                "anomalies": anomalies.to_dict('records'),
+                "anomalies": ResultTable(anomalies),
                 "anomaly_count": len(anomalies),
                 "total_days": len(daily_sales)
             }
@@ -181,59 +254,23 @@ class MLService:
         except Exception as e:
             return {"error": f"Anomaly detection failed: {str(e)}"}
     
-    def customer_segmentation(self, customers_df, sales_df):
-        """Perform customer segmentation analysis"""
+    @cached_result(dataset='sales_df')
+    def customer_segmentation(self, customers_df, sales_df, approximate=False):
+        """Perform customer segmentation analysis
+        
+        RFM aggregates come from the per-customer table shared with the customer
+        analysis; approximate=True scores against quantile sketches instead of
+        exact quartiles.
+        """
         try:
-            # Calculate customer metrics
-            customer_metrics = sales_df.groupby('customer_id').agg({
-                'total_amount': ['sum', 'mean', 'count'],
-                'date': ['min', 'max']
-            }).reset_index()
-            
-            customer_metrics.columns = [
-                'customer_id', 'total_spent', 'avg_order_value', 
-                'order_count', 'first_purchase', 'last_purchase'
-            ]
+            customer_metrics = RFMSegmenter(approximate=approximate).fit(sales_df).segments()
             
-            # Calculate recency, frequency, monetary
-            current_date = sales_df['date'].max()
-            customer_metrics['recency'] = (current_date - customer_metrics['last_purchase']).dt.days
-            customer_metrics['frequency'] = customer_metrics['order_count']
-            customer_metrics['monetary'] = customer_metrics['total_spent']
-            
-            # Simple segmentation based on quartiles
-            customer_metrics['recency_score'] = pd.qcut(customer_metrics['recency'], 4, labels=[4,3,2,1])
-            customer_metrics['frequency_score'] = pd.qcut(customer_metrics['frequency'].rank(method='first'), 4, labels=[1,2,3,4])
-            customer_metrics['monetary_score'] = pd.qcut(customer_metrics['monetary'], 4, labels=[1,2,3,4])
-            
-            # Create RFM score
-            customer_metrics['rfm_score'] = (
-                customer_metrics['recency_score'].astype(int) + 
-                customer_metrics['frequency_score'].astype(int) + 
-                customer_metrics['monetary_score'].astype(int)
-            )
-            
-            # Define segments
-            def categorize_customer(rfm_score):
-                if rfm_score >= 10:
-                    return "Champions"
-                elif rfm_score >= 8:
-                    return "Loyal Customers"
-                elif rfm_score >= 6:
-                    return "Potential Loyalists"
-                elif rfm_score >= 4:
-                    return "At Risk"
-                else:
-                    return "Lost Customers"
-            
-            customer_metrics['segment'] = customer_metrics['rfm_score'].apply(categorize_customer)
-            
-            # Merge with customer data
-            result = customer_metrics.merge(customers_df, on='customer_id', how='left')
+            # Customer attributes resolved through the star schema's customer keys
+            result = get_star_schema(sales_df, customers=customers_df).enrich(customer_metrics, 'customer')
             
             return {
                 "success": True,
-                "segmentation": result.to_dict('records'),
+                "segmentation": ResultTable(result),
                 "segment_summary": result['segment'].value_counts().to_dict()
             }
             
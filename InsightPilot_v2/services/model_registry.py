@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import joblib
+
+class ModelRegistry:
+    """On-disk store of fitted models keyed by dataset fingerprint, feature list and hyperparameters"""
+
+    def __init__(self, root=None, max_versions=5):
+        self.root = root or os.getenv('INSIGHTPILOT_MODEL_DIR', '.models')
+        self.max_versions = max_versions
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def model_key(self, name, fingerprint, features, params):
+        """Stable key for one fitted model version"""
+        spec = json.dumps({
+            'name': name,
+            'fingerprint': fingerprint,
+            'features': list(features),
+            'params': params
+        }, sort_keys=True, default=str)
+        return f"{name}-{hashlib.blake2b(spec.encode(), digest_size=12).hexdigest()}"
+
+    def load(self, name, fingerprint, features, params):
+        """Return (model, metadata) for a stored version, or None if it was never saved"""
+        key = self.model_key(name, fingerprint, features, params)
+        with self._lock:
+            if key in self._loaded:
+                return self._loaded[key]
+        model_path, meta_path = self._paths(key)
+        if not (os.path.exists(model_path) and os.path.exists(meta_path)):
+            return None
+        try:
+            with open(meta_path) as f:
+                metadata = json.load(f)
+            # Uncompressed dumps let joblib memory-map the tree arrays instead of reading them
+            model = joblib.load(model_path, mmap_mode='r')
+        except Exception:
+            return None
+        os.utime(meta_path)  # mark as recently used for eviction
+        with self._lock:
+            self._loaded[key] = (model, metadata)
+        return model, metadata
+
+    def save(self, name, fingerprint, features, params, model, metrics=None):
+        """Persist a fitted model with its training metrics and evict old versions"""
+        key = self.model_key(name, fingerprint, features, params)
+        metadata = {
+            'key': key,
+            'name': name,
+            'fingerprint': fingerprint,
+            'features': list(features),
+            'params': params,
+            'metrics': metrics or {},
+            'created': time.time()
+        }
+        os.makedirs(self.root, exist_ok=True)
+        model_path, meta_path = self._paths(key)
+        tmp = f"{model_path}.{os.getpid()}.tmp"
+        joblib.dump(model, tmp)
+        os.replace(tmp, model_path)
+        with open(meta_path, 'w') as f:
+            json.dump(metadata, f, default=str)
+        with self._lock:
+            self._loaded[key] = (model, metadata)
+        self._evict(name)
+        return key
+
+    def latest(self, name, features, params, where=None):
+        """(model, metadata) of the most recently used version with these features and params, or None
+
+        where(metadata) can narrow the candidates further, e.g. to earlier versions of a growing dataset.
+        """
+        spec = json.dumps({'features': list(features), 'params': params}, sort_keys=True, default=str)
+        for metadata in self.versions(name):
+            candidate = json.dumps({'features': metadata.get('features'), 'params': metadata.get('params')}, sort_keys=True, default=str)
+            if candidate != spec or (where is not None and not where(metadata)):
+                continue
+            stored = self.load(name, metadata['fingerprint'], features, params)
+            if stored is not None:
+                return stored
+        return None
+
+    def versions(self, name=None):
+        """Metadata of the stored versions, most recently used first"""
+        if not os.path.isdir(self.root):
+            return []
+        entries = []
+        for file_name in os.listdir(self.root):
+            if not file_name.endswith('.json'):
+                continue
+            path = os.path.join(self.root, file_name)
+            try:
+                with open(path) as f:
+                    metadata = json.load(f)
+            except Exception:
+                continue
+            if name is None or metadata.get('name') == name:
+                entries.append((os.path.getmtime(path), metadata))
+        entries.sort(key=lambda entry: entry[0], reverse=True)
+        return [metadata for _, metadata in entries]
+
+    def _evict(self, name):
+        for metadata in self.versions(name)[self.max_versions:]:
+            key = metadata['key']
+            with self._lock:
+                self._loaded.pop(key, None)
+            for path in self._paths(key):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _paths(self, key):
+        return os.path.join(self.root, f"{key}.joblib"), os.path.join(self.root, f"{key}.json")
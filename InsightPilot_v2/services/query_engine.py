@@ -0,0 +1,322 @@
+import calendar
+import re
+
+import pandas as pd
+from utils.date_index import get_date_index
+from utils.frame_memo import per_frame
+from utils.rollup_cube import get_cube
+from utils.tracing import traced
+
+HELP_TEXT = ('Try phrases like "highest month", "top product", "total revenue", '
+             '"top 3 regions by orders last 90 days", "revenue by month", '
+             '"revenue growth last month" or "how many customers in August".')
+UNKNOWN_TEXT = 'Sorry — I could not parse the question. ' + HELP_TEXT
+
+METRICS = {
+    'aov': r'average order(?: value)?|avg order(?: value)?|aov|average sale',
+    'orders': r'orders?|transactions?|purchases?|number of sales',
+    'quantity': r'quantity|units?|items? sold|volume',
+    'customers': r'customers?|buyers?|clients?',
+    'revenue': r'revenue|sales|income|turnover|amount|money'
+}
+METRIC_LABELS = {'revenue': 'revenue', 'orders': 'orders', 'quantity': 'quantity', 'aov': 'average order value', 'customers': 'customers'}
+DIMENSIONS = {
+    'product_id': r'products?|items?|skus?',
+    'region': r'regions?|areas?|territor(?:y|ies)',
+    'customer_id': r'customers?|buyers?|clients?'
+}
+DIMENSION_LABELS = {'product_id': 'products', 'region': 'regions', 'customer_id': 'customers'}
+GRAINS = {'D': r'days?|daily|dates?', 'W': r'weeks?|weekly', 'M': r'months?|monthly', 'Q': r'quarters?|quarterly', 'Y': r'years?|yearly|annual'}
+GRAIN_LABELS = {'D': 'day', 'W': 'week', 'M': 'month', 'Q': 'quarter', 'Y': 'year'}
+
+_DIM = '|'.join(DIMENSIONS.values())
+_GRAIN = '|'.join(GRAINS.values())
+_RANK = r'top|bottom|best|worst|highest|lowest|leading|most|least|biggest|smallest|largest'
+
+# Intents in priority order; the first intent whose pattern matches wins
+INTENTS = [
+    ('help', r'\b(?:help|what can you)\b'),
+    ('coverage', r'\b(?:date range|time range|what period|which period|covered|coverage|how (?:far|long))\b'),
+    ('ranking', rf'\b(?:{_RANK})\b.*\b(?:{_DIM})\b|\b(?:{_DIM})\b.*\b(?:{_RANK})\b'),
+    ('extreme_period', rf'\b(?:{_RANK}|peak|max(?:imum)?|min(?:imum)?)\b.*\b(?:{_GRAIN})\b|\b(?:{_GRAIN})\b.*\b(?:{_RANK}|peak)\b'),
+    ('breakdown', rf'\b(?:by|per|each|breakdown of|split by)\s+(?:{_DIM}|{_GRAIN})\b|\b(?:daily|weekly|monthly|quarterly|yearly)\s+(?:revenue|sales|orders|quantity|units|customers)\b'),
+    ('growth', r'\b(?:growth|grow(?:ing|n)?|change|trend|compared?|vs|versus|increase|decrease|decline)\b'),
+    ('distinct_customers', r'\b(?:how many|number of|count of)\s+(?:unique |distinct |active )?(?:customers?|buyers?|clients?)\b|\b(?:active|unique|distinct) customers\b'),
+    ('aov', rf'\b(?:{METRICS["aov"]})\b'),
+    ('total', r'\b(?:total|how many|how much|sum|overall|number of)\b|\b(?:revenue|sales|orders|quantity|units)\b')
+]
+
+# One compiled alternation with a named group per intent: a single scan of the question
+INTENT_MATCHER = re.compile('|'.join(f'(?=.*?(?P<{name}>{pattern}))' for name, pattern in INTENTS), re.IGNORECASE | re.DOTALL)
+METRIC_MATCHER = re.compile('|'.join(f'(?P<{name}>\\b(?:{pattern})\\b)' for name, pattern in METRICS.items()), re.IGNORECASE)
+DIMENSION_MATCHER = re.compile('|'.join(f'(?P<{name}>\\b(?:{pattern})\\b)' for name, pattern in DIMENSIONS.items()), re.IGNORECASE)
+GRAIN_MATCHER = re.compile('|'.join(f'(?P<{name}>\\b(?:{pattern})\\b)' for name, pattern in GRAINS.items()), re.IGNORECASE)
+BY = re.compile(r'\b(?:by|per|each|split by|breakdown of)\s+(\w+)|\b(daily|weekly|monthly|quarterly|yearly)\b', re.IGNORECASE)
+TOP_K = re.compile(r'\b(?:top|bottom|best|worst|first)\s+(\d+)\b|\b(\d+)\s+(?:best|worst|top|biggest|largest)\b', re.IGNORECASE)
+ASCENDING = re.compile(r'\b(?:bottom|worst|lowest|least|smallest|min(?:imum)?)\b', re.IGNORECASE)
+MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+TRAILING = re.compile(r'\b(?:last|past|previous|trailing)\s+(\d+)\s+(day|week|month|year)s?\b', re.IGNORECASE)
+CALENDAR = re.compile(r'\b(this|last|previous)\s+(week|month|quarter|year)\b', re.IGNORECASE)
+ISO_MONTH = re.compile(r'\b(\d{4})-(\d{2})\b(?!-\d)')
+ISO_RANGE = re.compile(r'\b(?:from|between)\s+(\d{4}-\d{2}-\d{2})\s+(?:to|and|until)\s+(\d{4}-\d{2}-\d{2})\b', re.IGNORECASE)
+SINCE = re.compile(r'\bsince\s+(\d{4}-\d{2}-\d{2})\b', re.IGNORECASE)
+MONTH_NAME = re.compile(r'\b(?:in|during|for)\s+(' + '|'.join(sorted(MONTHS, key=len, reverse=True)) + r')\b(?:\s+(\d{4}))?', re.IGNORECASE)
+YEAR = re.compile(r'\b(?:in|during|for)\s+(\d{4})\b(?!-)', re.IGNORECASE)
+
+@per_frame
+def get_query_engine(sales):
+    """Return the query engine of a sales frame, building it on first use"""
+    return QueryEngine(sales)
+
+class QueryEngine:
+    """Offline question answering over the rollup cube and date index.
+
+    Questions are matched against a registry of intents in one compiled scan, their
+    parameters (metric, dimension, time grain, time range, top-k) are extracted, and
+    the planner answers from pre-aggregated data; only per-customer questions touch
+    raw rows, and then only the date-range slice.
+    """
+
+    def __init__(self, sales):
+        self.sales = sales
+        self.cube = get_cube(sales)
+        self.index = get_date_index(sales)
+
+    @traced('chat.answer')
+    def answer(self, question):
+        if self.cube is None:
+            return 'No sales data available.'
+        try:
+            query = self.parse(question)
+        except ValueError:
+            return UNKNOWN_TEXT  # a date that does not exist, e.g. "revenue 2024-13" or "since 2024-02-30"
+        handler = getattr(self, f"_answer_{query['intent']}", None)
+        if handler is None:
+            return UNKNOWN_TEXT
+        try:
+            return handler(query)
+        except KeyError:
+            return f"The dataset has no data for that {query.get('dimension') or 'question'}."
+
+    def parse(self, question):
+        """Intent plus extracted parameters for a question"""
+        q = question.strip()
+        match = INTENT_MATCHER.match(q)
+        intent = None
+        if match:
+            intent = next((name for name, _ in INTENTS if match.group(name) is not None), None)
+        dimension = _first_group(DIMENSION_MATCHER, q)
+        metrics = [m.lastgroup for m in METRIC_MATCHER.finditer(q)]
+        by = BY.search(q)
+        by = (by.group(1) or by.group(2)) if by else ''
+        by = _first_group(DIMENSION_MATCHER, by) or _first_group(GRAIN_MATCHER, by)
+        if dimension == 'customer_id' and (intent == 'ranking' or by == 'customer_id'):
+            # "customers" names what is ranked, not what it is ranked by
+            metrics = [m for m in metrics if m != 'customers']
+        metric = metrics[0] if metrics else None
+        k = TOP_K.search(q)
+        start, end, label = self._time_range(q)
+        return {
+            'intent': intent or 'unknown',
+            'metric': metric or 'revenue',
+            'dimension': dimension,
+            'grain': _first_group(GRAIN_MATCHER, q),
+            'by': by,
+            'k': int(next(g for g in k.groups() if g)) if k else None,
+            'ascending': bool(ASCENDING.search(q)),
+            'start': start,
+            'end': end,
+            'range_label': label
+        }
+
+    # Planner / answerers
+
+    def _answer_help(self, query):
+        return HELP_TEXT
+
+    def _answer_coverage(self, query):
+        return (f'The data covers {self.index.min_date.date()} to {self.index.max_date.date()} '
+                f'({len(self.sales)} orders).')
+
+    def _answer_total(self, query):
+        metric = query['metric']
+        if metric == 'customers':
+            return self._answer_distinct_customers(query)
+        value = self._scalar(metric, query['start'], query['end'])
+        if metric == 'revenue':
+            return f"Total revenue{query['range_label']}: {value:.2f}"
+        if metric == 'aov':
+            return f"Average order value{query['range_label']}: {value:.2f}"
+        return f"Total {METRIC_LABELS[metric]}{query['range_label']}: {int(value)}"
+
+    def _answer_aov(self, query):
+        return f"Average order value{query['range_label']}: {self._scalar('aov', query['start'], query['end']):.2f}"
+
+    def _answer_distinct_customers(self, query):
+        if 'customer_id' not in self.sales.columns:
+            return 'No customer_id column found in data.'
+        count = self.index.distinct('customer_id', *self._window(query['start'], query['end']), include_end=False)
+        return f"Unique customers{query['range_label']}: {count}"
+
+    def _answer_ranking(self, query):
+        dimension = query['dimension']
+        metric = query['metric']
+        if dimension not in self.sales.columns:
+            return f'No {dimension} column found in data.'
+        values = self._by_dimension(dimension, metric, query['start'], query['end'])
+        k = query['k'] or 5
+        if values.empty:
+            return f"No sales{query['range_label']}."
+        ranked = values.sort_values(ascending=query['ascending']).head(k)
+        label = DIMENSION_LABELS[dimension]
+        if query['k'] is None and not query['ascending'] and metric == 'revenue' and not query['range_label']:
+            return f'Top {label} (by revenue):\n' + ranked.to_string()
+        which = 'Bottom' if query['ascending'] else 'Top'
+        return f"{which} {k} {label} (by {METRIC_LABELS[metric]}{query['range_label']}):\n" + ranked.to_string()
+
+    def _answer_extreme_period(self, query):
+        grain = query['grain'] or 'M'
+        values = self._by_grain(grain, query['metric'], query['start'], query['end'])
+        if values.empty:
+            return f"No sales{query['range_label']}."
+        period = values.idxmin() if query['ascending'] else values.idxmax()
+        which = 'Lowest' if query['ascending'] else 'Highest'
+        return (f"{which} {GRAIN_LABELS[grain]} was {_period_label(period, grain)} "
+                f"with {METRIC_LABELS[query['metric']]} {values[period]:.2f}")
+
+    def _answer_breakdown(self, query):
+        metric = query['metric']
+        target = query['by'] or query['dimension'] or query['grain'] or 'M'
+        if target in DIMENSIONS:
+            if target not in self.sales.columns:
+                return f'No {target} column found in data.'
+            values = self._by_dimension(target, metric, query['start'], query['end']).sort_values(ascending=False)
+            title = DIMENSION_LABELS[target][:-1]
+        else:
+            grain = target
+            values = self._by_grain(grain, metric, query['start'], query['end'])
+            values.index = [_period_label(p, grain) for p in values.index]
+            title = GRAIN_LABELS[grain]
+        shown = values.head(50)
+        more = f'\n... {len(values) - len(shown)} more' if len(values) > len(shown) else ''
+        return f"{METRIC_LABELS[metric].capitalize()} by {title}{query['range_label']}:\n" + shown.round(2).to_string() + more
+
+    def _answer_growth(self, query):
+        metric = query['metric'] if query['metric'] != 'customers' else 'revenue'
+        if query['start'] is not None:
+            start, end = query['start'], query['end'] or self.index.max_date.normalize()
+        else:
+            end = self.index.max_date.normalize()
+            start = end - pd.Timedelta(days=29)
+        length = end - start + pd.Timedelta(days=1)
+        current = self._scalar(metric, start, end)
+        previous = self._scalar(metric, start - length, start - pd.Timedelta(days=1))
+        if not previous:
+            return f"Not enough earlier data to compare {METRIC_LABELS[metric]}."
+        change = (current - previous) / previous * 100
+        return (f"{METRIC_LABELS[metric].capitalize()} {start.date()} to {end.date()}: {current:.2f} "
+                f"vs {previous:.2f} in the previous {length.days} days ({change:+.1f}%)")
+
+    # Data access
+
+    def _window(self, start, end):
+        # Inclusive day range -> [start, day after end) so intraday timestamps are covered
+        return start, end + pd.Timedelta(days=1) if end is not None else None
+
+    def _bounds(self, start, end):
+        return self.index.bounds(*self._window(start, end), include_end=False)
+
+    def _scalar(self, metric, start, end):
+        lo, hi = self._bounds(start, end)
+        if metric == 'revenue':
+            return float(self.index.cum_revenue[hi] - self.index.cum_revenue[lo])
+        if metric == 'orders':
+            return hi - lo
+        if metric == 'aov':
+            valid = self.index.cum_valid[hi] - self.index.cum_valid[lo]
+            return float((self.index.cum_revenue[hi] - self.index.cum_revenue[lo]) / valid) if valid else 0.0
+        if metric == 'quantity':
+            return float(self.cube.totals(start=start, end=end)['quantity'])
+        if metric == 'customers':
+            return float(self.index.distinct('customer_id', *self._window(start, end), include_end=False))
+        raise KeyError(metric)
+
+    def _by_dimension(self, dimension, metric, start, end):
+        if dimension in self.cube.dimensions and metric != 'customers':
+            table = self.cube.rollup(by=[dimension], start=start, end=end)
+        else:
+            # Not a cube dimension: aggregate only the rows inside the date range
+            lo, hi = self._bounds(start, end)
+            rows = self.index.sales.iloc[lo:hi]
+            grouped = rows.groupby(dimension, observed=True)
+            table = pd.DataFrame({'revenue': grouped['total_amount'].sum(), 'orders': grouped.size()})
+            if 'quantity' in rows.columns:
+                table['quantity'] = grouped['quantity'].sum()
+            if 'customer_id' in rows.columns and dimension != 'customer_id':
+                table['customers'] = grouped['customer_id'].nunique()
+        return _metric_column(table, metric).rename(METRIC_LABELS[metric])
+
+    def _by_grain(self, grain, metric, start, end):
+        freq = {'Y': 'Y', 'Q': 'Q'}.get(grain, grain)
+        if metric == 'customers':
+            lo, hi = self._bounds(start, end)
+            rows = self.index.sales.iloc[lo:hi]
+            key = rows['date'].dt.to_period(freq) if grain != 'D' else rows['date'].dt.normalize()
+            return rows.groupby(key)['customer_id'].nunique()
+        table = self.cube.rollup(freq, start=start, end=end)
+        return _metric_column(table, metric)
+
+    def _time_range(self, q):
+        """(start_day, end_day, label) relative to the last date in the data"""
+        last = self.index.max_date.normalize()
+        m = ISO_RANGE.search(q)
+        if m:
+            start, end = pd.Timestamp(m.group(1)), pd.Timestamp(m.group(2))
+            return start, end, f' from {start.date()} to {end.date()}'
+        m = SINCE.search(q)
+        if m:
+            start = pd.Timestamp(m.group(1))
+            return start, None, f' since {start.date()}'
+        m = TRAILING.search(q)
+        if m:
+            n, unit = int(m.group(1)), m.group(2).lower()
+            offset = {'day': pd.Timedelta(days=n), 'week': pd.Timedelta(weeks=n),
+                      'month': pd.DateOffset(months=n), 'year': pd.DateOffset(years=n)}[unit]
+            return last - offset + pd.Timedelta(days=1), last, f' in the last {n} {unit}s'
+        m = CALENDAR.search(q)
+        if m:
+            which, unit = m.group(1).lower(), m.group(2).lower()
+            freq = {'week': 'W', 'month': 'M', 'quarter': 'Q', 'year': 'Y'}[unit]
+            period = last.to_period(freq) - (0 if which == 'this' else 1)
+            return period.start_time, period.end_time.normalize(), f' in {which} {unit} ({period})'
+        m = ISO_MONTH.search(q)
+        if m:
+            period = pd.Period(f'{m.group(1)}-{m.group(2)}', freq='M')
+            return period.start_time, period.end_time.normalize(), f' in {period}'
+        m = MONTH_NAME.search(q)
+        if m:
+            year = int(m.group(2)) if m.group(2) else last.year
+            period = pd.Period(year=year, month=MONTHS[m.group(1).lower()], freq='M')
+            if not m.group(2) and period.start_time > last:
+                period = period - 12
+            return period.start_time, period.end_time.normalize(), f' in {period}'
+        m = YEAR.search(q)
+        if m:
+            period = pd.Period(m.group(1), freq='Y')
+            return period.start_time, period.end_time.normalize(), f' in {period}'
+        return None, None, ''
+
+def _first_group(matcher, text):
+    match = matcher.search(text)
+    return match.lastgroup if match else None
+
+def _metric_column(table, metric):
+    if metric == 'aov':
+        return table['revenue'] / table['orders'].where(table['orders'] > 0)
+    return table[metric]
+
+def _period_label(period, grain):
+    if isinstance(period, pd.Period):
+        return str(period) if grain != 'M' else period.strftime('%Y-%m')
+    return str(pd.Timestamp(period).date())
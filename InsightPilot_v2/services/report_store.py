@@ -0,0 +1,144 @@
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+from utils.result_cache import dataset_fingerprint
+from utils.result_table import ResultTable
+
+try:
+    import pyarrow  # noqa: F401  (Parquet support for pandas)
+    TABLE_FORMAT = 'parquet'
+except ImportError:
+    TABLE_FORMAT = 'json'
+
+class ReportStore:
+    """Versioned reports on disk, one directory per dataset fingerprint.
+
+    Each run writes ``<root>/<fingerprint>/<version>/`` with one artifact per result
+    (DataFrames as Parquet, or table-oriented JSON without pyarrow; everything else
+    as JSON; tables inside a dict result are stored as their own ``<name>.<key>``
+    artifacts instead of being boxed into JSON rows) and a ``manifest.json`` that is written last, so a version without a
+    manifest is an incomplete run and is ignored.
+    """
+
+    def __init__(self, root=None, max_versions=5):
+        self.root = root or os.getenv('INSIGHTPILOT_REPORT_DIR', '.reports')
+        self.max_versions = max_versions
+
+    def save(self, fingerprint, artifacts, metadata=None):
+        """Write a new version of the reports of a dataset and return its manifest"""
+        version = time.strftime('%Y%m%dT%H%M%S') + f'-{os.getpid()}'
+        directory = os.path.join(self.root, fingerprint, version)
+        os.makedirs(directory, exist_ok=True)
+        files = {}
+        for name, value in _split_tables(artifacts):
+            files[name] = self._write(directory, name, value)
+        manifest = {
+            'version': version,
+            'fingerprint': fingerprint,
+            'created': time.time(),
+            'artifacts': files,
+            **(metadata or {})
+        }
+        tmp = os.path.join(directory, 'manifest.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, indent=2, default=str)
+        os.replace(tmp, os.path.join(directory, 'manifest.json'))
+        self._evict(fingerprint)
+        return manifest
+
+    def versions(self, fingerprint):
+        """Manifests of the complete versions of a dataset's reports, newest first"""
+        directory = os.path.join(self.root, fingerprint)
+        if not os.path.isdir(directory):
+            return []
+        manifests = []
+        for version in sorted(os.listdir(directory), reverse=True):
+            path = os.path.join(directory, version, 'manifest.json')
+            try:
+                with open(path) as f:
+                    manifests.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return manifests
+
+    def latest(self, fingerprint):
+        versions = self.versions(fingerprint)
+        return versions[0] if versions else None
+
+    def load(self, fingerprint, name, version=None):
+        """One artifact of the given (default: latest) version, or None if it was not produced"""
+        manifest = self.latest(fingerprint) if version is None else next(
+            (m for m in self.versions(fingerprint) if m['version'] == version), None)
+        if manifest is None or name not in manifest['artifacts']:
+            return None
+        file_name = manifest['artifacts'][name]
+        path = os.path.join(self.root, fingerprint, manifest['version'], file_name)
+        if file_name.endswith('.parquet'):
+            return pd.read_parquet(path)
+        if file_name.endswith('.table.json'):
+            return pd.read_json(path, orient='table')
+        with open(path) as f:
+            return json.load(f)
+
+    def _write(self, directory, name, value):
+        if isinstance(value, ResultTable):
+            value = value.to_pandas()
+        if isinstance(value, pd.DataFrame):
+            if TABLE_FORMAT == 'parquet':
+                file_name = f'{name}.parquet'
+                value.to_parquet(os.path.join(directory, file_name), index=False, compression='zstd')
+            else:
+                file_name = f'{name}.table.json'
+                value.to_json(os.path.join(directory, file_name), orient='table', index=False)
+        else:
+            file_name = f'{name}.json'
+            with open(os.path.join(directory, file_name), 'w') as f:
+                json.dump(_jsonable(value), f, default=str)
+        return file_name
+
+    def _evict(self, fingerprint):
+        directory = os.path.join(self.root, fingerprint)
+        complete = {m['version'] for m in self.versions(fingerprint)[:self.max_versions]}
+        for version in os.listdir(directory):
+            # Keep the newest complete versions and anything newer (possibly still being written)
+            if version in complete or version > max(complete, default=''):
+                continue
+            shutil.rmtree(os.path.join(directory, version), ignore_errors=True)
+
+def _split_tables(artifacts):
+    for name, value in artifacts.items():
+        if isinstance(value, dict):
+            tables = {k: v for k, v in value.items() if isinstance(v, (ResultTable, pd.DataFrame))}
+            if tables:
+                yield name, {k: v for k, v in value.items() if k not in tables}
+                for key, table in tables.items():
+                    yield f'{name}.{key}', table
+                continue
+        yield name, value
+
+def _jsonable(value):
+    # Analytics results carry numpy scalars, timestamps and tuple keys (flattened groupby columns)
+    if isinstance(value, dict):
+        return {' / '.join(map(str, k)) if isinstance(k, tuple) else k if isinstance(k, (str, int, float, bool)) or k is None else str(k): _jsonable(v)
+                for k, v in value.items()}
+    if isinstance(value, ResultTable):
+        return _jsonable(value.to_records())  # only for tables nested deeper than _split_tables looks
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value
+
+default_report_store = ReportStore()
+
+def precomputed(sales, name, store=None):
+    """Artifact from the latest report of exactly this sales dataset, or None"""
+    if sales is None or not len(sales):
+        return None
+    return (store or default_report_store).load(dataset_fingerprint(sales), name)
@@ -0,0 +1,162 @@
+import copy
+import os
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, r2_score
+
+def rolling_origin_folds(n_rows, n_folds=5, horizon=30, min_train=10):
+    """(train_end, test_end) row positions of expanding-window folds over date-sorted rows.
+
+    Each fold trains on every row before its origin and is tested on the next
+    ``horizon`` rows, so no fold ever sees days after the ones it is scored on.
+    Folds without ``min_train`` training rows are skipped; the horizon shrinks on
+    short histories so at least one fold remains.
+    """
+    horizon = max(1, min(horizon, n_rows // (n_folds + 1)))
+    folds = []
+    for k in range(n_folds, 0, -1):
+        train_end = n_rows - k * horizon
+        if train_end >= min(min_train, n_rows - horizon):
+            folds.append((train_end, train_end + horizon))
+    return folds
+
+def _fit_fold(params, X, y, train_end, test_end):
+    # One single-threaded forest per fold; the folds themselves run in parallel
+    model = RandomForestRegressor(**{**params, 'n_jobs': 1})
+    model.fit(X.iloc[:train_end], y.iloc[:train_end])
+    return model.predict(X.iloc[train_end:test_end])
+
+class SalesModelTrainer:
+    """Training pipeline of the daily revenue forest.
+
+    A full fit grows the forest with ``warm_start`` in steps of ``tree_step``
+    trees on all cores, stopping once the out-of-bag error stops improving by
+    ``tolerance`` for ``patience`` steps, at ``params['n_estimators']`` trees or
+    when the time budget runs out. It is then scored on rolling-origin folds,
+    fitted in parallel. ``refresh`` instead grows a previously trained forest by
+    ``refresh_trees`` trees fitted on the extended data and drops as many of its
+    oldest trees, scoring the old forest on the new days and cross-validating
+    again on the extended data. Both report their throughput in the ``training``
+    metrics.
+    """
+
+    def __init__(self, params, n_jobs=None, budget_seconds=None, n_folds=5, horizon=30,
+                 tree_step=10, tolerance=0.005, patience=2, refresh_trees=20):
+        self.params = dict(params)
+        self.n_jobs = n_jobs or int(os.getenv('INSIGHTPILOT_TRAIN_JOBS', os.cpu_count() or 1))
+        budget = budget_seconds if budget_seconds is not None else float(os.getenv('INSIGHTPILOT_TRAIN_BUDGET', 0))
+        self.budget_seconds = budget or None
+        self.n_folds = n_folds
+        self.horizon = horizon
+        self.tree_step = tree_step
+        self.tolerance = tolerance
+        self.patience = patience
+        self.refresh_trees = refresh_trees
+
+    def fit(self, X, y):
+        """Grow a new forest on all rows and cross-validate it; returns (model, metrics)"""
+        start = time.perf_counter()
+        model, stopped = self._grow(X, y, start)
+        fit_seconds = time.perf_counter() - start
+        trees = len(model.estimators_)
+        cv = self.cross_validate(X, y, trees)
+        seconds = time.perf_counter() - start
+        metrics = {
+            'mae': cv['mae'],
+            'r2_score': cv['r2_score'],
+            'cv': cv,
+            'training': self._throughput('full', X, trees, stopped, fit_seconds, seconds)
+        }
+        return model, metrics
+
+    def cross_validate(self, X, y, n_estimators=None):
+        """MAE and R² over the pooled predictions of the rolling-origin folds"""
+        folds = rolling_origin_folds(len(X), self.n_folds, self.horizon)
+        params = {**self.params, 'n_estimators': n_estimators or self.params.get('n_estimators', 100)}
+        start = time.perf_counter()
+        predictions = Parallel(n_jobs=min(self.n_jobs, len(folds)), prefer='threads')(
+            delayed(_fit_fold)(params, X, y, train_end, test_end) for train_end, test_end in folds
+        )
+        actual = [y.iloc[train_end:test_end].to_numpy() for train_end, test_end in folds]
+        fold_mae = [float(mean_absolute_error(a, p)) for a, p in zip(actual, predictions)]
+        actual, predictions = np.concatenate(actual), np.concatenate(predictions)
+        return {
+            'mae': float(mean_absolute_error(actual, predictions)),
+            'r2_score': float(r2_score(actual, predictions)) if len(actual) > 1 else float('nan'),
+            'folds': len(folds),
+            'horizon_days': folds[-1][1] - folds[-1][0],
+            'fold_mae': fold_mae,
+            'seconds': time.perf_counter() - start
+        }
+
+    def refresh(self, model, X, y, new_rows):
+        """Grow a copy of a forest trained on all but the last new_rows rows; returns (model, metrics)
+
+        The caller must make sure the forest was trained on exactly those earlier rows.
+        """
+        start = time.perf_counter()
+        holdout = model.predict(X.iloc[-new_rows:])
+        model = copy.deepcopy(model)  # the registry shares (and may memory-map) the stored forest
+        trees = len(model.estimators_)
+        added = min(self.refresh_trees, trees)
+        model.estimators_ = model.estimators_[added:]
+        for attribute in ('oob_score_', 'oob_prediction_'):
+            # Out-of-bag rows of the kept trees refer to the old data
+            if hasattr(model, attribute):
+                delattr(model, attribute)
+        model.set_params(
+            n_estimators=trees, warm_start=True, oob_score=False, n_jobs=self.n_jobs,
+            # New trees draw other bootstrap samples than the ones of the same position before
+            random_state=self.params.get('random_state', 0) + len(X)
+        )
+        model.fit(X, y)
+        fit_seconds = time.perf_counter() - start
+        # The scores of the previous version describe other data, so they are computed again
+        cv = self.cross_validate(X, y, trees)
+        seconds = time.perf_counter() - start
+        actual = y.iloc[-new_rows:].to_numpy()
+        metrics = {
+            'mae': cv['mae'],
+            'r2_score': cv['r2_score'],
+            'cv': cv,
+            'refresh': {'new_days': int(new_rows), 'holdout_mae': float(mean_absolute_error(actual, holdout))},
+            'training': self._throughput('incremental', X, added, 'refreshed', fit_seconds, seconds)
+        }
+        return model, metrics
+
+    def _grow(self, X, y, start):
+        max_trees = self.params.get('n_estimators', 100)
+        use_oob = self.params.get('bootstrap', True)
+        model = RandomForestRegressor(**{**self.params, 'warm_start': True, 'oob_score': use_oob, 'n_jobs': self.n_jobs})
+        best, stale = np.inf, 0
+        while True:
+            model.set_params(n_estimators=min(max_trees, len(getattr(model, 'estimators_', [])) + self.tree_step))
+            model.fit(X, y)
+            if len(model.estimators_) >= max_trees:
+                return model, 'max_trees'
+            if self.budget_seconds and time.perf_counter() - start >= self.budget_seconds:
+                return model, 'budget'
+            if use_oob:
+                # Rows no tree left out yet get a zero prediction; they carry no error signal
+                seen = model.oob_prediction_ != 0
+                error = mean_absolute_error(y[seen], model.oob_prediction_[seen]) if seen.any() else np.inf
+                stale = stale + 1 if error > best * (1 - self.tolerance) else 0
+                best = min(best, error)
+                if stale >= self.patience:
+                    return model, 'converged'
+
+    def _throughput(self, mode, X, trees, stopped, fit_seconds, seconds):
+        return {
+            'mode': mode,
+            'rows': int(len(X)),
+            'trees': int(trees),
+            'stopped': stopped,
+            'n_jobs': self.n_jobs,
+            'fit_seconds': fit_seconds,
+            'seconds': seconds,
+            'trees_per_second': trees / fit_seconds if fit_seconds else None,
+            'rows_per_second': len(X) / fit_seconds if fit_seconds else None
+        }
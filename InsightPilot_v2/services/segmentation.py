@@ -0,0 +1,218 @@
+import numpy as np
+import pandas as pd
+from utils.compute_backend import Query, get_backend
+from utils.frame_memo import per_frame
+
+CUSTOMER_MEASURES = {
+    'total_spent': ('total_amount', 'sum'),
+    'avg_order_value': ('total_amount', 'mean'),
+    'order_count': ('total_amount', 'count'),
+    'first_purchase': ('date', 'min'),
+    'last_purchase': ('date', 'max')
+}
+QUARTILES = [0.25, 0.5, 0.75]
+SEGMENTS = np.array(['Lost Customers', 'At Risk', 'Potential Loyalists', 'Loyal Customers', 'Champions'], dtype=object)
+# Segment of every possible RFM score (3..12): below 4 lost, 4-5 at risk, 6-7 potential, 8-9 loyal, 10+ champions
+SEGMENT_BY_SCORE = np.array([0, 0, 0, 0, 1, 1, 2, 2, 3, 3, 4, 4, 4], dtype=np.int8)
+
+def customer_table(sales, backend=None):
+    """Per-customer order aggregates, computed once per sales frame and backend.
+
+    Shared by the customer analysis and the RFM segmentation; callers must not
+    modify the returned frame.
+    """
+    backend = backend or get_backend(sales)
+    if sales is None:
+        return backend.run(Query(CUSTOMER_MEASURES, by=['customer_id']))
+    tables = _customer_tables(sales)
+    if backend.name not in tables:
+        tables[backend.name] = backend.run(Query(CUSTOMER_MEASURES, by=['customer_id']))
+    return tables[backend.name]
+
+@per_frame
+def _customer_tables(sales):
+    return {}
+
+class QuantileSketch:
+    """Mergeable histogram sketch of a distribution that supports inserts and deletes.
+
+    With ``relative_accuracy`` values are counted in logarithmic buckets (as in
+    DDSketch), so quantiles are within that relative error using a few thousand
+    counters at most; without it every integer value has its own bucket and the
+    quantiles are exact. Quantiles interpolate linearly like ``np.quantile``.
+    """
+
+    MIN_MAGNITUDE = 1e-6
+
+    def __init__(self, relative_accuracy=None):
+        self.relative_accuracy = relative_accuracy
+        self.log_gamma = np.log((1 + relative_accuracy) / (1 - relative_accuracy)) if relative_accuracy else None
+        # Keys of magnitudes below MIN_MAGNITUDE are 0, so positive keys start at 1
+        self.bias = 1 - np.floor(np.log(self.MIN_MAGNITUDE) / self.log_gamma) if relative_accuracy else 0
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.offset = 0
+        self.count = 0
+
+    def add(self, values, sign=1):
+        keys = self._keys(values)
+        if len(keys) == 0:
+            return
+        self._reserve(keys.min(), keys.max())
+        self.counts += sign * np.bincount(keys - self.offset, minlength=len(self.counts))
+        self.count += sign * len(keys)
+
+    def remove(self, values):
+        self.add(values, sign=-1)
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('Only sketches with the same accuracy can be merged')
+        if other.count:
+            self._reserve(other.offset, other.offset + len(other.counts) - 1)
+            lo = other.offset - self.offset
+            self.counts[lo:lo + len(other.counts)] += other.counts
+            self.count += other.count
+        return self
+
+    def quantiles(self, qs):
+        if self.count == 0:
+            return np.full(len(qs), np.nan)
+        cumulative = np.cumsum(self.counts)
+        position = (self.count - 1) * np.asarray(qs, dtype=float)
+        below = np.floor(position)
+        lower = self._value(np.searchsorted(cumulative, below, side='right') + self.offset)
+        upper = self._value(np.searchsorted(cumulative, np.minimum(below + 1, self.count - 1), side='right') + self.offset)
+        return lower + (position - below) * (upper - lower)
+
+    def _keys(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if self.log_gamma is None:
+            return np.rint(values).astype(np.int64)
+        magnitude = np.abs(values)
+        keys = np.zeros(len(values), dtype=np.int64)
+        large = magnitude >= self.MIN_MAGNITUDE
+        keys[large] = np.sign(values[large]) * (np.ceil(np.log(magnitude[large]) / self.log_gamma) + self.bias)
+        return keys
+
+    def _value(self, keys):
+        keys = np.asarray(keys, dtype=float)
+        if self.log_gamma is None:
+            return keys
+        gamma = np.exp(self.log_gamma)
+        # Midpoint (in relative terms) of the bucket (gamma^(i-1), gamma^i]
+        magnitude = 2 * np.exp((np.abs(keys) - self.bias) * self.log_gamma) / (gamma + 1)
+        return np.where(keys == 0, 0.0, np.sign(keys) * magnitude)
+
+    def _reserve(self, lo, hi):
+        lo, hi = int(lo), int(hi)
+        if len(self.counts) == 0:
+            self.offset, self.counts = lo, np.zeros(hi - lo + 1, dtype=np.int64)
+            return
+        left = max(0, self.offset - lo)
+        right = max(0, hi - (self.offset + len(self.counts) - 1))
+        if left or right:
+            self.counts = np.pad(self.counts, (left, right))
+            self.offset -= left
+
+class RFMSegmenter:
+    """Recency/frequency/monetary scoring and segmentation of customers.
+
+    Scores are quartile bins (1-4) looked up with ``np.searchsorted`` and the
+    segment of the summed score comes from a lookup table; the bins reproduce
+    ``pd.qcut`` (frequency is ranked first, so its quartiles are known without
+    looking at the data). With ``approximate=True`` the recency and monetary
+    quartiles come from sketches that ``update`` keeps current as new orders
+    arrive, instead of partitioning every customer's values again.
+    """
+
+    def __init__(self, approximate=False, relative_accuracy=0.01):
+        self.approximate = approximate
+        self.relative_accuracy = relative_accuracy
+        self.table = None
+        self.current_date = None
+
+    def fit(self, sales, backend=None):
+        table = customer_table(sales, backend)
+        self.table = table[list(table.columns)].copy()
+        dates = self.table['last_purchase']
+        self.current_date = dates.max()
+        if self.approximate:
+            self._sketches = {'last_day': QuantileSketch(), 'monetary': QuantileSketch(self.relative_accuracy)}
+            self._sketch(np.arange(len(self.table)), 'add')
+        return self
+
+    def update(self, new_sales):
+        """Fold newly arrived orders into the per-customer table (and the sketches)"""
+        new = new_sales.groupby('customer_id', observed=True).agg(
+            total_spent=('total_amount', 'sum'),
+            order_count=('total_amount', 'count'),
+            first_purchase=('date', 'min'),
+            last_purchase=('date', 'max')
+        ).reset_index()
+        if new.empty:
+            return self
+        ids = new['customer_id'].astype(self.table['customer_id'].dtype)
+        positions = pd.Index(self.table['customer_id']).get_indexer(ids)
+        known = positions >= 0
+        if self.approximate:
+            self._sketch(positions[known], 'remove')
+        added = new.loc[~known].assign(avg_order_value=np.nan)[self.table.columns]
+        table = pd.concat([self.table, added], ignore_index=True)
+        rows, updates = positions[known], new.loc[known]
+        for column, combine in (('total_spent', np.add), ('order_count', np.add),
+                                ('first_purchase', np.minimum), ('last_purchase', np.maximum)):
+            values = table[column].to_numpy(copy=True)
+            values[rows] = combine(values[rows], updates[column].to_numpy())
+            table[column] = values
+        table['avg_order_value'] = table['total_spent'] / table['order_count'].where(table['order_count'] > 0)
+        self.table = table
+        self.current_date = max(self.current_date, new['last_purchase'].max())
+        if self.approximate:
+            self._sketch(np.concatenate([rows, np.arange(len(table) - len(added), len(table))]), 'add')
+        return self
+
+    def segments(self):
+        """Customer table with recency/frequency/monetary, their scores, rfm_score and segment"""
+        result = self.table.copy()
+        recency = (self.current_date - result['last_purchase']) // pd.Timedelta(days=1)
+        result['recency'] = recency
+        result['frequency'] = result['order_count']
+        result['monetary'] = result['total_spent']
+        monetary = result['monetary'].to_numpy(dtype=float)
+        if self.approximate:
+            # Recency quartiles are today minus the reversed quartiles of the last purchase day
+            current_day = self._days(pd.Series([self.current_date]))[0]
+            day_edges = self._sketches['last_day'].quantiles(QUARTILES[::-1])
+            recency_score = 5 - _bins(current_day - self._days(result['last_purchase']), current_day - day_edges)
+            monetary_score = _bins(monetary, self._sketches['monetary'].quantiles(QUARTILES))
+        else:
+            recency_values = recency.to_numpy(dtype=float)
+            recency_score = 5 - _bins(recency_values, np.quantile(recency_values, QUARTILES))
+            monetary_score = _bins(monetary, np.quantile(monetary, QUARTILES))
+        # Ranks 1..n (ties broken by table order) have the quartiles 1 + q * (n - 1)
+        ranks = np.empty(len(result), dtype=np.int64)
+        ranks[np.argsort(result['frequency'].to_numpy(), kind='stable')] = np.arange(1, len(result) + 1)
+        frequency_score = _bins(ranks, 1 + np.array(QUARTILES) * (len(result) - 1))
+        result['recency_score'] = recency_score
+        result['frequency_score'] = frequency_score
+        result['monetary_score'] = monetary_score
+        result['rfm_score'] = recency_score + frequency_score + monetary_score
+        result['segment'] = SEGMENTS[SEGMENT_BY_SCORE[result['rfm_score'].to_numpy()]]
+        return result
+
+    def _days(self, dates):
+        return dates.to_numpy().astype('datetime64[D]').astype(np.int64)
+
+    def _sketch(self, rows, action):
+        if len(rows) == 0:
+            return
+        table = self.table.iloc[rows]
+        values = {'last_day': self._days(table['last_purchase'].dropna()), 'monetary': table['total_spent'].to_numpy()}
+        for name, sketch in self._sketches.items():
+            getattr(sketch, action)(values[name])
+
+def _bins(values, edges):
+    # Quartile bins closed on the right, like pd.qcut: values equal to an edge fall in the lower bin.
+    # With duplicate edges (where pd.qcut raises) the empty bins in between are skipped
+    return (np.searchsorted(edges, values, side='left') + 1).astype(np.int8)
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+from data.sample_business_data import generate_business_data
+from services.anomaly_service import StreamingAnomalyDetector, follow_sales
+from utils.data_processor import DataProcessor
+from utils.result_cache import dataset_fingerprint
+
+def sales(n=4000, seed=0):
+    rng = np.random.default_rng(seed)
+    amounts = rng.normal(100, 5, n)
+    amounts[::20] = 1000  # every 20th order is far above the running threshold
+    return pd.DataFrame({
+        'sale_id': np.arange(n),
+        'date': pd.Timestamp('2026-01-01') + pd.to_timedelta(np.arange(n) // 40, unit='D'),
+        'quantity': np.ones(n, dtype=int),
+        'total_amount': amounts
+    })
+
+def test_flagged_total_counts_past_the_kept_orders():
+    rows = sales()
+    detector = StreamingAnomalyDetector(max_flagged_orders=50)
+    for chunk in np.array_split(np.arange(len(rows)), 8):
+        detector.update(rows.iloc[chunk])
+    assert len(detector.flagged_orders) == 50
+    assert detector.flagged_total > 50
+    assert detector.flagged_orders['sale_id'].iloc[-1] == rows['sale_id'][rows['total_amount'] == 1000].iloc[-1]
+
+def test_incremental_updates_match_one_pass():
+    rows = sales()
+    once = StreamingAnomalyDetector()
+    once.update(rows)
+    chunked = StreamingAnomalyDetector()
+    for chunk in np.array_split(np.arange(len(rows)), 5):
+        chunked.update(rows.iloc[chunk])
+    assert once.rows_seen == chunked.rows_seen == len(rows)
+    assert len(once.day_results) == len(chunked.day_results)
+
+def test_follow_sales_scores_only_rows_appended_by_the_processor():
+    data = generate_business_data(num_orders=6000, num_days=200, end_date='2026-03-31', seed=5)
+    cut = data['sales']['date'].max() - pd.Timedelta(days=15)
+    old, new = data['sales'][data['sales']['date'] <= cut], data['sales'][data['sales']['date'] > cut]
+    new = new.assign(region=np.where(np.arange(len(new)) % 2, 'Antarctica', new['region'].astype(str)))
+    processor = DataProcessor({'sales': old})
+    before = processor.sales
+    state = follow_sales(None, before)
+    detector = state['detector']
+    fed = []
+    update = detector.update
+    detector.update = lambda rows: fed.append(len(rows)) or update(rows)
+    processor.append_sales(new)
+    sales = processor.sales
+    # Re-normalizing rebuilt the categories, so the codes of the old rows changed
+    assert dataset_fingerprint(sales.iloc[:len(old)]) != dataset_fingerprint(before)
+    state = follow_sales(state, sales)
+    assert state['detector'] is detector
+    assert fed == [len(new)] and detector.rows_seen == len(sales)
+    assert follow_sales(state, sales) is state
+    # Changed history starts over
+    edited = sales.copy()
+    edited.loc[edited.index[0], 'total_amount'] += 1
+    assert follow_sales(state, edited)['detector'] is not detector
+
+def test_rows_without_dates_touch_no_day():
+    rows = sales()
+    undated = rows.head(30).assign(date=pd.NaT)
+    detector = StreamingAnomalyDetector()
+    assert detector.update(undated).empty
+    assert detector.open_day is None and detector.open_date is None and detector.rows_seen == 30
+    detector.update(rows.iloc[:400])
+    open_date = detector.open_date
+    assert detector.update(undated).empty
+    assert detector.open_date == open_date
+    scored = detector.update(rows.iloc[400:800])
+    assert scored['date'].iloc[0] == open_date and detector.rows_seen == 860
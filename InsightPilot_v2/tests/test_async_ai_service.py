@@ -0,0 +1,103 @@
+import asyncio
+import importlib.util
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip('httpx')
+pytest.importorskip('openai')
+
+from services.async_ai_service import AsyncAIService
+from services.llm_cache import LLMResponseCache
+
+STUB_PATH = Path(__file__).resolve().parents[1] / 'scripts' / 'openai_stub_server.py'
+spec = importlib.util.spec_from_file_location('openai_stub_server', STUB_PATH)
+openai_stub_server = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(openai_stub_server)
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(delay=0.0, fail_rate=0.0):
+        server = openai_stub_server.serve(port=0, delay=delay, fail_rate=fail_rate)
+        handler = server.RequestHandlerClass
+        server.requests = 0
+
+        class CountingHandler(handler):
+            def do_POST(self):
+                server.requests += 1
+                super().do_POST()
+
+        server.RequestHandlerClass = CountingHandler
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server, f'http://127.0.0.1:{server.server_address[1]}/v1'
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+@pytest.fixture
+def service_factory(tmp_path):
+    services = []
+
+    def make(base_url, **kwargs):
+        service = AsyncAIService(api_key='stub', base_url=base_url,
+                                 cache=LLMResponseCache(str(tmp_path / 'llm.sqlite')), **kwargs)
+        services.append(service)
+        return service
+
+    yield make
+    for service in services:
+        service.close()
+
+def test_concurrent_calls_overlap(stub, service_factory):
+    _, url = stub(delay=0.4)
+    service = service_factory(url, max_concurrency=4)
+    service.run(service.process_natural_language_query('warm up', 'summary'))
+
+    async def ask():
+        return await service.gather({f'q{i}': service.process_natural_language_query(f'question {i}', 'summary') for i in range(4)})
+
+    start = time.perf_counter()
+    results = service.run(ask())
+    elapsed = time.perf_counter() - start
+    assert all(r['analysis'] == 'stub response' and r['cached'] is False for r in results.values())
+    assert elapsed < 4 * 0.4 / 2  # well under the 1.6s the calls take one after another
+
+def test_retries_server_errors_with_backoff(stub, service_factory):
+    server, url = stub(fail_rate=1.0)
+    service = service_factory(url, max_retries=2, backoff=0.1)
+    start = time.perf_counter()
+    result = service.run(service.generate_business_insights({'revenue': 1}))
+    assert 'error' in result
+    assert server.requests == 3
+    assert time.perf_counter() - start >= 0.1 + 0.2
+
+def test_timeout_gives_up_without_waiting_for_the_answer(stub, service_factory):
+    _, url = stub(delay=2.0)
+    service = service_factory(url, max_retries=0)
+    start = time.perf_counter()
+    result = service.run(service.analyze_anomaly_causes({'day': 'x'}, timeout=0.3))
+    assert 'error' in result
+    assert time.perf_counter() - start < 1.5
+
+def test_deadline_cancels_slow_requests(stub, service_factory):
+    _, url = stub(delay=2.0)
+    service = service_factory(url, max_retries=0)
+
+    async def ask():
+        return await service.gather({'slow': service.generate_recommendations({'a': 1})}, deadline=0.3)
+
+    assert 'deadline' in service.run(ask())['slow']['error']
+
+def test_answers_are_served_from_cache(stub, service_factory):
+    server, url = stub()
+    service = service_factory(url)
+    first = service.run(service.process_natural_language_query('same', 'summary'))
+    second = service.run(service.process_natural_language_query('same', 'summary'))
+    assert (first['cached'], second['cached'], server.requests) == (False, True, 1)
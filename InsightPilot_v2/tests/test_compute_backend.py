@@ -0,0 +1,147 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+from data.sample_business_data import generate_business_data
+from services.analytics_service import AnalyticsService
+from utils.compute_backend import BACKENDS, GRAINS, Query, get_backend
+from utils.data_processor import DataProcessor, normalize_sales
+from utils.result_cache import dataset_fingerprint, result_cache
+from utils.result_table import ResultTable
+
+QUERIES = {
+    'totals': Query({'revenue': ('total_amount', 'sum'), 'orders': ('total_amount', 'size'),
+                     'aov': ('total_amount', 'mean'), 'first': ('date', 'min'), 'last': ('date', 'max')}),
+    'window': Query({'revenue': ('total_amount', 'sum'), 'customers': ('customer_id', 'nunique')},
+                    start='2025-11-01', end='2026-01-01'),
+    'by_product': Query({'revenue': ('total_amount', 'sum'), 'quantity': ('quantity', 'sum'),
+                         'sales': ('sale_id', 'count')}, by=['product_id']),
+    'by_region_month': Query({'revenue': ('total_amount', 'sum'), 'orders': ('total_amount', 'size')},
+                             by=['region'], grain='month'),
+    'daily': Query({'revenue': ('total_amount', 'sum'), 'orders': ('total_amount', 'size')}, grain='day'),
+    'weekly_window': Query({'aov': ('total_amount', 'mean'), 'max_order': ('total_amount', 'max')},
+                           grain='week', start='2025-10-08 12:00'),
+    'quarterly': Query({'revenue': ('total_amount', 'sum'), 'low': ('total_amount', 'min')}, grain='quarter'),
+    'by_customer': Query({'spent': ('total_amount', 'sum'), 'first': ('date', 'min'), 'last': ('date', 'max'),
+                          'orders': ('total_amount', 'count')}, by=['customer_id'])
+}
+
+METHODS = {
+    'kpis': lambda data, backend: AnalyticsService(data, backend).calculate_kpis(),
+    'regional': lambda data, backend: AnalyticsService(data, backend).regional_analysis(),
+    'products': lambda data, backend: AnalyticsService(data, backend).product_analysis(),
+    'time_series': lambda data, backend: AnalyticsService(data, backend).time_series_analysis(),
+    'customers': lambda data, backend: AnalyticsService(data, backend).customer_analysis(),
+    'summary': lambda data, backend: DataProcessor(data, backend).get_data_summary(),
+    'growth': lambda data, backend: DataProcessor(data, backend).calculate_growth_metrics()
+}
+
+def installed(name):
+    try:
+        BACKENDS[name](pd.DataFrame({'date': pd.to_datetime(['2026-01-01']), 'total_amount': [1.0]}))
+        return True
+    except ImportError:
+        return False
+
+def backend_param(name):
+    return pytest.param(name, marks=pytest.mark.skipif(not installed(name), reason=f'{name} is not installed'))
+
+ENGINES = [backend_param(name) for name in BACKENDS]
+
+def same(expected, actual, rtol=1e-9):
+    """Recursive comparison with a relative tolerance on floats"""
+    if isinstance(expected, pd.DataFrame):
+        return same(expected.to_dict('list'), actual.to_dict('list'), rtol) if isinstance(actual, pd.DataFrame) else False
+    if isinstance(expected, ResultTable):
+        return same(expected.to_records(), actual.to_records(), rtol) if isinstance(actual, ResultTable) else False
+    if isinstance(expected, dict):
+        return isinstance(actual, dict) and list(expected) == list(actual) and all(
+            same(expected[k], actual[k], rtol) for k in expected)
+    if isinstance(expected, (list, tuple)):
+        return len(expected) == len(actual) and all(same(e, a, rtol) for e, a in zip(expected, actual))
+    if isinstance(expected, float) and isinstance(actual, (int, float)):
+        return (math.isnan(expected) and math.isnan(actual)) or math.isclose(expected, actual, rel_tol=rtol, abs_tol=rtol)
+    if expected is pd.NaT or actual is pd.NaT:
+        return expected is actual
+    return expected == actual
+
+def by_value(frame, query):
+    # Parquet sources carry no category order, so their keyed rows are compared in value order
+    return frame.sort_values(query.keys).reset_index(drop=True) if query.keys else frame
+
+def reference(sales, query):
+    """The query answered with a plain pandas groupby"""
+    rows = sales
+    if query.start is not None:
+        rows = rows[rows['date'] >= query.start]
+    if query.end is not None:
+        rows = rows[rows['date'] < query.end]
+    keys = [rows[b].astype(str) for b in query.by]
+    if query.grain:
+        period = rows['date'].dt.floor('D') if query.grain == 'day' else rows['date'].dt.to_period(GRAINS[query.grain]).dt.start_time
+        keys.append(period.rename('period'))
+    aggs = {out: pd.NamedAgg(column, 'size' if agg == 'size' else agg) for out, (column, agg) in query.measures.items()}
+    if keys:
+        return rows.groupby(keys, observed=True).agg(**aggs).reset_index()
+    return pd.DataFrame({out: [len(rows) if agg == 'size' else getattr(rows[column], agg)()]
+                         for out, (column, agg) in query.measures.items()})
+
+@pytest.fixture(scope='module')
+def data():
+    data = generate_business_data(num_orders=20_000, num_days=400, num_customers=400, end_date='2026-03-31', seed=11)
+    data['sales'] = normalize_sales(data['sales'])
+    return data
+
+@pytest.fixture(scope='module')
+def parquet(data, tmp_path_factory):
+    path = tmp_path_factory.mktemp('parity') / 'sales.parquet'
+    data['sales'].to_parquet(path, index=False)
+    return str(path)
+
+@pytest.mark.parametrize('label', QUERIES)
+def test_pandas_backend_matches_plain_groupby(data, label):
+    query = QUERIES[label]
+    result = get_backend(data['sales'], name='pandas').run(query)
+    expected = reference(data['sales'], query)
+    result = result.astype({b: str for b in query.by})
+    assert same(by_value(expected, query), by_value(result, query))
+
+@pytest.mark.parametrize('label', QUERIES)
+@pytest.mark.parametrize('name', ENGINES)
+def test_backends_agree_on_queries(data, parquet, name, label):
+    query = QUERIES[label]
+    expected = get_backend(data['sales'], name='pandas').run(query)
+    on_frame = get_backend(data['sales'], name=name).run(query)
+    on_parquet = get_backend(name=name, source=parquet).run(query)
+    assert list(on_frame.dtypes) == list(expected.dtypes)
+    assert same(expected, on_frame)
+    assert same(by_value(expected, query), by_value(on_parquet, query))
+
+@pytest.mark.parametrize('label', METHODS)
+@pytest.mark.parametrize('name', ENGINES)
+def test_backends_agree_on_service_methods(data, name, label):
+    # Results are cached per dataset, not per backend: make every backend compute
+    result_cache.invalidate(dataset_fingerprint(data['sales']))
+    expected = METHODS[label](dict(data), get_backend(data['sales'], name='pandas'))
+    result_cache.invalidate(dataset_fingerprint(data['sales']))
+    result = METHODS[label](dict(data), get_backend(data['sales'], name=name))
+    assert 'error' not in result
+    assert same(expected, result)
+
+def test_unknown_backend_and_aggregation_are_rejected(data):
+    with pytest.raises(ValueError):
+        get_backend(data['sales'], name='spark')
+    with pytest.raises(ValueError):
+        Query({'x': ('total_amount', 'median')})
+    with pytest.raises(ValueError):
+        Query({'x': ('total_amount', 'sum')}, grain='hour')
+
+def test_missing_keys_are_dropped_on_every_engine(data):
+    sales = data['sales'].copy()
+    sales.loc[sales.index[:50], 'region'] = np.nan
+    sales.attrs = dict(data['sales'].attrs)
+    query = Query({'orders': ('total_amount', 'size')}, by=['region'])
+    expected = int(sales['region'].notna().sum())
+    for name in [n for n in BACKENDS if installed(n)]:
+        assert get_backend(sales, name=name).run(query)['orders'].sum() == expected
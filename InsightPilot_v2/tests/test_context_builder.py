@@ -0,0 +1,35 @@
+import json
+
+import pandas as pd
+from services.ai_service import prompt_payload
+from services.context_builder import bounded_json, estimate_tokens
+from utils.result_table import ResultTable
+
+def table(rows=200):
+    return ResultTable(pd.DataFrame({
+        'customer_id': [f'C{i:04d}' for i in range(rows)],
+        'total_spent': [float(i) * 1.5 for i in range(rows)],
+        'last_purchase': pd.date_range('2026-01-01', periods=rows, freq='D')
+    }))
+
+def test_result_tables_become_row_lists():
+    metrics = table(3)
+    payload = json.loads(bounded_json({'customer_metrics': metrics, 'total': 3}, token_budget=10_000))
+    assert payload['customer_metrics'] == [
+        {'customer_id': 'C0000', 'total_spent': 0.0, 'last_purchase': '2026-01-01 00:00:00'},
+        {'customer_id': 'C0001', 'total_spent': 1.5, 'last_purchase': '2026-01-02 00:00:00'},
+        {'customer_id': 'C0002', 'total_spent': 3.0, 'last_purchase': '2026-01-03 00:00:00'}
+    ]
+    assert payload['total'] == 3
+
+def test_result_table_rows_are_capped_to_the_budget():
+    text = prompt_payload({'customer_metrics': table(), 'frame': table().to_pandas()}, token_budget=300)
+    assert estimate_tokens(text) <= 300
+    payload = json.loads(text)
+    for key in ['customer_metrics', 'frame']:
+        rows = payload[key]
+        assert isinstance(rows[0], dict) and rows[0]['customer_id'] == 'C0000'
+        assert rows[-1].startswith('... ') and rows[-1].endswith(' more')
+
+def test_text_payloads_pass_through():
+    assert prompt_payload('already text') == 'already text'
@@ -0,0 +1,33 @@
+import pandas as pd
+import pytest
+from data.sample_business_data import generate_business_data
+from utils.data_processor import DataProcessor
+from utils.time_pyramid import _build_pyramid, daily_totals, get_time_pyramid
+
+@pytest.fixture
+def data():
+    return generate_business_data(num_orders=6000, num_days=200, end_date='2026-03-31', seed=5)
+
+def rows_dated(template, dates):
+    rows = template.head(len(dates)).copy()
+    rows['date'] = pd.to_datetime(dates)
+    rows['sale_id'] = range(10**6, 10**6 + len(dates))
+    return rows.astype({c: str for c in ['product_id', 'customer_id', 'region']})
+
+@pytest.mark.parametrize('dates', [
+    ['2026-03-31', '2026-04-01', '2026-04-02'],  # from the last day on: pyramid carried over
+    ['2025-10-15', '2026-01-03', '2026-04-02']   # back-dated: pyramid rebuilt
+])
+def test_append_keeps_time_pyramid_exact(data, dates):
+    processor = DataProcessor(data)
+    for level in ['week', 'month', 'quarter', 'year']:
+        get_time_pyramid(processor.sales).level(level)
+    processor.append_sales(rows_dated(data['sales'], dates))
+    sales = processor.sales
+    assert sales['date'].is_monotonic_increasing and len(sales) == 6000 + len(dates)
+    carried = _build_pyramid.peek(sales) is not None
+    assert carried == (dates[0] >= '2026-03-31')
+    pyramid = get_time_pyramid(sales)
+    pd.testing.assert_frame_equal(pyramid.level('day'), daily_totals(sales), check_freq=False)
+    month = sales.groupby(sales['date'].dt.to_period('M'))['total_amount'].sum()
+    assert pyramid.level('month')['revenue'].to_numpy() == pytest.approx(month.to_numpy())
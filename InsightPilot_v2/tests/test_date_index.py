@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.date_index import DateIndex
+
+@pytest.fixture
+def sales():
+    rng = np.random.default_rng(3)
+    dates = pd.Timestamp('2026-01-01') + pd.to_timedelta(rng.integers(0, 60 * 24, 3000), unit='h')
+    amounts = rng.uniform(1, 100, 3000)
+    amounts[::97] = np.nan
+    frame = pd.DataFrame({'date': dates, 'total_amount': amounts, 'region': rng.choice(['N', 'S', 'E'], 3000)})
+    frame.loc[::151, 'date'] = pd.NaT
+    return frame
+
+EDGES = [
+    (None, None), ('2026-01-10', '2026-01-20'), ('2026-01-10 07:00', '2026-01-10 07:00'),
+    ('2025-12-01', '2026-01-05'), ('2026-02-25', '2026-12-31'), ('2026-01-20', '2026-01-10'), (None, '2026-01-15')
+]
+
+@pytest.mark.parametrize('start, end', EDGES)
+@pytest.mark.parametrize('include_end', [True, False])
+def test_windows_match_masks(sales, start, end, include_end):
+    index = DateIndex(sales)
+    mask = sales['date'].notna()
+    if start is not None:
+        mask &= sales['date'] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= (sales['date'] <= pd.Timestamp(end)) if include_end else (sales['date'] < pd.Timestamp(end))
+    window = sales[mask]
+    assert index.orders(start, end, include_end) == len(window)
+    assert index.revenue(start, end, include_end) == pytest.approx(window['total_amount'].sum())
+    expected_aov = window['total_amount'].mean() if window['total_amount'].notna().any() else np.nan
+    assert index.average_order_value(start, end, include_end) == pytest.approx(expected_aov, nan_ok=True)
+    assert index.distinct('region', start, end, include_end) == window['region'].nunique()
+    assert index.rows(start, end, include_end)['date'].is_monotonic_increasing
+
+def test_edges_are_inclusive_or_exclusive(sales):
+    index = DateIndex(sales)
+    day = index.dates[10]
+    lo, hi = index.bounds(day, day)
+    assert hi - lo == int((sales['date'] == day).sum()) > 0
+    assert index.bounds(day, day, include_end=False) == (lo, lo)
+
+def test_nat_rows_are_outside_every_window(sales):
+    index = DateIndex(sales)
+    assert index.n_dated == int(sales['date'].notna().sum())
+    assert index.max_date == sales['date'].max() and index.min_date == sales['date'].min()
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.downsample import chart_points, downsample, lttb_indices, minmax_indices
+
+def series(n=10_000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'day': pd.date_range('2020-01-01', periods=n, freq='D'),
+        'total_amount': np.cumsum(rng.normal(0, 10, n)) + rng.normal(0, 50, n)
+    })
+
+@pytest.mark.parametrize('n_out', [3, 4, 10, 101, 2000])
+def test_lttb_keeps_ends_and_count(n_out):
+    y = series()['total_amount'].to_numpy()
+    positions = lttb_indices(np.arange(len(y)), y, n_out)
+    assert len(positions) == n_out
+    assert positions[0] == 0 and positions[-1] == len(y) - 1
+    assert np.all(np.diff(positions) > 0)
+
+@pytest.mark.parametrize('n_out', [4, 5, 11, 100, 2001])
+def test_minmax_keeps_ends_extrema_and_budget(n_out):
+    y = series()['total_amount'].to_numpy()
+    positions = minmax_indices(y, n_out)
+    assert len(positions) <= n_out
+    assert positions[0] == 0 and positions[-1] == len(y) - 1
+    assert y.argmax() in positions and y.argmin() in positions
+
+def test_small_budgets_and_short_inputs_pass_through():
+    y = np.arange(10, dtype=float)
+    np.testing.assert_array_equal(lttb_indices(y, y, 2), np.arange(10))
+    np.testing.assert_array_equal(lttb_indices(y, y, 10), np.arange(10))
+    np.testing.assert_array_equal(minmax_indices(y, 12), np.arange(10))
+
+@pytest.mark.parametrize('method', ['lttb', 'minmax'])
+@pytest.mark.parametrize('max_points', [50, 500])
+def test_downsample_within_budget_with_forced_points(method, max_points):
+    frame = series()
+    keep = np.zeros(len(frame), dtype=bool)
+    keep[[17, 4_321, 9_000]] = True  # e.g. anomalies
+    keep[frame['total_amount'].argmax()] = True
+    points = downsample(frame, 'day', 'total_amount', max_points, method, keep)
+    assert len(points) <= max_points
+    assert points.index.is_monotonic_increasing and points.index.is_unique
+    assert set(np.flatnonzero(keep)) <= set(points.index)
+    assert points.index[0] == 0 and points.index[-1] == len(frame) - 1
+    pd.testing.assert_frame_equal(points, frame.loc[points.index])
+
+def test_downsample_passes_small_frames_through():
+    frame = series(100)
+    assert downsample(frame, 'day', 'total_amount', max_points=100) is frame
+    assert downsample(series(), 'day', 'total_amount', method=None).shape == (10_000, 2)
+    with pytest.raises(ValueError):
+        downsample(series(), 'day', 'total_amount', max_points=10, method='median')
+
+def test_downsample_handles_missing_values_and_index_x():
+    frame = series(5_000).set_index('day')
+    frame.iloc[::97, 0] = np.nan
+    for method in ['lttb', 'minmax']:
+        points = downsample(frame, None, 'total_amount', 300, method)
+        assert len(points) <= 300 and points.index[0] == frame.index[0] and points.index[-1] == frame.index[-1]
+
+def test_chart_points_builds_once_per_key():
+    sales = series(10)
+    calls = []
+    def build():
+        calls.append(1)
+        return series()
+    first = chart_points(sales, 'all', build, 'day', 'total_amount', max_points=100)
+    second = chart_points(sales, 'all', build, 'day', 'total_amount', max_points=100)
+    assert first is second and len(calls) == 1
+    assert len(first[0]) <= 100 and first[1] == 10_000
@@ -0,0 +1,88 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from utils.export import ExportCache, iter_csv_chunks, write_csv, write_parquet
+
+try:
+    import pyarrow  # noqa: F401
+    HAVE_ARROW = True
+except ImportError:
+    HAVE_ARROW = False
+
+needs_arrow = pytest.mark.skipif(not HAVE_ARROW, reason='pyarrow is not installed')
+
+@pytest.fixture
+def frame():
+    rows = 250
+    rng = np.random.default_rng(0)
+    notes = np.array([f'note {i}' for i in range(rows)], dtype=object)
+    notes[::7] = None
+    return pd.DataFrame({
+        'date': pd.date_range('2026-01-01', periods=rows, freq='h'),
+        'region': pd.Categorical(rng.choice(['North', 'South', 'East'], rows), categories=['South', 'North', 'East']),
+        'note': pd.Series(notes, dtype=object),  # text as uploaded files give it on pandas 2
+        'total_amount': rng.normal(100, 20, rows).round(2),
+        'quantity': rng.integers(1, 10, rows)
+    })
+
+def plain(frame):
+    # Text and categories compared as Python values, missing text as None
+    frame = frame.astype({'region': str, 'note': object})
+    return frame.assign(note=frame['note'].where(frame['note'].notna(), None))
+
+def test_csv_chunks_have_one_header(frame):
+    chunks = list(iter_csv_chunks(frame, chunk_rows=100))
+    assert len(chunks) == 3
+    assert b''.join(chunks).decode().count('total_amount') == 1
+    assert list(iter_csv_chunks(frame.iloc[:0], chunk_rows=100)) == [b'date,region,note,total_amount,quantity\n']
+
+def test_csv_round_trip(frame, tmp_path):
+    path = tmp_path / 'out.csv'
+    write_csv(frame, path, chunk_rows=64)
+    loaded = pd.read_csv(path, parse_dates=['date'])
+    pd.testing.assert_frame_equal(plain(loaded), plain(frame), check_dtype=False)
+
+@needs_arrow
+@pytest.mark.parametrize('chunk_rows', [1, 64, 1_000])
+def test_parquet_round_trip(frame, tmp_path, chunk_rows):
+    path = tmp_path / 'out.parquet'
+    write_parquet(frame, path, chunk_rows=chunk_rows)
+    loaded = pd.read_parquet(path)
+    assert isinstance(loaded['region'].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(plain(loaded), plain(frame), check_dtype=False)
+    import pyarrow.parquet as pq
+    assert pq.ParquetFile(path).num_row_groups == -(-len(frame) // chunk_rows)
+
+@needs_arrow
+def test_parquet_text_columns_missing_in_the_first_chunk(tmp_path):
+    frame = pd.DataFrame({'note': pd.Series([None, None, 'late', 'text'], dtype=object), 'x': [1, 2, 3, 4]})
+    path = tmp_path / 'out.parquet'
+    write_parquet(frame, path, chunk_rows=2)
+    assert pd.read_parquet(path)['note'].tolist()[2:] == ['late', 'text']
+    write_parquet(frame.iloc[:0], path)
+    assert len(pd.read_parquet(path)) == 0
+
+def test_export_cache_reuses_and_evicts(frame, tmp_path):
+    cache = ExportCache(str(tmp_path), max_files=2, chunk_rows=100)
+    assert cache.get('fp', 'all', 'CSV') is None
+    path = cache.export(frame, 'fp', 'all', 'CSV')
+    assert cache.get('fp', 'all', 'CSV') == path
+    mtime = os.path.getmtime(path)
+    assert cache.export(frame.iloc[:1], 'fp', 'all', 'CSV') == path and os.path.getmtime(path) >= mtime
+    assert len(pd.read_csv(path)) == len(frame)  # not rewritten from the other frame
+    assert cache.path_for('fp', 'north', 'CSV') != path and cache.path_for('other', 'all', 'CSV') != path
+    os.utime(path, (1, 1))
+    cache.export(frame.iloc[:10], 'fp', 'north', 'CSV')
+    cache.export(frame.iloc[:20], 'fp', 'south', 'CSV')
+    assert not os.path.exists(path)  # the oldest export was evicted
+    assert len(os.listdir(tmp_path)) == 2
+    cache.clear()
+    assert os.listdir(tmp_path) == []
+
+@needs_arrow
+def test_export_cache_writes_parquet(frame, tmp_path):
+    path = ExportCache(str(tmp_path), chunk_rows=100).export(frame, 'fp', 'all', 'Parquet')
+    assert path.endswith('.parquet') and len(pd.read_parquet(path)) == len(frame)
+    assert [n for n in os.listdir(tmp_path) if n.endswith('.tmp')] == []
@@ -0,0 +1,67 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from data.sample_business_data import generate_business_data
+from utils.data_processor import normalize_sales
+from utils.filter_index import FilterIndex, filter_key, get_filter_index
+
+@pytest.fixture(scope='module')
+def sales():
+    data = generate_business_data(num_orders=8_000, num_days=300, end_date='2026-03-31', seed=17)
+    sales = data['sales'].astype({'region': object})
+    sales.attrs = {}
+    sales.loc[sales.index[:20], 'region'] = np.nan  # rows without a region match no region selection
+    return normalize_sales(sales)
+
+def masked(sales, start, end, product_id=None, region=None):
+    """The dashboard filter as it was written with a boolean mask"""
+    mask = (sales['date'].dt.date >= start) & (sales['date'].dt.date <= end)
+    if product_id:
+        mask &= sales['product_id'].isin(product_id)
+    if region:
+        mask &= sales['region'].isin(region)
+    return sales[mask]
+
+def days(sales, first, last):
+    lo = sales['date'].min().date()
+    return lo + datetime.timedelta(days=first), lo + datetime.timedelta(days=last)
+
+FILTERS = {
+    'everything': ((0, 299), {}),
+    'one_day': ((100, 100), {}),
+    'window': ((30, 120), {}),
+    'products': ((0, 299), {'product_id': ['P001', 'P004', 'P007']}),
+    'regions': ((0, 299), {'region': ['North']}),
+    'combined': ((60, 200), {'product_id': ['P002', 'P003'], 'region': ['South', 'East']}),
+    'unknown_value': ((0, 299), {'region': ['Atlantis']}),
+    'unknown_and_known': ((0, 299), {'region': ['Atlantis', 'West']}),
+    'empty_selection': ((10, 50), {'product_id': [], 'region': None}),
+    'before_the_data': ((-30, -1), {}),
+    'reversed_range': ((50, 10), {})
+}
+
+@pytest.mark.parametrize('label', FILTERS)
+def test_rows_match_the_boolean_mask(sales, label):
+    (first, last), filters = FILTERS[label]
+    start, end = days(sales, first, last)
+    expected = masked(sales, start, end, **filters)
+    rows = get_filter_index(sales).rows(start=start, end=end, **filters)
+    pd.testing.assert_frame_equal(rows.reset_index(drop=True), expected.reset_index(drop=True))
+
+def test_options_and_date_range(sales):
+    index = FilterIndex(sales)
+    assert index.options['region'] == sorted(sales['region'].dropna().unique().tolist())
+    assert index.options['product_id'] == sorted(sales['product_id'].unique().tolist())
+    assert index.date_range() == (sales['date'].min().date(), sales['date'].max().date())
+
+def test_filter_states_are_reused(sales):
+    index = FilterIndex(sales, max_cached=2)
+    start, end = days(sales, 0, 99)
+    rows = index.rows(start=start, end=end, region=['North', 'West'])
+    assert index.rows(start=start, end=end, region=['West', 'North']) is rows
+    index.rows(start=start, end=end)
+    index.rows(start=start, end=end, region=['South'])
+    assert index.rows(start=start, end=end, region=['North', 'West']) is not rows
+    assert filter_key(start, end, region=['b', 'a'], product_id=[]) == filter_key(start, end, region=['a', 'b'])
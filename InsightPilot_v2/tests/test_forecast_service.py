@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+from components.forecast import simple_linear_forecast
+from data.sample_business_data import generate_business_data
+from services.batch_reports import run_batch
+from services.forecast_service import forecast_segments, forest_forecast, segment_daily_panel
+from services.report_store import ReportStore, precomputed
+from utils.data_processor import normalize_sales
+
+@pytest.fixture(scope='module')
+def data():
+    data = generate_business_data(num_orders=6_000, num_days=180, end_date='2026-03-31', seed=23)
+    data['sales'] = normalize_sales(data['sales'])
+    return data
+
+def looped_forecasts(sales, periods):
+    """One simple_linear_forecast per product x region series, zero revenue on days without orders"""
+    days = pd.date_range(sales['date'].min().normalize(), sales['date'].max().normalize(), freq='D')
+    frames = []
+    grouped = sales.groupby(['product_id', 'region', sales['date'].dt.normalize()], observed=True)['total_amount'].sum()
+    for (product, region), series in grouped.groupby(level=[0, 1]):
+        series = series.droplevel([0, 1]).reindex(days, fill_value=0)
+        forecast = simple_linear_forecast(series, periods).clip(lower=0)
+        frames.append(pd.DataFrame({'product_id': str(product), 'region': str(region), 'date': forecast.index,
+                                    'predicted_revenue': forecast.to_numpy()}))
+    return pd.concat(frames, ignore_index=True)
+
+def tidy(frame):
+    frame = frame.astype({'product_id': str, 'region': str})[['product_id', 'region', 'date', 'predicted_revenue']]
+    return frame.sort_values(['product_id', 'region', 'date']).reset_index(drop=True)
+
+def test_batched_linear_matches_the_single_series_loop(data):
+    expected = tidy(looped_forecasts(data['sales'], 30))
+    result = forecast_segments(data['sales'], periods=30)
+    assert (result['model'] == 'linear').all()
+    result = tidy(result)
+    pd.testing.assert_frame_equal(result.drop(columns='predicted_revenue'), expected.drop(columns='predicted_revenue'), check_dtype=False)
+    np.testing.assert_allclose(result['predicted_revenue'], expected['predicted_revenue'], rtol=1e-7, atol=1e-6)
+
+def test_total_series_matches_the_single_series_forecast(data):
+    result = forecast_segments(data['sales'], periods=14, dimensions=[])
+    daily = data['sales'].groupby(data['sales']['date'].dt.normalize())['total_amount'].sum()
+    expected = simple_linear_forecast(daily, 14).clip(lower=0)
+    np.testing.assert_allclose(result['predicted_revenue'], expected.to_numpy(), rtol=1e-7)
+    assert list(result['date']) == list(expected.index)
+
+def test_panel_is_zero_filled(data):
+    panel = segment_daily_panel(data['sales'])
+    assert panel.index.is_monotonic_increasing and panel.index.to_series().diff().dropna().eq(pd.Timedelta(days=1)).all()
+    np.testing.assert_allclose(panel.to_numpy().sum(), data['sales']['total_amount'].sum())
+
+def test_forest_pool_matches_serial(data):
+    panel = segment_daily_panel(data['sales']).iloc[:, :6]
+    serial = forest_forecast(panel, periods=7, n_workers=1, chunk_size=2)
+    pooled = forest_forecast(panel, periods=7, n_workers=2, chunk_size=2)
+    pd.testing.assert_frame_equal(serial, pooled)
+
+def test_precomputed_forecasts_match_a_fresh_run(data, tmp_path):
+    store = ReportStore(root=str(tmp_path))
+    run_batch(data, tasks=['segment_forecasts'], n_workers=1, store=store, log=lambda message: None)
+    stored = precomputed(data['sales'], 'segment_forecasts', store)
+    fresh = forecast_segments(data['sales'], periods=30)
+    again = forecast_segments(data['sales'], periods=30)  # cube and panel come from the per-dataset memo
+    pd.testing.assert_frame_equal(again, fresh)
+    pd.testing.assert_frame_equal(tidy(stored), tidy(fresh), check_dtype=False)
+
+def test_unknown_method(data):
+    with pytest.raises(ValueError):
+        forecast_segments(data['sales'], method='arima')
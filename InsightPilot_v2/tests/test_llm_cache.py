@@ -0,0 +1,60 @@
+import os
+
+import pytest
+from services.llm_cache import LLMResponseCache
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'cache' / 'llm.sqlite')
+
+def test_identical_prompt_hits(path):
+    cache = LLMResponseCache(path)
+    key = cache.make_key('gpt-4o', 'You are an analyst', 'Why did sales drop?', 'fp1')
+    assert cache.get(key) is None
+    cache.put(key, {'analysis': 'seasonality'}, model='gpt-4o')
+    assert cache.get(cache.make_key('gpt-4o', 'You are an analyst', 'Why did sales drop?', 'fp1')) == {'analysis': 'seasonality'}
+    assert (cache.hits, cache.misses) == (1, 1)
+    # Whitespace and case do not make a different prompt
+    assert cache.make_key('gpt-4o', 'You are  an analyst', ' why did SALES drop?\n', 'fp1') == key
+
+@pytest.mark.parametrize('other', [
+    ('gpt-4o-mini', 'You are an analyst', 'Why did sales drop?', 'fp1'),
+    ('gpt-4o', 'You are a forecaster', 'Why did sales drop?', 'fp1'),
+    ('gpt-4o', 'You are an analyst', 'Why did sales rise?', 'fp1'),
+    ('gpt-4o', 'You are an analyst', 'Why did sales drop?', 'fp2'),
+    ('gpt-4o', 'You are an analyst', 'Why did sales drop?', None)
+])
+def test_keys_separate_model_prompt_and_dataset(path, other):
+    cache = LLMResponseCache(path)
+    key = cache.make_key('gpt-4o', 'You are an analyst', 'Why did sales drop?', 'fp1')
+    cache.put(key, {'analysis': 'seasonality'})
+    assert cache.make_key(*other) != key
+    assert cache.get(cache.make_key(*other)) is None
+
+def test_entries_persist_across_instances(path):
+    first = LLMResponseCache(path)
+    key = first.make_key('gpt-4o', 'system', 'question', 'fp')
+    first.put(key, {'answer': 42}, model='gpt-4o')
+    second = LLMResponseCache(path)
+    assert second.get(key) == {'answer': 42}
+    assert second.stats()['entries'] == 1 and os.path.exists(path)
+    second.clear()
+    assert first.get(key) is None
+
+def test_expired_entries_are_misses(path):
+    cache = LLMResponseCache(path, ttl_seconds=0)
+    key = cache.make_key('gpt-4o', 'system', 'question')
+    cache.put(key, {'answer': 1})
+    assert cache.get(key) is None
+    assert LLMResponseCache(path).stats()['entries'] == 0
+
+def test_size_cap_drops_least_recently_used(path):
+    cache = LLMResponseCache(path, max_bytes=250)
+    keys = [cache.make_key('gpt-4o', 'system', f'question {i}') for i in range(3)]
+    for key in keys[:2]:
+        cache.put(key, {'answer': 'x' * 100})
+    assert cache.get(keys[0]) is not None  # keys[1] is now the least recently used
+    cache.put(keys[2], {'answer': 'x' * 100})
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+    assert cache.stats()['bytes'] <= 250
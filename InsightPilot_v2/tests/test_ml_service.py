@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+from data.sample_business_data import generate_business_data
+from services.ml_service import MLService
+from services.model_registry import ModelRegistry
+from utils.data_processor import normalize_sales
+
+def sales_data(seed):
+    data = generate_business_data(num_orders=4_000, num_days=200, end_date='2026-03-31', seed=seed)
+    return normalize_sales(data['sales'])
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(str(tmp_path))
+
+def train(registry, sales):
+    return MLService(registry=registry, n_jobs=1).train_sales_prediction_model(sales)
+
+def test_appended_days_refresh_the_stored_forest(registry):
+    sales = sales_data(5)
+    old = sales[sales['date'] <= sales['date'].max() - pd.Timedelta(days=10)]
+    first = train(registry, old)
+    refreshed = train(registry, sales)
+    assert first['training']['mode'] == 'full'
+    assert refreshed['training']['mode'] == 'incremental'
+    assert refreshed['refresh']['new_days'] == 10
+    # Scores are computed on the extended data, not copied from the previous version
+    assert refreshed['cv']['seconds'] != first['cv']['seconds']
+    assert refreshed['mae'] == refreshed['cv']['mae']
+    assert refreshed['training_fingerprint'] != first['training_fingerprint']
+
+def test_other_data_with_an_earlier_last_day_is_not_refreshed(registry):
+    sales, other = sales_data(5), sales_data(6)
+    other = other[other['date'] <= other['date'].max() - pd.Timedelta(days=10)]
+    # Same first day and fewer days: what the lookup used to accept on its own
+    assert other['date'].min() == sales['date'].min() and other['date'].max() < sales['date'].max()
+    train(registry, other)
+    assert train(registry, sales)['training']['mode'] == 'full'
+
+def test_changed_history_is_not_refreshed(registry):
+    sales = sales_data(5)
+    old = sales[sales['date'] <= sales['date'].max() - pd.Timedelta(days=10)]
+    train(registry, old)
+    edited = sales.copy()
+    edited.loc[edited.index[100], 'total_amount'] += 1_000
+    assert train(registry, edited)['training']['mode'] == 'full'
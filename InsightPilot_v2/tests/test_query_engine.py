@@ -0,0 +1,101 @@
+import pandas as pd
+import pytest
+from data.sample_business_data import generate_business_data
+from services.query_engine import UNKNOWN_TEXT, QueryEngine
+from utils.data_processor import normalize_sales
+
+@pytest.fixture(scope='module')
+def sales():
+    data = generate_business_data(num_orders=6_000, num_days=400, end_date='2026-03-31', seed=9)
+    return normalize_sales(data['sales'])
+
+@pytest.fixture(scope='module')
+def engine(sales):
+    return QueryEngine(sales)
+
+def legacy_answer(question, sales):
+    """The keyword matcher the chat page used before the query engine"""
+    q = question.lower()
+    df = sales.copy()
+    if 'highest' in q and 'month' in q:
+        monthly = df.groupby(df['date'].dt.to_period('M'))['total_amount'].sum()
+        top = monthly.idxmax(), monthly.max()
+        return f"Highest month was {top[0].strftime('%Y-%m')} with revenue {top[1]:.2f}"
+    if 'top' in q and 'product' in q:
+        p = df.groupby('product_id', observed=True)['total_amount'].sum().sort_values(ascending=False).head(5)
+        return 'Top products (by revenue):\n' + p.to_string()
+    if 'total revenue' in q or 'total sales' in q:
+        return f"Total revenue: {df['total_amount'].sum():.2f}"
+    if 'average order' in q or 'aov' in q:
+        return f'Average order value: {df["total_amount"].mean():.2f}'
+
+@pytest.mark.parametrize('question', [
+    'highest month', 'Which month had the highest revenue?', 'top product', 'top products',
+    'total revenue', 'What are the total sales?', 'average order value', 'aov'
+])
+def test_legacy_wordings_give_the_same_answers(engine, sales, question):
+    assert engine.answer(question) == legacy_answer(question, sales)
+
+@pytest.mark.parametrize('question, intent', [
+    ('help', 'help'),
+    ('what period does the data cover', 'coverage'),
+    ('top 3 regions by orders', 'ranking'),
+    ('worst products', 'ranking'),
+    ('lowest week', 'extreme_period'),
+    ('revenue by month', 'breakdown'),
+    ('orders per region', 'breakdown'),
+    ('revenue growth last month', 'growth'),
+    ('how many customers in August', 'distinct_customers'),
+    ('average order value', 'aov'),
+    ('total quantity', 'total'),
+    ('tell me a joke', 'unknown')
+])
+def test_intent_selection(engine, question, intent):
+    assert engine.parse(question)['intent'] == intent
+
+def test_parameters(engine):
+    query = engine.parse('bottom 3 regions by orders')
+    assert (query['dimension'], query['metric'], query['k'], query['ascending']) == ('region', 'orders', 3, True)
+    query = engine.parse('top 5 customers by revenue')
+    assert (query['intent'], query['dimension'], query['metric']) == ('ranking', 'customer_id', 'revenue')
+    query = engine.parse('orders per customer')
+    assert (query['by'], query['metric']) == ('customer_id', 'orders')
+    assert engine.parse('weekly revenue')['by'] == 'W'
+
+@pytest.mark.parametrize('question, start, end', [
+    ('revenue from 2025-06-01 to 2025-06-15', '2025-06-01', '2025-06-15'),
+    ('revenue since 2026-03-01', '2026-03-01', None),
+    ('revenue last 90 days', '2026-01-01', '2026-03-31'),
+    ('revenue past 2 weeks', '2026-03-18', '2026-03-31'),
+    ('revenue last 3 months', '2026-01-01', '2026-03-31'),
+    ('revenue this quarter', '2026-01-01', '2026-03-31'),
+    ('revenue last month', '2026-02-01', '2026-02-28'),
+    ('revenue last year', '2025-01-01', '2025-12-31'),
+    ('revenue 2025-11', '2025-11-01', '2025-11-30'),
+    ('revenue in August', '2025-08-01', '2025-08-31'),  # latest August up to the data's last day
+    ('revenue in mar 2025', '2025-03-01', '2025-03-31'),
+    ('revenue in 2025', '2025-01-01', '2025-12-31'),
+    ('total revenue', None, None)
+])
+def test_time_ranges(engine, question, start, end):
+    query = engine.parse(question)
+    assert query['start'] == (pd.Timestamp(start) if start else None)
+    assert query['end'] == (pd.Timestamp(end) if end else None)
+
+def test_ranges_match_the_rows(engine, sales):
+    answer = engine.answer('total orders from 2025-06-01 to 2025-06-15')
+    rows = sales[(sales['date'] >= '2025-06-01') & (sales['date'] < '2025-06-16')]
+    assert answer == f'Total orders from 2025-06-01 to 2025-06-15: {len(rows)}'
+    answer = engine.answer('revenue in 2025-11')
+    rows = sales[sales['date'].dt.to_period('M') == pd.Period('2025-11')]
+    assert answer == f"Total revenue in 2025-11: {rows['total_amount'].sum():.2f}"
+
+@pytest.mark.parametrize('question', [
+    'revenue 2024-13', 'revenue since 2024-02-30', 'revenue from 2025-02-01 to 2025-02-31', 'revenue in 0000'
+])
+def test_invalid_dates_fall_back_to_the_default_reply(engine, question):
+    assert engine.answer(question) == UNKNOWN_TEXT
+
+def test_unknown_question_and_missing_data(engine):
+    assert engine.answer('tell me a joke') == UNKNOWN_TEXT
+    assert engine.answer('revenue by region since 2030-01-01').startswith('Revenue by region since 2030-01-01')
@@ -0,0 +1,21 @@
+import pandas as pd
+from services.report_store import ReportStore
+from utils.result_table import ResultTable
+
+def test_tables_inside_results_are_stored_as_tables(tmp_path):
+    store = ReportStore(root=str(tmp_path))
+    metrics = pd.DataFrame({'customer_id': ['C1', 'C2'], 'total_spent': [10.5, 3.0],
+                            'last_purchase': pd.to_datetime(['2026-01-05', '2026-02-01'])})
+    manifest = store.save('abc', {
+        'customer_analysis': {'customer_metrics': ResultTable(metrics), 'total_customers': 2},
+        'kpis': {'total_revenue': 13.5},
+        'trends': ResultTable(metrics)
+    })
+    assert set(manifest['artifacts']) == {'customer_analysis', 'customer_analysis.customer_metrics', 'kpis', 'trends'}
+    assert store.load('abc', 'customer_analysis') == {'total_customers': 2}
+    assert store.load('abc', 'kpis') == {'total_revenue': 13.5}
+    for name in ['customer_analysis.customer_metrics', 'trends']:
+        loaded = store.load('abc', name)
+        assert isinstance(loaded, pd.DataFrame)
+        pd.testing.assert_frame_equal(loaded, metrics, check_dtype=False)
+    assert store.load('abc', 'missing') is None
@@ -0,0 +1,65 @@
+import os
+
+import pandas as pd
+from data.sample_business_data import generate_business_data
+from services.ml_service import MLService
+from services.model_registry import ModelRegistry
+from utils.data_processor import normalize_sales
+from utils.result_cache import ResultCache, dataset_fingerprint
+
+def sales(seed=1):
+    data = generate_business_data(num_orders=5000, num_days=60, end_date='2026-01-31', seed=seed)
+    return normalize_sales(data['sales'])
+
+def test_fingerprint_covers_every_row():
+    base = sales()
+    for column in ['region', 'product_id', 'quantity', 'total_amount', 'date']:
+        edited = base.copy()
+        row = edited.index[1234]
+        if isinstance(edited[column].dtype, pd.CategoricalDtype):
+            categories = edited[column].cat.categories
+            edited.loc[row, column] = categories[1] if edited.loc[row, column] == categories[0] else categories[0]
+        elif column == 'date':
+            edited.loc[row, column] += pd.Timedelta(seconds=1)
+        else:
+            edited.loc[row, column] += 1
+        assert dataset_fingerprint(edited) != dataset_fingerprint(base), column
+
+def test_fingerprint_depends_on_content_only():
+    base = sales()
+    assert dataset_fingerprint(base.copy()) == dataset_fingerprint(base)
+    assert dataset_fingerprint(base.reset_index(drop=True)) == dataset_fingerprint(base)
+    assert dataset_fingerprint(sales(seed=2)) != dataset_fingerprint(base)
+
+def test_detect_anomalies_sets_detector_every_call(tmp_path):
+    data = sales()
+    MLService(registry=ModelRegistry(str(tmp_path))).detect_anomalies(data)
+    ml = MLService(registry=ModelRegistry(str(tmp_path)))
+    assert ml.detect_anomalies(data)['success']
+    assert ml.anomaly_detector is not None
+
+def disk_files(directory):
+    return sorted(n for n in os.listdir(directory) if n.endswith('.pkl'))
+
+def test_disk_tier_stays_within_its_budget(tmp_path):
+    cache = ResultCache(disk_dir=str(tmp_path), max_disk_bytes=5_000)
+    value = b'x' * 1_000  # pickles to a little over 1000 bytes
+    for i in range(4):
+        cache.put(f'k{i}', f'fp{i}', value)
+        os.utime(tmp_path / f'fp{i}_k{i}.pkl', (1_000 + i, 1_000 + i))
+    # A disk hit marks k0 as recently used, so k1 is the oldest now
+    assert ResultCache(disk_dir=str(tmp_path)).get('k0', 'fp0') == (True, value)
+    for i in range(4, 6):
+        cache.put(f'k{i}', f'fp{i}', value)
+    assert disk_files(tmp_path) == ['fp0_k0.pkl', 'fp3_k3.pkl', 'fp4_k4.pkl', 'fp5_k5.pkl']
+    assert sum(os.path.getsize(tmp_path / n) for n in disk_files(tmp_path)) <= 5_000
+    assert cache.stats()['disk_evictions'] == 2
+    # An evicted entry is still served from memory, but not from disk
+    assert cache.get('k1', 'fp1') == (True, value)
+    assert ResultCache(disk_dir=str(tmp_path)).get('k1', 'fp1') == (False, None)
+
+def test_entries_over_the_disk_budget_stay_in_memory(tmp_path):
+    cache = ResultCache(disk_dir=str(tmp_path), max_disk_bytes=100)
+    cache.put('big', 'fp', b'x' * 1_000)
+    assert disk_files(tmp_path) == []
+    assert cache.get('big', 'fp') == (True, b'x' * 1_000)
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import pytest
+from data.sample_business_data import generate_business_data
+from services.segmentation import QUARTILES, QuantileSketch, RFMSegmenter, _bins, customer_table
+from utils.data_processor import normalize_sales
+
+@pytest.fixture(scope='module')
+def sales():
+    data = generate_business_data(num_orders=30_000, num_days=365, num_customers=2_000, end_date='2026-03-31', seed=21)
+    return normalize_sales(data['sales'])
+
+def qcut_segments(sales):
+    """The segmentation as it was written with pd.qcut"""
+    table = customer_table(sales)
+    current = table['last_purchase'].max()
+    recency = (current - table['last_purchase']).dt.days
+    scores = (
+        pd.qcut(recency, 4, labels=[4, 3, 2, 1]).astype(int)
+        + pd.qcut(table['order_count'].rank(method='first'), 4, labels=[1, 2, 3, 4]).astype(int)
+        + pd.qcut(table['total_spent'], 4, labels=[1, 2, 3, 4]).astype(int)
+    )
+    segments = pd.cut(scores, [0, 3, 5, 7, 9, 12], labels=['Lost Customers', 'At Risk', 'Potential Loyalists',
+                                                          'Loyal Customers', 'Champions'])
+    return scores.to_numpy(), segments.astype(str).to_numpy()
+
+def test_exact_segments_match_qcut(sales):
+    result = RFMSegmenter().fit(sales).segments()
+    scores, segments = qcut_segments(sales)
+    np.testing.assert_array_equal(result['rfm_score'].to_numpy(), scores)
+    np.testing.assert_array_equal(result['segment'].to_numpy(), segments)
+
+@pytest.mark.parametrize('values', [
+    np.arange(1, 101, dtype=float),
+    np.random.default_rng(0).lognormal(3, 1, 1001),
+    np.random.default_rng(0).integers(0, 30, 500).astype(float)
+])
+def test_bins_match_qcut(values):
+    edges = np.quantile(values, QUARTILES)
+    assert len(np.unique(edges)) == 3
+    np.testing.assert_array_equal(_bins(values, edges), pd.qcut(values, 4, labels=False) + 1)
+
+@pytest.mark.parametrize('values', [
+    np.array([0, 0, 0, 0, 0, 0, 1, 2, 3, 9], dtype=float),
+    np.array([5] * 7 + [6, 7, 8], dtype=float),
+    np.array([1, 2, 3] + [7] * 7, dtype=float)
+])
+def test_bins_with_duplicate_edges(values):
+    edges = np.quantile(values, QUARTILES)
+    with pytest.raises(ValueError):
+        pd.qcut(values, 4, labels=False)  # the qcut version failed on such data
+    scores = _bins(values, edges)
+    # Same right-closed intervals as qcut, the empty ones skipped
+    np.testing.assert_array_equal(scores, np.digitize(values, edges, right=True) + 1)
+    # A refinement of qcut's grouping once duplicate edges are dropped, in the same order
+    codes = pd.qcut(values, 4, labels=False, duplicates='drop')
+    pairs = pd.DataFrame({'code': codes, 'score': scores}).drop_duplicates()
+    assert pairs['score'].is_unique
+    assert pairs.sort_values('score')['code'].is_monotonic_increasing
+
+@pytest.mark.parametrize('values', [
+    np.random.default_rng(1).lognormal(5, 2, 20_000),
+    -np.random.default_rng(2).lognormal(2, 1, 5_000),
+])
+def test_sketch_quantiles_within_relative_accuracy(values):
+    accuracy = 0.01
+    sketch = QuantileSketch(accuracy)
+    sketch.add(values)
+    qs = [0.01, 0.25, 0.5, 0.75, 0.99]
+    exact = np.quantile(values, qs)
+    assert np.all(np.abs(sketch.quantiles(qs) - exact) <= accuracy * np.abs(exact) + 1e-9)
+
+def test_exact_sketch_matches_numpy_on_integers():
+    values = np.random.default_rng(3).integers(-50, 500, 3_001)
+    sketch = QuantileSketch()
+    sketch.add(values)
+    np.testing.assert_allclose(sketch.quantiles(QUARTILES), np.quantile(values, QUARTILES))
+
+def test_sketch_merge_and_remove():
+    rng = np.random.default_rng(4)
+    a, b = rng.lognormal(3, 1, 4_000), rng.lognormal(6, 1, 3_000)
+    whole = QuantileSketch(0.01)
+    whole.add(np.concatenate([a, b]))
+    left, right = QuantileSketch(0.01), QuantileSketch(0.01)
+    left.add(a)
+    right.add(b)
+    merged = left.merge(right)
+    np.testing.assert_array_equal(merged.counts, whole.counts[merged.offset - whole.offset:][:len(merged.counts)])
+    assert merged.count == whole.count
+    merged.remove(b)
+    only_a = QuantileSketch(0.01)
+    only_a.add(a)
+    np.testing.assert_allclose(merged.quantiles(QUARTILES), only_a.quantiles(QUARTILES))
+    with pytest.raises(ValueError):
+        merged.merge(QuantileSketch(0.05))
+
+def test_update_matches_fit_on_all_rows(sales):
+    cut = sales['date'].max() - pd.Timedelta(days=20)
+    old, new = sales[sales['date'] <= cut], sales[sales['date'] > cut]
+    updated = RFMSegmenter().fit(old).update(new).segments().set_index('customer_id').sort_index()
+    fitted = RFMSegmenter().fit(sales).segments().set_index('customer_id').sort_index()
+    fitted.index = fitted.index.astype(str)
+    updated.index = updated.index.astype(str)
+    np.testing.assert_allclose(updated['total_spent'].to_numpy(), fitted['total_spent'].to_numpy(), rtol=1e-12)
+    for column in ['order_count', 'first_purchase', 'last_purchase', 'recency', 'recency_score', 'monetary_score']:
+        np.testing.assert_array_equal(updated[column].to_numpy(), fitted[column].to_numpy(), err_msg=column)
+
+def test_approximate_segments_mostly_agree(sales):
+    exact = RFMSegmenter().fit(sales).segments()
+    approximate = RFMSegmenter(approximate=True).fit(sales).segments()
+    assert (exact['segment'] == approximate['segment']).mean() > 0.95
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+from data.sample_business_data import generate_business_data
+from utils.data_processor import normalize_sales
+from utils.star_schema import get_star_schema
+
+@pytest.fixture
+def data():
+    data = generate_business_data(num_orders=5_000, num_days=120, num_customers=300, end_date='2026-03-31', seed=8)
+    sales = data['sales'].astype({'customer_id': object})
+    sales.attrs = {}
+    # An id missing from the dimension table and a missing id on the fact side
+    sales.loc[sales.index[:5], 'customer_id'] = 'C-UNKNOWN'
+    sales.loc[sales.index[5:8], 'customer_id'] = np.nan
+    data['sales'] = normalize_sales(sales)
+    customers = data['customers']
+    # A duplicate id: the first row wins, like a left merge on de-duplicated ids
+    data['customers'] = pd.concat([customers, customers.iloc[[3]].assign(region='Elsewhere')], ignore_index=True)
+    return data
+
+def merged(table, dimension, column):
+    return table.merge(dimension.drop_duplicates(column), on=column, how='left')
+
+def test_keys_point_at_dimension_rows(data):
+    schema = get_star_schema(data['sales'], customers=data['customers'])
+    keys = schema.keys['customer']
+    assert keys.dtype == np.int32 and len(keys) == len(data['sales'])
+    ids = data['sales']['customer_id'].astype(object).to_numpy()
+    known = keys >= 0
+    np.testing.assert_array_equal(data['customers']['customer_id'].to_numpy()[keys[known]], ids[known])
+    assert not known[:8].any()
+
+def test_enrich_matches_left_merge(data):
+    schema = get_star_schema(data['sales'], customers=data['customers'], products=data['products'])
+    table = data['sales'].groupby('customer_id', observed=True)['total_amount'].sum().reset_index()
+    table['customer_id'] = table['customer_id'].astype(str)
+    table = table.sample(frac=1, random_state=0).reset_index(drop=True)  # alignment must not rely on order
+    enriched = schema.enrich(table, 'customer')
+    expected = merged(table, data['customers'], 'customer_id')
+    pd.testing.assert_frame_equal(enriched.astype(object), expected.astype(object))
+    assert enriched.loc[enriched['customer_id'] == 'C-UNKNOWN', 'region'].isna().all()
+
+def test_enrich_selected_columns_and_missing_dimension(data):
+    schema = get_star_schema(data['sales'], products=data['products'])
+    table = pd.DataFrame({'product_id': ['P002', 'P001', 'nope']})
+    enriched = schema.enrich(table, 'product', ['category'])
+    assert list(enriched.columns) == ['product_id', 'category']
+    expected = merged(table, data['products'][['product_id', 'category']], 'product_id')
+    assert enriched['category'].tolist()[:2] == expected['category'].tolist()[:2]
+    assert pd.isna(enriched['category'].iloc[2])
+    assert schema.enrich(table, 'customer') is table  # no customer table given
+
+def test_attribute_and_view_follow_fact_rows(data):
+    schema = get_star_schema(data['sales'], customers=data['customers'])
+    expected = merged(data['sales'][['customer_id']].astype(object), data['customers'], 'customer_id')['region']
+    region = schema.attribute('customer', 'region')
+    assert list(pd.Series(region).astype(object).where(pd.notna(region), None)) == \
+        list(expected.astype(object).where(expected.notna(), None))
+    view = schema.view('customer', ['region'])
+    assert view is schema.view('customer', ['region'])
+    assert view.attrs.get('normalized') and len(view) == len(data['sales'])
+    pd.testing.assert_series_equal(view['total_amount'], data['sales']['total_amount'])
+
+def test_schemas_share_dimensions(data):
+    first = get_star_schema(data['sales'], customers=data['customers'])
+    second = get_star_schema(data['sales'], customers=data['customers'])
+    assert first.dimensions['customer'] is second.dimensions['customer']
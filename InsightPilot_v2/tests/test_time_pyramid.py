@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+from data.sample_business_data import generate_business_data
+from utils.data_processor import normalize_sales
+from utils.time_pyramid import LEVELS, TimePyramid, daily_totals, get_time_pyramid
+
+@pytest.fixture(scope='module')
+def sales():
+    data = generate_business_data(num_orders=8_000, num_days=500, end_date='2026-03-31', seed=13)
+    return normalize_sales(data['sales'])
+
+def plain_totals(sales, freq=None):
+    rows = sales.dropna(subset=['date'])
+    key = rows['date'].dt.floor('D') if freq is None else rows['date'].dt.to_period(freq)
+    grouped = rows.groupby(key)
+    return pd.DataFrame({'revenue': grouped['total_amount'].sum(), 'orders': grouped.size(),
+                         'quantity': grouped['quantity'].sum()})
+
+def assert_same_totals(actual, expected):
+    assert list(actual.index) == list(expected.index)
+    np.testing.assert_allclose(actual['revenue'].to_numpy(), expected['revenue'].to_numpy(), rtol=1e-12)
+    np.testing.assert_array_equal(actual['orders'].to_numpy(), expected['orders'].to_numpy())
+    np.testing.assert_array_equal(actual['quantity'].to_numpy(), expected['quantity'].to_numpy())
+
+def test_every_level_matches_a_plain_groupby(sales):
+    pyramid = get_time_pyramid(sales)
+    assert_same_totals(pyramid.level('day'), plain_totals(sales))
+    for name, (_, freq) in LEVELS.items():
+        assert_same_totals(pyramid.level(name), plain_totals(sales, freq))
+
+def test_daily_totals_checks_date_order(sales):
+    # attrs (normalized) survive a sort on another column, the date order does not
+    shuffled = sales.sort_values('total_amount')
+    assert shuffled.attrs.get('normalized')
+    assert_same_totals(daily_totals(shuffled), plain_totals(sales))
+
+def test_daily_totals_skips_missing_dates_and_amounts(sales):
+    rows = sales.copy()
+    rows.loc[rows.index[:10], 'date'] = pd.NaT
+    rows.loc[rows.index[10:20], 'total_amount'] = np.nan
+    totals = daily_totals(rows)
+    assert totals['orders'].sum() == len(rows) - 10
+    assert totals['revenue'].sum() == pytest.approx(rows.loc[rows['date'].notna(), 'total_amount'].sum())
+
+@pytest.mark.parametrize('split_days', [0, 1, 45, 200])
+def test_extend_matches_full_rebuild(sales, split_days):
+    cut = sales['date'].max() - pd.Timedelta(days=split_days)
+    old, new = sales[sales['date'] < cut], sales[sales['date'] >= cut]
+    pyramid = TimePyramid(daily_totals(old))
+    for name in LEVELS:
+        pyramid.level(name)
+    extended = pyramid.extend(new)
+    rebuilt = TimePyramid(daily_totals(sales))
+    for name in ['day', *LEVELS]:
+        assert_same_totals(extended.level(name), rebuilt.level(name))
+    # The original pyramid is left as it was
+    assert_same_totals(pyramid.level('day'), plain_totals(old))
+
+def test_extend_with_rows_inside_existing_days(sales):
+    middle = sales['date'].max() - pd.Timedelta(days=100)
+    late = sales[sales['date'].dt.floor('D') == middle.floor('D')]
+    pyramid = TimePyramid(daily_totals(sales))
+    extended = pyramid.extend(late)
+    doubled = pd.concat([sales, late]).sort_values('date', kind='stable')
+    for name in ['day', *LEVELS]:
+        assert_same_totals(extended.level(name), TimePyramid(daily_totals(doubled)).level(name))
@@ -0,0 +1,41 @@
+import pandas as pd
+from utils import tracing
+from utils.result_cache import cached_result, result_cache
+from utils.tracing import Tracer, register_hit_counter, traced
+
+class Service:
+    def __init__(self, sales):
+        self.data = {'sales': sales}
+
+    @cached_result()
+    def total(self):
+        return float(self.data['sales']['total_amount'].sum())
+
+@traced('test.total')
+def total(service):
+    return service.total()
+
+def test_spans_count_result_cache_hits():
+    service = Service(pd.DataFrame({'total_amount': [1.0, 2.0, 3.5]}))
+    result_cache.clear()
+    tracer = Tracer(enabled=True).activate()
+    try:
+        total(service)
+        total(service)
+    finally:
+        tracer.deactivate()
+    assert [s['cache_hits'] for s in tracer.spans] == [0, 1]
+    assert tracer.spans[0]['rows'] == 3
+
+def test_registered_counters_are_summed():
+    hits = {'n': 0}
+    counter = register_hit_counter(lambda: hits['n'])
+    tracer = Tracer(enabled=True).activate()
+    try:
+        with tracer.span('outer'):
+            hits['n'] += 2
+    finally:
+        tracer.deactivate()
+        tracing._hit_counters.remove(counter)
+    assert tracer.spans[0]['cache_hits'] == 2
+    assert tracer.to_frame().columns.tolist() == ['span', 'wall_ms', 'cpu_ms', 'rows', 'cache_hits', 'peak_rss_delta_mb']
@@ -0,0 +1,322 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+from utils.date_index import get_date_index
+from utils.frame_memo import per_frame
+from utils.rollup_cube import CUBE_DIMENSIONS, get_cube
+
+AGGREGATIONS = ('sum', 'mean', 'count', 'nunique', 'min', 'max', 'size')
+GRAINS = {'day': 'D', 'week': 'W', 'month': 'M', 'quarter': 'Q', 'year': 'Y'}
+
+class Query:
+    """One grouped aggregation over the sales table, independent of the engine that runs it.
+
+    ``measures`` maps output names to ``(column, aggregation)`` with aggregation one
+    of AGGREGATIONS (``size`` counts rows and ignores the column); ``by`` lists key
+    columns, ``grain`` adds a ``period`` key (start of the day, ISO week, month,
+    quarter or year) and ``start``/``end`` restrict ``date`` to ``start <= date < end``.
+    """
+
+    def __init__(self, measures, by=None, grain=None, start=None, end=None):
+        self.measures = dict(measures)
+        self.by = list(by or [])
+        self.grain = grain
+        self.start = pd.Timestamp(start) if start is not None else None
+        self.end = pd.Timestamp(end) if end is not None else None
+        for column, agg in self.measures.values():
+            if agg not in AGGREGATIONS:
+                raise ValueError(f'Unknown aggregation: {agg}')
+        if grain is not None and grain not in GRAINS:
+            raise ValueError(f'Unknown time grain: {grain}')
+
+    @property
+    def keys(self):
+        return self.by + (['period'] if self.grain else [])
+
+def get_backend(sales=None, name=None, source=None):
+    """Backend running queries over a sales frame, or over a Parquet file/glob given as ``source``.
+
+    ``name`` defaults to INSIGHTPILOT_BACKEND (pandas). Backends over a frame are
+    created once per frame and engine.
+    """
+    name = (name or os.getenv('INSIGHTPILOT_BACKEND', 'pandas')).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}; choose from {', '.join(BACKENDS)}")
+    if source is not None:
+        return BACKENDS[name](source)
+    memo = _frame_backends(sales)
+    if name not in memo:
+        memo[name] = BACKENDS[name](sales)
+    return memo[name]
+
+@per_frame
+def _frame_backends(sales):
+    return {}
+
+class PandasBackend:
+    """In-memory pandas engine; uses the date index and rollup cube of canonical frames where it can"""
+
+    name = 'pandas'
+
+    def __init__(self, source):
+        self.frame = pd.read_parquet(source) if isinstance(source, (str, os.PathLike)) else source
+        self.integer_columns = set(self.frame.select_dtypes('integer').columns)
+        self.categories = _categories(self.frame)
+
+    def run(self, query):
+        result = self._from_date_index(query)
+        if result is None:
+            result = self._from_cube(query)
+        if result is None:
+            result = self._by_codes(query)
+        if result is None:
+            result = self._group(query)
+        # Every pandas path already yields keys in category/sorted order
+        return finalize(result, query, self, ordered=True)
+
+    def _window(self, query):
+        if query.start is None and query.end is None:
+            return self.frame
+        return get_date_index(self.frame).rows(query.start, query.end, include_end=False)
+
+    def _from_date_index(self, query):
+        # Ungrouped revenue / order / distinct-count queries: prefix sums and binary search
+        if query.keys or not self.frame.attrs.get('normalized'):
+            return None
+        supported = {('total_amount', 'sum'), ('total_amount', 'mean'), ('customer_id', 'nunique'),
+                     ('date', 'min'), ('date', 'max')}
+        if any(agg != 'size' and (column, agg) not in supported for column, agg in query.measures.values()):
+            return None
+        index = get_date_index(self.frame)
+        windowed = query.start is not None or query.end is not None
+        lo, hi = index.bounds(query.start, query.end, include_end=False) if windowed else (0, len(self.frame))
+        if not windowed and index.n_dated < len(self.frame):
+            return None  # rows without a date are outside the prefix sums
+        row = {}
+        for out, (column, agg) in query.measures.items():
+            if agg == 'size':
+                row[out] = hi - lo
+            elif agg == 'sum':
+                row[out] = index.cum_revenue[hi] - index.cum_revenue[lo]
+            elif agg == 'mean':
+                valid = index.cum_valid[hi] - index.cum_valid[lo]
+                row[out] = (index.cum_revenue[hi] - index.cum_revenue[lo]) / valid if valid else np.nan
+            elif agg in ('min', 'max'):
+                row[out] = index.dates[lo if agg == 'min' else hi - 1] if hi > lo else pd.NaT
+            else:
+                row[out] = index.distinct(column, query.start, query.end, include_end=False)
+        return pd.DataFrame([row])
+
+    def _from_cube(self, query):
+        # Sums and row counts by product/region/time come from the pre-aggregated cube
+        cube_measures = {('total_amount', 'sum'): 'revenue', ('quantity', 'sum'): 'quantity'}
+        if not (query.by or query.grain) or not set(query.by) <= set(CUBE_DIMENSIONS) or not self.frame.attrs.get('normalized'):
+            return None
+        cube = get_cube(self.frame)
+        if cube is None or not set(query.by) <= set(cube.dimensions) or not _cube_complete(self.frame):
+            return None
+        if any(t != t.normalize() for t in (query.start, query.end) if t is not None):
+            return None
+        mapping = {}
+        for out, (column, agg) in query.measures.items():
+            measure = 'orders' if agg == 'size' else cube_measures.get((column, agg))
+            if measure is None or measure not in cube.measures:
+                return None
+            mapping[out] = measure
+        end = query.end - pd.Timedelta(days=1) if query.end is not None else None
+        freq = GRAINS.get(query.grain)
+        table = cube.rollup(freq, by=query.by, start=query.start, end=end)
+        if isinstance(table, pd.Series):
+            table = table.to_frame().T
+        result = pd.DataFrame({out: table[measure] for out, measure in mapping.items()}).reset_index()
+        names = list(query.by) if not freq else (['period'] + list(query.by))
+        result.columns = names + list(mapping)
+        if freq and freq != 'D':
+            result['period'] = result['period'].dt.start_time
+        if freq and query.by:
+            result = result.sort_values(query.keys, kind='stable')
+        return result
+
+    def _by_codes(self, query):
+        # One categorical key (e.g. per customer): bincounts and unbuffered min/max over the
+        # category codes instead of a hash groupby
+        if query.grain or len(query.by) != 1 or not self.frame.attrs.get('normalized'):
+            return None
+        key = query.by[0]
+        if not isinstance(self.frame[key].dtype, pd.CategoricalDtype):
+            return None
+        for column, agg in query.measures.values():
+            numeric = agg in ('sum', 'mean', 'count') and pd.api.types.is_numeric_dtype(self.frame[column])
+            if not (agg == 'size' or numeric or (column == 'date' and agg in ('min', 'max'))):
+                return None
+        frame = self._window(query)
+        categories = frame[key].cat.categories
+        codes = frame[key].cat.codes.to_numpy()
+        keyed = codes >= 0
+        rows = np.bincount(codes[keyed], minlength=len(categories))
+        result, totals = {key: categories}, {}
+        for out, (column, agg) in query.measures.items():
+            if agg == 'size':
+                result[out] = rows
+            elif column == 'date':
+                dates = frame['date'].to_numpy()
+                dated = keyed & ~np.isnat(dates)
+                fill = np.iinfo(np.int64).max if agg == 'min' else np.iinfo(np.int64).min
+                extreme = np.full(len(categories), fill, dtype=np.int64)
+                getattr(np, f'{agg}imum').at(extreme, codes[dated], dates[dated].view(np.int64))
+                extreme[extreme == fill] = np.iinfo(np.int64).min  # NaT for keys without a dated row
+                result[out] = extreme.view(dates.dtype)
+            else:
+                if column not in totals:
+                    values = frame[column].to_numpy(dtype=float)
+                    valid = keyed & ~np.isnan(values)
+                    totals[column] = (np.bincount(codes[valid], weights=values[valid], minlength=len(categories)),
+                                      np.bincount(codes[valid], minlength=len(categories)))
+                sums, counts = totals[column]
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    result[out] = {'sum': sums, 'count': counts, 'mean': sums / counts}[agg]
+        return pd.DataFrame(result)[rows > 0]
+
+    def _group(self, query):
+        frame = self._window(query)
+        keys = [frame[b] for b in query.by]
+        if query.grain:
+            dates = frame['date']
+            period = dates.dt.normalize() if query.grain == 'day' else dates.dt.to_period(GRAINS[query.grain]).dt.start_time
+            keys.append(period.rename('period'))
+        aggs = {out: (column or 'date', agg) for out, (column, agg) in query.measures.items()}
+        if not keys:
+            return pd.DataFrame([{out: frame[column].agg(agg) if agg != 'size' else len(frame)
+                                  for out, (column, agg) in aggs.items()}])
+        return frame.groupby(keys, observed=True).agg(**aggs).reset_index()
+
+class PolarsBackend:
+    """Multi-threaded lazy Polars engine over a frame (converted once) or a Parquet scan"""
+
+    name = 'polars'
+
+    def __init__(self, source):
+        import polars as pl
+        self.pl = pl
+        if isinstance(source, (str, os.PathLike)):
+            self._lazy = lambda: pl.scan_parquet(source)
+        else:
+            table = pl.from_pandas(source)
+            self._lazy = table.lazy
+        schema = self._lazy().collect_schema()
+        self.integer_columns = {c for c, t in schema.items() if t.is_integer()}
+        self.categories = _categories(source)
+
+    def run(self, query):
+        pl = self.pl
+        lf = self._lazy()
+        if query.start is not None:
+            lf = lf.filter(pl.col('date') >= query.start.to_pydatetime())
+        if query.end is not None:
+            lf = lf.filter(pl.col('date') < query.end.to_pydatetime())
+        keys = [pl.col(b) for b in query.by]
+        if query.grain:
+            every = {'day': '1d', 'week': '1w', 'month': '1mo', 'quarter': '1q', 'year': '1y'}[query.grain]
+            keys.append(pl.col('date').dt.truncate(every).alias('period'))
+        exprs = []
+        for out, (column, agg) in query.measures.items():
+            if agg == 'size':
+                expr = pl.len()
+            elif agg == 'nunique':
+                expr = pl.col(column).drop_nulls().n_unique()
+            else:
+                expr = getattr(pl.col(column), agg)()
+            exprs.append(expr.alias(out))
+        lf = lf.group_by(keys).agg(exprs) if keys else lf.select(exprs)
+        return finalize(lf.collect().to_pandas(), query, self)
+
+class DuckDBBackend:
+    """Embedded DuckDB SQL engine over a registered frame or directly over Parquet files"""
+
+    name = 'duckdb'
+    SQL = {'sum': 'SUM({})', 'mean': 'AVG({})', 'count': 'COUNT({})', 'nunique': 'COUNT(DISTINCT {})',
+           'min': 'MIN({})', 'max': 'MAX({})', 'size': 'COUNT(*)'}
+
+    def __init__(self, source):
+        import duckdb
+        self.connection = duckdb.connect()
+        self._lock = threading.Lock()  # a DuckDB connection is not safe for concurrent queries
+        if isinstance(source, (str, os.PathLike)):
+            self.relation = "read_parquet('{}')".format(str(source).replace("'", "''"))
+        else:
+            self.connection.register('sales', source)
+            self.relation = 'sales'
+        columns = self.connection.execute(f'DESCRIBE SELECT * FROM {self.relation}').fetchall()
+        self.integer_columns = {name for name, kind, *_ in columns if 'INT' in kind.upper()}
+        self.categories = _categories(source)
+
+    def run(self, query):
+        select, params = [], []
+        for b in query.by:
+            select.append(_quote(b))
+        if query.grain:
+            select.append(f"CAST(date_trunc('{query.grain}', {_quote('date')}) AS TIMESTAMP) AS period")
+        for out, (column, agg) in query.measures.items():
+            select.append(f"{self.SQL[agg].format(_quote(column) if column else '*')} AS {_quote(out)}")
+        where = []
+        if query.start is not None:
+            where.append(f"{_quote('date')} >= ?")
+            params.append(query.start.to_pydatetime())
+        if query.end is not None:
+            where.append(f"{_quote('date')} < ?")
+            params.append(query.end.to_pydatetime())
+        sql = f"SELECT {', '.join(select)} FROM {self.relation}"
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        if query.keys:
+            sql += ' GROUP BY ALL'
+        with self._lock:
+            result = self.connection.execute(sql, params).df()
+        return finalize(result, query, self)
+
+BACKENDS = {'pandas': PandasBackend, 'polars': PolarsBackend, 'duckdb': DuckDBBackend}
+
+def finalize(result, query, backend, ordered=False):
+    """Common shape for every engine: plain (non-categorical) keys in category or value order, stable dtypes"""
+    result = result.dropna(subset=query.keys).copy() if query.keys else result.copy()
+    for b in query.by:
+        if isinstance(result[b].dtype, pd.CategoricalDtype):
+            result[b] = result[b].astype(result[b].cat.categories.dtype)
+    if query.grain:
+        result['period'] = pd.to_datetime(result['period']).astype('datetime64[ns]')
+    for out, (column, agg) in query.measures.items():
+        values = result[out]
+        if agg in ('count', 'nunique', 'size'):
+            result[out] = values.fillna(0).astype('int64')
+        elif agg == 'sum':
+            values = pd.to_numeric(values).fillna(0)
+            result[out] = values.astype('int64' if column in backend.integer_columns else 'float64')
+        elif column == 'date':
+            result[out] = pd.to_datetime(values).astype('datetime64[ns]')
+        else:
+            result[out] = pd.to_numeric(values).astype('float64')
+    result = result[query.keys + list(query.measures)]
+    if query.keys and not ordered:
+        result = result.sort_values(query.keys, kind='stable', key=lambda keys: _sort_key(keys, backend.categories))
+    return result.reset_index(drop=True)
+
+def _sort_key(keys, categories):
+    # Categorical keys follow the category order of the source frame, like a pandas groupby
+    if keys.name in categories:
+        return pd.Series(pd.Categorical(keys, categories=categories[keys.name]).codes, index=keys.index)
+    return keys
+
+def _categories(source):
+    if isinstance(source, pd.DataFrame):
+        return {c: source[c].cat.categories for c in source.columns if isinstance(source[c].dtype, pd.CategoricalDtype)}
+    return {}
+
+@per_frame
+def _cube_complete(sales):
+    # The cube drops rows whose dimension values are missing; only use it when there are none
+    return not any(sales[d].isna().any() for d in get_cube(sales).dimensions) and not sales['date'].isna().any()
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
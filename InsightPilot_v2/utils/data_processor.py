@@ -1,42 +1,103 @@
 
 import pandas as pd
+from utils.compute_backend import Query, get_backend
+from utils.rollup_cube import get_cube
+from utils.time_pyramid import carry_time_pyramid
+from utils.date_index import get_date_index
+from utils.result_cache import cached_result, dataset_fingerprint, result_cache
+from utils.tracing import trace_methods
 
+CATEGORICAL_COLUMNS = ['product_id', 'customer_id', 'region']
+
+def normalize_sales(sales):
+    # Build the canonical sales table once at ingest: datetime64 dates, categorical ids,
+    # downcast integer columns and rows sorted by date. Consumers treat it as read-only.
+    if sales is None or sales.attrs.get('normalized'):
+        return sales
+    df = sales.copy()
+    if 'date' in df.columns:
+        df['date'] = pd.to_datetime(df['date'])
+        df = df.sort_values('date', kind='stable').reset_index(drop=True)
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    # Money columns stay float64 so revenue sums are not rounded by float32
+    for col in df.select_dtypes(include='integer').columns:
+        df[col] = pd.to_numeric(df[col], downcast='integer')
+    df.attrs['normalized'] = True
+    return df
+
+@trace_methods('processor')
 class DataProcessor:
-    def __init__(self, data):
+    def __init__(self, data, backend=None):
         self.data = data or {}
+        self._backend = backend
+        if self.data.get('sales') is not None:
+            self.data['sales'] = normalize_sales(self.data['sales'])
+    @property
+    def sales(self):
+        return self.data.get('sales')
+    @property
+    def backend(self):
+        if self._backend is None or isinstance(self._backend, str):
+            return get_backend(self.sales, name=self._backend)
+        return self._backend
+    @property
+    def cube(self):
+        return get_cube(self.sales)
+    def set_sales(self, sales):
+        old = self.sales
+        self.data['sales'] = normalize_sales(sales)
+        if old is not None and old is not self.data['sales']:
+            result_cache.invalidate(dataset_fingerprint(old))
+    def append_sales(self, rows):
+        # The combined table is re-sorted by date, so back-dated rows land among the existing ones
+        current = self.sales
+        added = pd.DataFrame(rows)
+        if current is not None and len(current):
+            rows = pd.concat([current, added], ignore_index=True)
+            rows.attrs = {}
+        self.set_sales(rows)
+        # Rows from the latest day on only touch the trailing periods of the time pyramid;
+        # with back-dated rows it is rebuilt from scratch on first use
+        if current is not None and len(current) and len(added) and 'date' in added.columns:
+            if pd.to_datetime(added['date']).min() >= current['date'].max():
+                carry_time_pyramid(current, self.sales, added)
+    @cached_result()
     def get_data_summary(self):
-        sales = self.data.get('sales')
-        if sales is None or len(sales)==0:
+        sales = self.sales
+        if isinstance(self._backend, (str, type(None))) and (sales is None or len(sales)==0):
+            return {}
+        totals = self.backend.run(Query({
+            'revenue': ('total_amount', 'sum'),
+            'orders': ('total_amount', 'size'),
+            'aov': ('total_amount', 'mean'),
+            'start': ('date', 'min'),
+            'end': ('date', 'max')
+        })).iloc[0]
+        if totals['orders'] == 0:
             return {}
-        sales = sales.copy()
-        sales['date'] = pd.to_datetime(sales['date'])
         summary = {
-            'total_revenue': float(sales['total_amount'].sum()),
-            'total_orders': int(len(sales)),
-            'average_order_value': float(sales['total_amount'].mean()),
-            'start_date': str(sales['date'].min().date()),
-            'end_date': str(sales['date'].max().date())
+            'total_revenue': float(totals['revenue']),
+            'total_orders': int(totals['orders']),
+            'average_order_value': float(totals['aov']),
+            'start_date': str(totals['start'].date()),
+            'end_date': str(totals['end'].date())
         }
         return summary
     def filter_data_by_date(self, start_date=None, end_date=None):
-        sales = self.data.get('sales')
+        sales = self.sales
         if sales is None:
             return pd.DataFrame()
-        df = sales.copy()
-        df['date'] = pd.to_datetime(df['date'])
-        if start_date:
-            df = df[df['date'] >= pd.to_datetime(start_date)]
-        if end_date:
-            df = df[df['date'] <= pd.to_datetime(end_date)]
-        return df
+        if not start_date and not end_date:
+            return sales
+        # Positional slice of the date-sorted table found by binary search
+        return get_date_index(sales).rows(start=start_date or None, end=end_date or None)
+    @cached_result()
     def calculate_growth_metrics(self):
-        sales = self.data.get('sales')
-        if sales is None or len(sales)==0:
+        if isinstance(self._backend, (str, type(None))) and self.cube is None:
             return {}
-        df = sales.copy()
-        df['date'] = pd.to_datetime(df['date'])
-        df['month'] = df['date'].dt.to_period('M')
-        monthly = df.groupby('month')['total_amount'].sum().sort_index()
+        monthly = self.backend.run(Query({'revenue': ('total_amount', 'sum')}, grain='month'))['revenue']
         if len(monthly) < 2:
             return {'monthly_growth_pct': None}
         last = monthly.iloc[-1]
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+from utils.frame_memo import per_frame
+
+@per_frame
+def get_date_index(sales):
+    """Return the date index of a sales frame, building it on first use"""
+    return DateIndex(sales)
+
+class DateIndex:
+    """Binary-search index over the date-sorted sales table with prefix sums of revenue.
+
+    Window bounds come from searchsorted and window revenue from a difference of
+    prefix sums, so trailing-window KPIs cost O(log n) instead of a full-length mask.
+    """
+
+    def __init__(self, sales):
+        if not sales['date'].is_monotonic_increasing:
+            sales = sales.sort_values('date', kind='stable')
+        self.sales = sales
+        self.dates = sales['date'].to_numpy()
+        amounts = sales['total_amount'].to_numpy(dtype='float64', na_value=np.nan)
+        valid = ~np.isnan(amounts)
+        self.cum_revenue = np.concatenate([[0.0], np.cumsum(np.where(valid, amounts, 0.0))])
+        self.cum_valid = np.concatenate([[0], np.cumsum(valid)])
+        # NaT sorts last, so dated rows are the prefix [0, n_dated)
+        self.n_dated = int(len(self.dates) - np.isnat(self.dates).sum())
+        self.min_date = pd.Timestamp(self.dates[0]) if self.n_dated else None
+        self.max_date = pd.Timestamp(self.dates[self.n_dated - 1]) if self.n_dated else None
+
+    def bounds(self, start=None, end=None, include_end=True):
+        """Positional [lo, hi) range of rows with start <= date <= end (or < end)"""
+        dates = self.dates[:self.n_dated]
+        lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), side='left'))
+        if end is None:
+            hi = self.n_dated
+        else:
+            side = 'right' if include_end else 'left'
+            hi = int(np.searchsorted(dates, np.datetime64(pd.Timestamp(end)), side=side))
+        return lo, max(lo, hi)
+
+    def revenue(self, start=None, end=None, include_end=True):
+        lo, hi = self.bounds(start, end, include_end)
+        return float(self.cum_revenue[hi] - self.cum_revenue[lo])
+
+    def orders(self, start=None, end=None, include_end=True):
+        lo, hi = self.bounds(start, end, include_end)
+        return hi - lo
+
+    def average_order_value(self, start=None, end=None, include_end=True):
+        lo, hi = self.bounds(start, end, include_end)
+        valid = self.cum_valid[hi] - self.cum_valid[lo]
+        return float((self.cum_revenue[hi] - self.cum_revenue[lo]) / valid) if valid else float('nan')
+
+    def rows(self, start=None, end=None, include_end=True):
+        """The rows inside the window as a positional slice (no boolean mask)"""
+        lo, hi = self.bounds(start, end, include_end)
+        return self.sales.iloc[lo:hi]
+
+    def distinct(self, column, start=None, end=None, include_end=True):
+        """Number of distinct non-null values of a column inside the window"""
+        values = self.rows(start, end, include_end)[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes = values.cat.codes.to_numpy()
+            codes = codes[codes >= 0]
+            return int(np.count_nonzero(np.bincount(codes, minlength=len(values.cat.categories))))
+        return int(values.nunique())
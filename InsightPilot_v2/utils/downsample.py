@@ -0,0 +1,94 @@
+import os
+from collections import OrderedDict
+
+import numpy as np
+from utils.frame_memo import per_frame
+
+DEFAULT_MAX_POINTS = int(os.getenv('INSIGHTPILOT_CHART_POINTS', 2000))
+METHODS = {'LTTB': 'lttb', 'Min/max': 'minmax', 'Full': None}
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: positions of n_out points that keep the visual shape"""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype='float64')
+    y = np.nan_to_num(np.asarray(y, dtype='float64'))
+    # First and last points are fixed; the rest are split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[prev] - avg_x) * (y[lo:hi] - y[prev]) - (x[prev] - x[lo:hi]) * (avg_y - y[prev]))
+        prev = lo + int(area.argmax())
+        out[i + 1] = prev
+    return out
+
+def minmax_indices(y, n_out):
+    """Positions of the first and last point and of the minimum and maximum of (n_out - 2) / 2 equal buckets"""
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    y = np.asarray(y, dtype='float64')
+    buckets = (n_out - 2) // 2
+    starts = np.linspace(0, n, buckets + 1).astype(np.int64)[:-1]
+    bucket_of = np.repeat(np.arange(buckets), np.diff(np.append(starts, n)))
+    # Sort within each bucket by value: first entry is the bucket minimum, last the maximum
+    order = np.lexsort((np.nan_to_num(y, nan=np.inf), bucket_of))
+    ends = np.append(starts[1:], n) - 1
+    lows, highs = order[starts], order[ends]
+    return np.unique(np.concatenate([[0, n - 1], lows, highs]))
+
+def downsample(frame, x, y, max_points=DEFAULT_MAX_POINTS, method='lttb', keep=None):
+    """Rows of frame (ordered by x) reduced to about max_points for plotting.
+
+    ``x`` and ``y`` are column names (``x=None`` uses the index); ``keep`` is a
+    boolean mask of rows that must survive, such as anomalies or forecast points.
+    At most max_points rows are returned unless more than max_points - 3 rows are
+    kept. ``method=None`` returns the frame unchanged.
+    """
+    n = len(frame)
+    if method is None or n <= max_points:
+        return frame
+    xs = frame.index if x is None else frame[x]
+    xs = xs.to_numpy()
+    if np.issubdtype(xs.dtype, np.datetime64):
+        xs = xs.astype('datetime64[ns]').astype(np.int64)
+    ys = frame[y].to_numpy(dtype='float64', na_value=np.nan)
+    forced = np.flatnonzero(np.asarray(keep, dtype=bool)) if keep is not None else np.empty(0, dtype=np.int64)
+    budget = max(max_points - len(forced), 3)
+    if method == 'lttb':
+        positions = lttb_indices(xs, ys, budget)
+    elif method == 'minmax':
+        positions = minmax_indices(ys, budget)
+    else:
+        raise ValueError(f'Unknown downsampling method: {method}')
+    return frame.iloc[np.union1d(positions, forced)]
+
+@per_frame
+def _chart_memo(sales):
+    return OrderedDict()
+
+def chart_points(sales, key, build, x, y, max_points=DEFAULT_MAX_POINTS, method='lttb', keep=None, max_cached=16):
+    """Downsampled chart data for one filter state of a dataset.
+
+    ``build()`` produces the full-resolution frame and is only called on a miss;
+    ``keep`` names a boolean column of rows that must be plotted. Returns the
+    points to plot and the number of points before downsampling.
+    """
+    memo = _chart_memo(sales)
+    entry_key = (key, x, y, max_points, method, keep)
+    if entry_key in memo:
+        memo.move_to_end(entry_key)
+        return memo[entry_key]
+    full = build()
+    mask = full[keep] if keep is not None else None
+    entry = (downsample(full, x, y, max_points, method, mask), len(full))
+    memo[entry_key] = entry
+    if len(memo) > max_cached:
+        memo.popitem(last=False)
+    return entry
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from utils.tracing import traced
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = pq = None
+
+DEFAULT_CHUNK_ROWS = 100_000
+EXPORT_FORMATS = {
+    'CSV': {'extension': 'csv', 'mime': 'text/csv'},
+    'Parquet': {'extension': 'parquet', 'mime': 'application/vnd.apache.parquet'}
+}
+
+def available_formats():
+    return [name for name in EXPORT_FORMATS if name != 'Parquet' or pq is not None]
+
+def iter_csv_chunks(frame, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """CSV bytes of frame, one chunk of rows at a time (header in the first chunk)"""
+    for i, lo in enumerate(range(0, max(len(frame), 1), chunk_rows)):
+        yield frame.iloc[lo:lo + chunk_rows].to_csv(index=False, header=i == 0).encode('utf-8')
+
+def write_csv(frame, path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    with open(path, 'wb') as f:
+        for chunk in iter_csv_chunks(frame, chunk_rows):
+            f.write(chunk)
+
+def write_parquet(frame, path, chunk_rows=DEFAULT_CHUNK_ROWS, compression='zstd'):
+    if pq is None:
+        raise ImportError('Parquet export needs pyarrow (pip install pyarrow)')
+    schema = _parquet_schema(frame.iloc[:chunk_rows])
+    with pq.ParquetWriter(path, schema, compression=compression) as writer:
+        for lo in range(0, len(frame), chunk_rows):
+            # One row group per chunk, so only one chunk is converted to Arrow at a time
+            writer.write_table(pa.Table.from_pandas(frame.iloc[lo:lo + chunk_rows], schema=schema, preserve_index=False))
+
+def _parquet_schema(chunk):
+    # An empty slice types object (text) columns as null, so the schema comes from the first chunk;
+    # columns still without a type there (all missing) are written as strings
+    schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, field.with_type(pa.string()))
+    return schema
+
+class ExportCache:
+    """Export files on disk keyed by dataset fingerprint, filter state and format.
+
+    Files are written chunk by chunk to a temporary name and moved into place, so
+    the whole export never sits in memory as one string; the newest ``max_files``
+    exports are kept and reused until the data or the filters change.
+    """
+
+    def __init__(self, directory=None, max_files=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+        self.directory = directory or os.getenv('INSIGHTPILOT_EXPORT_DIR', os.path.join('.cache', 'exports'))
+        self.max_files = max_files if max_files is not None else int(os.getenv('INSIGHTPILOT_EXPORT_MAX_FILES', 8))
+        self.chunk_rows = chunk_rows
+
+    def path_for(self, fingerprint, key, fmt):
+        digest = hashlib.sha256(json.dumps([fingerprint, key, fmt], default=str).encode()).hexdigest()[:32]
+        return os.path.join(self.directory, f"{digest}.{EXPORT_FORMATS[fmt]['extension']}")
+
+    def get(self, fingerprint, key, fmt):
+        """Path of an existing export or None"""
+        path = self.path_for(fingerprint, key, fmt)
+        if os.path.exists(path):
+            os.utime(path)
+            return path
+        return None
+
+    @traced('export.write')
+    def export(self, frame, fingerprint, key, fmt='CSV'):
+        """Path of the export of frame, writing it only if it is not cached yet"""
+        path = self.get(fingerprint, key, fmt)
+        if path is not None:
+            return path
+        path = self.path_for(fingerprint, key, fmt)
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+        try:
+            if fmt == 'Parquet':
+                write_parquet(frame, tmp, self.chunk_rows)
+            else:
+                write_csv(frame, tmp, self.chunk_rows)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self._evict()
+        return path
+
+    def clear(self):
+        for name in self._files():
+            os.remove(os.path.join(self.directory, name))
+
+    def _files(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return [n for n in os.listdir(self.directory) if not n.endswith('.tmp')]
+
+    def _evict(self):
+        paths = sorted((os.path.join(self.directory, n) for n in self._files()), key=os.path.getmtime, reverse=True)
+        for path in paths[self.max_files:]:
+            os.remove(path)
+
+default_export_cache = ExportCache()
@@ -0,0 +1,91 @@
+from collections import OrderedDict
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from utils.date_index import get_date_index
+from utils.frame_memo import per_frame
+from utils.tracing import traced
+
+FILTER_COLUMNS = ['product_id', 'region']
+
+@per_frame
+def get_filter_index(sales):
+    """Return the filter index of a sales frame, building it on first use"""
+    return FilterIndex(sales)
+
+class FilterIndex:
+    """Row selection for the dashboard filters without re-scanning string columns.
+
+    The date range becomes a positional slice of the date-sorted table (binary
+    search), and each multiselect becomes a boolean lookup table over category
+    codes; the per-column row masks of that slice are combined with a bitwise AND.
+    Option lists are computed once per dataset.
+    """
+
+    def __init__(self, sales, columns=None, max_cached=8):
+        self.date_index = get_date_index(sales)
+        # Positions refer to the date-sorted table held by the date index
+        sales = self.sales = self.date_index.sales
+        self.columns = [c for c in (columns or FILTER_COLUMNS) if c in sales.columns]
+        self.codes = {}
+        self.categories = {}
+        self.options = {}
+        for col in self.columns:
+            values = sales[col]
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype('category')
+            codes = values.cat.codes.to_numpy()
+            self.codes[col] = codes
+            self.categories[col] = values.cat.categories
+            present = np.bincount(codes[codes >= 0], minlength=len(values.cat.categories)) > 0
+            self.options[col] = sorted(values.cat.categories[present].tolist())
+        self.max_cached = max_cached
+        self._cache = OrderedDict()
+
+    def date_range(self):
+        """First and last day of the data"""
+        return self.date_index.min_date.date(), self.date_index.max_date.date()
+
+    def positions(self, start=None, end=None, **filters):
+        """Row positions matching an inclusive day range and the selected values"""
+        end_exclusive = pd.Timestamp(end) + timedelta(days=1) if end is not None else None
+        lo, hi = self.date_index.bounds(start, end_exclusive, include_end=False)
+        mask = None
+        for col, values in filters.items():
+            if not values or col not in self.codes:
+                continue
+            # One extra False slot at the end, so missing values (code -1) never match
+            selected = np.zeros(len(self.categories[col]) + 1, dtype=bool)
+            indexer = self.categories[col].get_indexer(list(values))
+            selected[indexer[indexer >= 0]] = True
+            col_mask = selected[self.codes[col][lo:hi]]
+            mask = col_mask if mask is None else mask & col_mask
+        if mask is None:
+            return np.arange(lo, hi)
+        return lo + np.flatnonzero(mask)
+
+    @traced('filter.rows')
+    def rows(self, start=None, end=None, **filters):
+        """Filtered rows; the last few filter states are kept so reruns reuse them"""
+        key = filter_key(start, end, **filters)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        positions = self.positions(start, end, **filters)
+        if len(positions) and positions[-1] - positions[0] + 1 == len(positions):
+            rows = self.sales.iloc[positions[0]:positions[-1] + 1]
+        else:
+            rows = self.sales.take(positions)
+        self._cache[key] = rows
+        if len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+        return rows
+
+def filter_key(start=None, end=None, **filters):
+    """Hashable description of a filter state"""
+    return (
+        str(start) if start is not None else None,
+        str(end) if end is not None else None,
+        tuple(sorted((col, tuple(sorted(map(str, values)))) for col, values in filters.items() if values))
+    )
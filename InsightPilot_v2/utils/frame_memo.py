@@ -0,0 +1,38 @@
+import functools
+import weakref
+
+def per_frame(fn):
+    """Memoize fn(frame) on the identity of the frame.
+
+    Canonical frames are never mutated, so a new dataset version is always a new
+    object; entries are dropped as soon as their frame is garbage collected.
+    """
+    memo = {}
+
+    def forget(key, ref):
+        entry = memo.get(key)
+        if entry is not None and entry[0] is ref:
+            del memo[key]
+
+    def peek(frame):
+        """The memoized value for frame, or None without computing it"""
+        entry = memo.get(id(frame))
+        return entry[1] if entry is not None and entry[0]() is frame else None
+
+    def prime(frame, value):
+        """Memoize a value for frame that was derived some cheaper way (e.g. incrementally)"""
+        key = id(frame)
+        memo[key] = (weakref.ref(frame, lambda ref, key=key: forget(key, ref)), value)
+
+    @functools.wraps(fn)
+    def wrapper(frame):
+        value = peek(frame)
+        if value is not None:
+            return value
+        value = fn(frame)
+        prime(frame, value)
+        return value
+
+    wrapper.peek = peek
+    wrapper.prime = prime
+    return wrapper
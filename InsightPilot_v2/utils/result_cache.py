@@ -0,0 +1,245 @@
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from utils.frame_memo import per_frame
+from utils.tracing import register_hit_counter
+
+@per_frame
+def dataset_fingerprint(df):
+    """Content fingerprint over every value of every column (the index is ignored).
+
+    Numeric, boolean and datetime columns are hashed from their raw buffers and
+    categoricals from their codes plus categories, so the full hash costs about
+    one pass over memory; other columns go through ``pd.util.hash_pandas_object``.
+    Computed once per frame.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((df.shape, [str(c) for c in df.columns], [str(t) for t in df.dtypes])).encode())
+    for _, column in df.items():
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            h.update(_buffer(column.cat.codes.to_numpy()))
+            h.update(_buffer(pd.util.hash_pandas_object(column.cat.categories.to_series(), index=False).to_numpy()))
+        elif isinstance(column.dtype, np.dtype) and column.dtype.kind in 'biufcmM':
+            h.update(_buffer(column.to_numpy()))
+        else:
+            h.update(_buffer(pd.util.hash_pandas_object(column, index=False, categorize=False).to_numpy()))
+    return h.hexdigest()
+
+@per_frame
+def content_fingerprint(df):
+    """Fingerprint of the values alone, stable across re-encodings of the same rows.
+
+    Unlike ``dataset_fingerprint`` it ignores dtypes, integer widths, datetime units and
+    category codes (categoricals are hashed by their decoded values), so the rows of a
+    table stay recognizable after ``normalize_sales`` rebuilt its categories.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((len(df), [str(c) for c in df.columns])).encode())
+    for _, column in df.items():
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            hashes = pd.util.hash_pandas_object(column.cat.categories.to_series(), index=False).to_numpy()
+            codes = column.cat.codes.to_numpy()
+            values = np.where(codes >= 0, hashes[codes], 0)
+        elif isinstance(column.dtype, np.dtype) and column.dtype.kind in 'biu':
+            values = column.to_numpy().astype('int64')
+        elif isinstance(column.dtype, np.dtype) and column.dtype.kind == 'f':
+            values = column.to_numpy().astype('float64')
+        elif isinstance(column.dtype, np.dtype) and column.dtype.kind in 'mM':
+            values = column.to_numpy().astype(f'{column.dtype.str[1]}8[ns]').view('int64')
+        else:
+            values = pd.util.hash_pandas_object(column, index=False, categorize=False).to_numpy()
+        h.update(_buffer(values))
+    return h.hexdigest()
+
+def _buffer(values):
+    return np.ascontiguousarray(values).view(np.uint8)
+
+class ResultCache:
+    """LRU cache of computed results with a memory budget and an optional on-disk tier.
+
+    The disk tier has its own byte budget; files are evicted least recently used
+    first by modification time, which a disk hit refreshes.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, disk_dir=None, max_disk_bytes=1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+        self._entries = OrderedDict()  # key -> (value, size, dataset fingerprint)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+    @classmethod
+    def from_env(cls):
+        max_mb = float(os.getenv('INSIGHTPILOT_CACHE_MB', '256'))
+        max_disk_mb = float(os.getenv('INSIGHTPILOT_CACHE_DISK_MB', '1024'))
+        return cls(max_bytes=int(max_mb * 1024 * 1024), disk_dir=os.getenv('INSIGHTPILOT_CACHE_DIR') or None,
+                   max_disk_bytes=int(max_disk_mb * 1024 * 1024))
+
+    def get(self, key, fingerprint):
+        """Return (found, value)"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key][0]
+        path = self._disk_path(key, fingerprint)
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    payload = f.read()
+                value = pickle.loads(payload)
+                os.utime(path)  # recently used: evicted last
+            except Exception:
+                value = None
+            else:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._store(key, value, len(payload), fingerprint)
+                return True, value
+        with self._lock:
+            self.misses += 1
+        return False, None
+
+    def put(self, key, fingerprint, value):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._store(key, value, len(payload), fingerprint)
+        path = self._disk_path(key, fingerprint)
+        if path and len(payload) <= self.max_disk_bytes:
+            tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp, path)
+            self._evict_disk()
+
+    def invalidate(self, fingerprint):
+        """Drop every entry computed from the dataset with this fingerprint"""
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if entry[2] == fingerprint]:
+                self._bytes -= self._entries.pop(key)[1]
+        if self.disk_dir:
+            for name in os.listdir(self.disk_dir):
+                if name.startswith(fingerprint):
+                    os.remove(os.path.join(self.disk_dir, name))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.disk_dir:
+            for name in os.listdir(self.disk_dir):
+                if name.endswith('.pkl'):
+                    os.remove(os.path.join(self.disk_dir, name))
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'disk_evictions': self.disk_evictions
+        }
+
+    def _store(self, key, value, size, fingerprint):
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size, fingerprint)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def _evict_disk(self):
+        files = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith('.pkl'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.disk_dir, name))
+            except FileNotFoundError:  # removed by another process meanwhile
+                continue
+            files.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.disk_dir, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.disk_evictions += 1
+
+    def _disk_path(self, key, fingerprint):
+        if not self.disk_dir:
+            return None
+        return os.path.join(self.disk_dir, f'{fingerprint}_{key}.pkl')
+
+result_cache = ResultCache.from_env()
+register_hit_counter(lambda: result_cache.hits + result_cache.disk_hits)
+
+def _argument_token(value):
+    if isinstance(value, pd.DataFrame):
+        return dataset_fingerprint(value)
+    if isinstance(value, dict):
+        return {k: _argument_token(v) for k, v in value.items()}
+    return repr(value)
+
+def cached_result(dataset=None):
+    """Cache a method's result on the fingerprint of its data plus its arguments.
+
+    ``dataset`` names the argument holding the sales frame; by default the sales
+    frame is ``self.data['sales']``. Results are shared between callers and must be
+    treated as read-only. Error dicts are never cached.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            arguments.pop('self')
+            if dataset is None:
+                data = getattr(self, 'data', None) or {}
+                sales = data.get('sales')
+                arguments['self.data'] = data
+            else:
+                sales = arguments.get(dataset)
+            if not isinstance(sales, pd.DataFrame):
+                return fn(self, *args, **kwargs)
+            fingerprint = dataset_fingerprint(sales)
+            token = repr((fn.__qualname__, sorted((k, repr(_argument_token(v))) for k, v in arguments.items())))
+            key = hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+            found, value = result_cache.get(key, fingerprint)
+            if found:
+                return value
+            value = fn(self, *args, **kwargs)
+            if not (isinstance(value, dict) and 'error' in value):
+                result_cache.put(key, fingerprint, value)
+            return value
+
+        return wrapper
+    return decorator
@@ -0,0 +1,98 @@
+from collections.abc import Sequence
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # results stay pandas frames without pyarrow
+    pa = None
+
+RECORD_BATCH_ROWS = 65_536
+
+class ResultTable(Sequence):
+    """Columnar result of a service method, held as an Arrow table.
+
+    It still reads like the list of row dicts the services used to return
+    (``len``, indexing, iteration), but rows are only boxed into dicts when they
+    are read, one batch at a time. ``to_pandas``/``to_arrow``/``to_json`` convert
+    the whole table at the edge, and Arrow consumers (pyarrow, Polars, DuckDB)
+    read it zero-copy through ``__arrow_c_stream__``. Without pyarrow, or for
+    columns Arrow cannot type, the DataFrame itself is kept.
+    """
+
+    def __init__(self, frame):
+        self._table = None
+        self._frame = None
+        if pa is not None:
+            try:
+                self._table = pa.Table.from_pandas(frame, preserve_index=False)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                pass
+        if self._table is None:
+            self._frame = frame.reset_index(drop=True)
+
+    @property
+    def columns(self):
+        return list(self._table.column_names if self._table is not None else self._frame.columns)
+
+    def __len__(self):
+        return self._table.num_rows if self._table is not None else len(self._frame)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            lo, hi, step = item.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(lo, hi, step)]
+            return self._slice(lo, hi).to_dict('records')
+        position = item + len(self) if item < 0 else item
+        if not 0 <= position < len(self):
+            raise IndexError('ResultTable index out of range')
+        return self._slice(position, position + 1).to_dict('records')[0]
+
+    def __contains__(self, value):
+        # Rows are dicts; keeps `'error' in result` checks from scanning the rows
+        return isinstance(value, dict) and super().__contains__(value)
+
+    def __iter__(self):
+        for lo in range(0, len(self), RECORD_BATCH_ROWS):
+            yield from self._slice(lo, lo + RECORD_BATCH_ROWS).to_dict('records')
+
+    def __eq__(self, other):
+        if isinstance(other, ResultTable):
+            return self.to_pandas().equals(other.to_pandas())
+        if isinstance(other, list):
+            return self.to_records() == other
+        return NotImplemented
+
+    def __repr__(self):
+        return f'ResultTable({len(self)} rows: {", ".join(self.columns)})'
+
+    def __arrow_c_stream__(self, requested_schema=None):
+        return self.to_arrow().__arrow_c_stream__(requested_schema)
+
+    def to_pandas(self):
+        return self._table.to_pandas() if self._table is not None else self._frame.copy()
+
+    def to_arrow(self):
+        if pa is None:
+            raise ImportError('Arrow results need pyarrow (pip install pyarrow)')
+        return self._table if self._table is not None else pa.Table.from_pandas(self._frame, preserve_index=False)
+
+    def to_records(self):
+        """The rows as a list of dicts (the old payload)"""
+        return list(self)
+
+    def to_json(self, **kwargs):
+        """Rows as a JSON array of objects, with ISO dates"""
+        return self.to_pandas().to_json(orient='records', date_format='iso', **kwargs)
+
+    def _slice(self, lo, hi):
+        if self._table is not None:
+            return self._table.slice(lo, max(0, hi - lo)).to_pandas()
+        return self._frame.iloc[lo:hi]
+
+def as_frame(value):
+    """DataFrame of a service result: a ResultTable, a list of row dicts or a DataFrame"""
+    if isinstance(value, ResultTable):
+        return value.to_pandas()
+    return value if isinstance(value, pd.DataFrame) else pd.DataFrame(value)
@@ -0,0 +1,86 @@
+import pandas as pd
+from utils.frame_memo import per_frame
+from utils.time_pyramid import get_time_pyramid
+
+PYRAMID_LEVELS = {'D': 'day', 'W': 'week', 'M': 'month', 'Q': 'quarter', 'Y': 'year'}
+CUBE_DIMENSIONS = ['product_id', 'region']
+
+def get_cube(sales):
+    """Return the rollup cube for a canonical sales frame, building it on first use"""
+    if sales is None or len(sales) == 0:
+        return None
+    return _build_cube(sales)
+
+@per_frame
+def _build_cube(sales):
+    return RollupCube(sales)
+
+class RollupCube:
+    """Materialized day x product_id x region rollup of the sales table.
+
+    Unfiltered time totals come from the sales' time pyramid; the cells are only
+    built when a rollup needs the dimensions or a date range.
+    """
+
+    def __init__(self, sales):
+        self.sales = sales
+        self.dimensions = [d for d in CUBE_DIMENSIONS if d in sales.columns]
+        self._aggs = {'revenue': ('total_amount', 'sum'), 'orders': ('total_amount', 'size')}
+        if 'quantity' in sales.columns:
+            self._aggs['quantity'] = ('quantity', 'sum')
+        self.measures = list(self._aggs)
+        self._cells = None
+
+    @property
+    def cells(self):
+        if self._cells is None:
+            keys = [self.sales['date'].dt.normalize()] + [self.sales[d] for d in self.dimensions]
+            # groupby sorts on the keys, so cells come out ordered by date first
+            self._cells = self.sales.groupby(keys, observed=True).agg(**self._aggs).reset_index()
+        return self._cells
+
+    def select(self, start=None, end=None, **filters):
+        """Cells inside an inclusive date range, restricted to the given dimension values"""
+        cells = self.cells
+        if start is not None or end is not None:
+            dates = cells['date']
+            lo = dates.searchsorted(pd.Timestamp(start)) if start is not None else 0
+            hi = dates.searchsorted(pd.Timestamp(end), side='right') if end is not None else len(cells)
+            cells = cells.iloc[lo:hi]
+        for dim, values in filters.items():
+            if values:
+                cells = cells[cells[dim].isin(values)]
+        return cells
+
+    def rollup(self, freq=None, by=None, start=None, end=None, **filters):
+        """Aggregate measures to a time grain ('D', 'W', 'M', ...) and/or dimensions"""
+        by = list(by or [])
+        if not by and start is None and end is None and not any(filters.values()):
+            if freq in PYRAMID_LEVELS:
+                return get_time_pyramid(self.sales).level(PYRAMID_LEVELS[freq])
+        cells = self.select(start, end, **filters)
+        keys = []
+        if freq == 'D':
+            keys.append(cells['date'])
+        elif freq:
+            keys.append(cells['date'].dt.to_period(freq))
+        keys += [cells[d] for d in by]
+        if not keys:
+            return cells[self.measures].sum()
+        return cells.groupby(keys, observed=True)[self.measures].sum()
+
+    def totals(self, start=None, end=None, **filters):
+        """Summed measures over the selected cells"""
+        return self.rollup(start=start, end=end, **filters)
+
+    def daily(self):
+        """Daily totals indexed by date"""
+        return get_time_pyramid(self.sales).level('day')
+
+    def weekly(self):
+        """Weekly totals derived from the daily level"""
+        return get_time_pyramid(self.sales).level('week')
+
+    def monthly(self):
+        """Monthly totals derived from the daily level"""
+        return get_time_pyramid(self.sales).level('month')
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+from utils.frame_memo import per_frame
+
+# Dimension name -> id column shared by the fact (sales) table and the dimension table
+DIMENSIONS = {'customer': 'customer_id', 'product': 'product_id'}
+
+def get_star_schema(sales, customers=None, products=None):
+    """Star schema over a canonical sales frame and the given dimension tables"""
+    return StarSchema(sales, {'customer': customers, 'product': products})
+
+@per_frame
+def _dimensions(sales):
+    return {}
+
+class StarSchema:
+    """The sales fact table with int32 surrogate keys into the customer and product tables.
+
+    A surrogate key is the row position of the fact row's customer/product in its
+    dimension table (-1 when it has none), derived once from the categorical codes
+    of the id column. Attributes are then resolved with array takes instead of
+    hash joins, and enriched views are cached, so no merge copies the fact table.
+    Keys, attributes and views are kept per sales frame and dimension table, so
+    every schema over the same frames shares them.
+    """
+
+    def __init__(self, sales, dimensions):
+        self.sales = sales
+        self.dimensions = {}
+        for name, frame in dimensions.items():
+            if frame is None or DIMENSIONS[name] not in sales.columns or DIMENSIONS[name] not in frame.columns:
+                continue
+            cache = _dimensions(sales)
+            # The cached dimension keeps its frame alive, so the id cannot be reused meanwhile
+            if (name, id(frame)) not in cache:
+                cache[(name, id(frame))] = Dimension(sales, frame, DIMENSIONS[name])
+            self.dimensions[name] = cache[(name, id(frame))]
+
+    @property
+    def keys(self):
+        """Surrogate key of every fact row per dimension"""
+        return {name: dimension.keys for name, dimension in self.dimensions.items()}
+
+    def attribute(self, dimension, column):
+        return self.dimensions[dimension].attribute(column)
+
+    def view(self, dimension, columns):
+        return self.dimensions[dimension].view(columns)
+
+    def enrich(self, table, dimension, columns=None):
+        """Left-join dimension attributes onto a table keyed by the dimension's id, by take"""
+        if dimension not in self.dimensions:
+            return table
+        return self.dimensions[dimension].enrich(table, columns)
+
+class Dimension:
+    """One dimension table with the surrogate keys of the fact rows into it"""
+
+    def __init__(self, sales, frame, id_column):
+        self.sales = sales
+        self.frame = frame
+        self.id_column = id_column
+        # First row per id (a left merge would repeat fact rows for duplicate ids)
+        first = ~frame[id_column].duplicated().to_numpy()
+        self.index = pd.Index(frame[id_column][first])
+        self.rows = np.append(np.flatnonzero(first), -1).astype(np.int32)
+        ids = sales[id_column]
+        if not isinstance(ids.dtype, pd.CategoricalDtype):
+            ids = ids.astype('category')
+        # Dimension row of every category, plus -1 for the missing-id code -1
+        positions = np.append(self.lookup(ids.cat.categories), -1).astype(np.int32)
+        self.keys = positions[ids.cat.codes.to_numpy()]
+        self._attributes = {}
+        self._views = {}
+
+    def lookup(self, ids):
+        """Dimension row positions of the given ids (-1 for unknown ids)"""
+        return self.rows[self.index.get_indexer(ids)]
+
+    def attribute(self, column):
+        """An attribute for every fact row as a categorical (cached)"""
+        if column not in self._attributes:
+            values = self.frame[column]
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype('category')
+            codes = np.append(values.cat.codes.to_numpy(), -1)[self.keys]
+            self._attributes[column] = pd.Categorical.from_codes(codes, dtype=values.dtype)
+        return self._attributes[column]
+
+    def view(self, columns):
+        """The sales frame with attributes added as columns, cached per column set.
+
+        The view shares the fact columns with the sales frame and stays canonical,
+        so date indexes, cubes and backends can be built on it like on the sales.
+        """
+        key = tuple(columns)
+        if key not in self._views:
+            view = self.sales.assign(**{c: self.attribute(c) for c in columns})
+            view.attrs = dict(self.sales.attrs)
+            self._views[key] = view
+        return self._views[key]
+
+    def enrich(self, table, columns=None):
+        if columns is None:
+            columns = [c for c in self.frame.columns if c != self.id_column and c not in table.columns]
+        positions = self.lookup(table[self.id_column])
+        enriched = table.copy(deep=False)
+        for column in columns:
+            values = self.frame[column]
+            values = values.array if isinstance(values.dtype, pd.api.extensions.ExtensionDtype) else values.to_numpy()
+            enriched[column] = pd.api.extensions.take(values, positions, allow_fill=True)
+        return enriched
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+from utils.frame_memo import per_frame
+
+# Each level is re-aggregated from the level below it: (parent level, pandas period frequency)
+LEVELS = {'week': ('day', 'W'), 'month': ('day', 'M'), 'quarter': ('month', 'Q'), 'year': ('quarter', 'Y')}
+
+def get_time_pyramid(sales):
+    """Return the time pyramid of a sales frame, building it on first use"""
+    if sales is None or len(sales) == 0:
+        return None
+    return _build_pyramid(sales)
+
+@per_frame
+def _build_pyramid(sales):
+    return TimePyramid(daily_totals(sales))
+
+def carry_time_pyramid(previous, sales, rows):
+    """Give sales (previous plus the appended rows) the extended pyramid of previous, if it has one"""
+    pyramid = _build_pyramid.peek(previous) if previous is not None else None
+    if pyramid is not None and sales is not None and len(sales):
+        _build_pyramid.prime(sales, pyramid.extend(rows))
+
+def daily_totals(sales):
+    """Revenue, order count (and quantity) per day, in one pass over the date-sorted rows"""
+    dates = sales['date']
+    dates = dates if pd.api.types.is_datetime64_dtype(dates) else pd.to_datetime(dates)
+    # reduceat needs the rows in date order; attrs survive sorting on other columns, so check the dates
+    order = None if dates.is_monotonic_increasing else np.argsort(dates.to_numpy(), kind='stable')
+    dates = dates.to_numpy()
+    if order is not None:
+        dates = dates[order]
+    # NaT sorts last; those rows belong to no day
+    n = len(dates) - int(np.isnat(dates).sum())
+    days = dates[:n].astype('datetime64[D]')
+    starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]]) if n else np.zeros(0, dtype=np.int64)
+    columns = {'revenue': ('total_amount', float), 'quantity': ('quantity', np.int64)}
+    totals = {}
+    for measure, (column, kind) in columns.items():
+        if column not in sales.columns:
+            continue
+        values = sales[column].to_numpy()
+        values = values[order] if order is not None else values
+        if kind is float or values.dtype.kind == 'f':
+            values = values[:n].astype(float)
+            values = np.where(np.isnan(values), 0.0, values)  # sums skip missing amounts
+        else:
+            values = values[:n].astype(kind)
+        totals[measure] = np.add.reduceat(values, starts) if n else values[:0]
+    totals['orders'] = np.diff(np.r_[starts, n])
+    measures = [m for m in ('revenue', 'orders', 'quantity') if m in totals]
+    index = pd.DatetimeIndex(days[starts].astype('datetime64[ns]'), name='date')
+    return pd.DataFrame({m: totals[m] for m in measures}, index=index)
+
+class TimePyramid:
+    """Sales totals per day, week, month, quarter and year.
+
+    Raw rows are aggregated once, to days; every coarser level is re-aggregated
+    from the level below it (weeks and months from days, quarters from months,
+    years from quarters) on first use. ``extend`` folds appended rows into a new
+    pyramid that recomputes only the trailing periods they touch. Levels are
+    shared between pyramids and must be treated as read-only.
+    """
+
+    def __init__(self, day, levels=None):
+        self.measures = list(day.columns)
+        self._levels = {**(levels or {}), 'day': day}
+
+    def level(self, name):
+        """Totals of one level, indexed by date (day) or by period (named after the level)"""
+        if name not in self._levels:
+            parent, freq = LEVELS[name]
+            self._levels[name] = _reaggregate(self.level(parent), freq, name)
+        return self._levels[name]
+
+    def extend(self, rows):
+        """The pyramid of the data plus the appended rows; earlier periods are reused as they are"""
+        added = daily_totals(rows)
+        if added.empty:
+            return TimePyramid(self._levels['day'], dict(self._levels))
+        first = added.index[0]
+        day = self._levels['day']
+        cut = day.index.searchsorted(first)
+        trailing = pd.concat([day.iloc[cut:], added]).groupby(level=0).sum()
+        levels = {'day': pd.concat([day.iloc[:cut], trailing])}
+        for name, (parent, freq) in LEVELS.items():
+            if name not in self._levels:
+                continue
+            start = first.to_period(freq)
+            old, below = self._levels[name], levels[parent]
+            touched = below[_periods(below.index, freq) >= start]
+            levels[name] = pd.concat([old[old.index < start], _reaggregate(touched, freq, name)])
+        return TimePyramid(levels['day'], levels)
+
+def _periods(index, freq):
+    return index.asfreq(freq) if isinstance(index, pd.PeriodIndex) else index.to_period(freq)
+
+def _reaggregate(level, freq, name):
+    return level.groupby(_periods(level.index, freq).rename(name)).sum()
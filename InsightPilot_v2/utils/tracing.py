@@ -0,0 +1,207 @@
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # not available on Windows; memory deltas are then omitted
+    resource = None
+
+_local = threading.local()
+# Number of active, enabled tracers in the process: while it is zero traced calls skip all bookkeeping
+_active = 0
+_lock = threading.Lock()
+# Callables returning a running count of cache hits, registered by the caches themselves
+_hit_counters = []
+
+def current_tracer():
+    """Tracer collecting spans on this thread, or None when tracing is off"""
+    if not _active:
+        return None
+    tracer = getattr(_local, 'tracer', None)
+    return tracer if tracer is not None and tracer.enabled else None
+
+def register_hit_counter(counter):
+    """Count the hits reported by counter() into each span's cache_hits"""
+    _hit_counters.append(counter)
+    return counter
+
+def span(name, **attrs):
+    """Context manager timing a block on the current tracer (a shared no-op when disabled)"""
+    tracer = current_tracer()
+    return tracer.span(name, **attrs) if tracer is not None else _NOOP
+
+def traced(name):
+    """Decorator recording each call of a function as a span"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _active:
+                return fn(*args, **kwargs)
+            tracer = current_tracer()
+            if tracer is None:
+                return fn(*args, **kwargs)
+            with tracer.span(name, rows=_rows(args)):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def trace_methods(prefix):
+    """Class decorator tracing every public method (properties and coroutines are left alone)"""
+    def decorator(cls):
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith('_') or not inspect.isfunction(value) or inspect.iscoroutinefunction(value):
+                continue
+            setattr(cls, attr, traced(f'{prefix}.{attr}')(value))
+        return cls
+    return decorator
+
+class Tracer:
+    """Timing spans for one Streamlit rerun.
+
+    Each span records wall and CPU time, rows processed, hits of the registered
+    caches (see ``register_hit_counter``) and how much the process's peak RSS grew
+    while it ran. The peak is process-wide (``ru_maxrss``), so peak_rss_delta_mb is
+    0 for a span that allocates less than an earlier peak, even if it allocates a
+    lot; it flags spans that push memory to a new high, not per-span usage. Spans
+    nest; the tree is kept as a flat list with depth and parent ids.
+    """
+
+    def __init__(self, enabled=None):
+        self.enabled = enabled if enabled is not None else os.getenv('INSIGHTPILOT_TRACE', '') not in ('', '0')
+        self.spans = []
+        self._stack = []
+        self._origin = time.perf_counter()
+
+    def activate(self):
+        """Make this the tracer of the current thread"""
+        global _active
+        previous = getattr(_local, 'tracer', None)
+        if previous is not None:
+            previous.deactivate()
+        _local.tracer = self
+        if self.enabled:
+            with _lock:
+                _active += 1
+        return self
+
+    def deactivate(self):
+        global _active
+        if getattr(_local, 'tracer', None) is self:
+            _local.tracer = None
+            if self.enabled:
+                with _lock:
+                    _active -= 1
+
+    def span(self, name, **attrs):
+        return _Span(self, name, attrs)
+
+    def to_frame(self):
+        rows = [{
+            'span': '  ' * s['depth'] + s['name'],
+            'wall_ms': round(s['wall_ms'], 2),
+            'cpu_ms': round(s['cpu_ms'], 2),
+            'rows': s.get('rows'),
+            'cache_hits': s['cache_hits'],
+            'peak_rss_delta_mb': s['peak_rss_delta_mb']
+        } for s in self.spans]
+        return pd.DataFrame(rows, columns=['span', 'wall_ms', 'cpu_ms', 'rows', 'cache_hits', 'peak_rss_delta_mb'])
+
+    def to_json(self):
+        return json.dumps({'spans': self.spans}, indent=2, default=str)
+
+    def to_chrome_trace(self):
+        """Trace in the Chrome trace event format (chrome://tracing, Perfetto)"""
+        events = [{
+            'name': s['name'],
+            'cat': s['name'].split('.')[0],
+            'ph': 'X',
+            'ts': round(s['start_ms'] * 1000, 1),
+            'dur': round(s['wall_ms'] * 1000, 1),
+            'pid': os.getpid(),
+            'tid': s['thread'],
+            'args': {k: s[k] for k in ('cpu_ms', 'rows', 'cache_hits', 'peak_rss_delta_mb') if s.get(k) is not None}
+        } for s in self.spans]
+        return json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'})
+
+class _Span:
+    __slots__ = ('tracer', 'record', 'wall', 'cpu', 'hits', 'rss')
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.record = {'name': name, **attrs}
+
+    def set(self, **attrs):
+        self.record.update(attrs)
+
+    def __enter__(self):
+        tracer = self.tracer
+        self.record.update(
+            id=len(tracer.spans),
+            parent=tracer._stack[-1]['id'] if tracer._stack else None,
+            depth=len(tracer._stack),
+            thread=threading.get_ident()
+        )
+        tracer.spans.append(self.record)
+        tracer._stack.append(self.record)
+        self.hits = _cache_hits()
+        self.rss = _peak_rss_mb()
+        self.cpu = time.thread_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        tracer = self.tracer
+        rss = _peak_rss_mb()
+        self.record.update(
+            start_ms=(self.wall - tracer._origin) * 1000,
+            wall_ms=(wall - self.wall) * 1000,
+            cpu_ms=(cpu - self.cpu) * 1000,
+            cache_hits=_cache_hits() - self.hits,
+            peak_rss_delta_mb=round(rss - self.rss, 1) if rss is not None else None
+        )
+        if exc_type is not None:
+            self.record['error'] = repr(exc)
+        tracer._stack.pop()
+        return False
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+_NOOP = _NoopSpan()
+
+def _rows(args):
+    for arg in args[:3]:
+        if isinstance(arg, pd.DataFrame):
+            return len(arg)
+        sales = getattr(arg, 'sales', None)
+        if isinstance(sales, pd.DataFrame):
+            return len(sales)
+        data = getattr(arg, 'data', None)
+        if isinstance(data, dict) and isinstance(data.get('sales'), pd.DataFrame):
+            return len(data['sales'])
+    return None
+
+def _cache_hits():
+    return sum(counter() for counter in _hit_counters)
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    return peak / (2 ** 20 if os.uname().sysname == 'Darwin' else 2 ** 10)